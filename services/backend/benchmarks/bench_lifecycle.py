@@ -0,0 +1,195 @@
+"""Benchmark of the digital twin lifecycle on synthetic IXP datasets, against the in-memory Kathara simulator.
+
+For each scale, a member dump and IPv4/IPv6 RIB dumps are generated in the resources folder, under a temporary
+`benchmark-*` directory, and the loaded settings are pointed at them. The types of the dumps and the route servers
+are the ones of the digital twin configuration (ixp.conf), which must be in place as for running the backend.
+
+Measured operations: start (cold, and after a restart with the table dump snapshot on disk), incremental reload
+with no change, forced reload, RIB comparison of the first route server (cold and with the dumps cache warm), one
+sample of the machines statistics and `GET /machines/stats`.
+Each operation is run once for the time and once under tracemalloc for the peak memory.
+
+Usage (from the src directory):
+    python ../benchmarks/bench_lifecycle.py [--members 50,500,2000] [--routes 100000] [--json results.json]
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from digital_twin.ixp.globals import RESOURCES_FOLDER  # noqa: E402
+from digital_twin.ixp.settings.settings import Settings  # noqa: E402
+
+from dump_cache import dump_cache  # noqa: E402
+import main as backend  # noqa: E402
+from operations import compare_rib, reload_digital_twin, start_digital_twin, stop_digital_twin  # noqa: E402
+from simulator import SimulatedKathara  # noqa: E402
+from snapshots import snapshot_store  # noqa: E402
+from state import digital_twin_state  # noqa: E402
+from stats_sampler import stats_sampler  # noqa: E402
+from synthetic import generate_members, write_member_dump, write_rib_dump  # noqa: E402
+
+STATS_REQUESTS = 20
+
+
+def measure(func, before=None) -> dict:
+    """Run an operation twice: once for the elapsed time, once under tracemalloc for the peak memory.
+
+    Args:
+        func: Operation to run
+        before: Called before each run, e.g. to reset a cache, it is not measured
+
+    Returns:
+        dict: Elapsed seconds and peak memory in MB
+    """
+    if before is not None:
+        before()
+    gc.collect()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+
+    if before is not None:
+        before()
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": round(elapsed, 3), "peak_mb": round(peak / 2 ** 20, 1)}
+
+
+class SyntheticScenario:
+    """Synthetic dumps generated in the resources folder, with the settings pointed at them while active."""
+
+    def __init__(self, members_count: int, routes_count: int, ipv6_ratio: float):
+        self.members_count = members_count
+        self.routes_v6 = int(routes_count * ipv6_ratio)
+        self.routes_v4 = routes_count - self.routes_v6
+        self.directory = None
+        self._original_load_from_disk = None
+
+    def __enter__(self) -> "SyntheticScenario":
+        settings = Settings.get_instance()
+        settings.load_from_disk()
+        member_type = settings.peering_configuration["type"]
+        rib_type = settings.rib_dumps["type"]
+        self.route_servers = list(settings.route_servers)
+
+        self.directory = tempfile.mkdtemp(prefix="benchmark-", dir=RESOURCES_FOLDER)
+        name = os.path.basename(self.directory)
+        members = generate_members(self.members_count)
+        write_member_dump(os.path.join(self.directory, "members.json"), members)
+        dumps = {}
+        for version, count in ((4, self.routes_v4), (6, self.routes_v6)):
+            dumps[str(version)] = f"{name}/rib_v{version}.dump"
+            write_rib_dump(os.path.join(RESOURCES_FOLDER, dumps[str(version)]), members, count, rib_type, version)
+        self.rib_dumps = list(dumps.values())
+
+        original = self._original_load_from_disk = Settings.load_from_disk
+
+        def load_from_disk(instance, *args, **kwargs):
+            result = original(instance, *args, **kwargs)
+            instance.peering_configuration = {"type": member_type, "path": f"{name}/members.json"}
+            instance.rib_dumps = {"type": rib_type, "dumps": dumps}
+            return result
+
+        Settings.load_from_disk = load_from_disk
+        return self
+
+    def __exit__(self, *exc) -> None:
+        Settings.load_from_disk = self._original_load_from_disk
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def run(members_count: int, routes_count: int, ipv6_ratio: float) -> dict:
+    """Run the lifecycle operations on a synthetic scenario of the given scale."""
+    results = {"members": members_count, "routes": routes_count}
+    with SyntheticScenario(members_count, routes_count, ipv6_ratio) as scenario:
+        # The route servers answer with the union of the generated RIB dumps
+        manager = SimulatedKathara(seed=42)
+        manager.install()
+        try:
+            def stop():
+                if digital_twin_state.is_running():
+                    stop_digital_twin()
+
+            def restart():
+                stop()
+                dump_cache.clear()
+
+            def cold_start():
+                restart()
+                shutil.rmtree(snapshot_store.directory, ignore_errors=True)
+
+            results["start"] = measure(start_digital_twin, before=cold_start)
+            results["start_from_snapshot"] = measure(start_digital_twin, before=restart)
+            results["devices"] = len(manager.machines)
+            results["reload"] = measure(reload_digital_twin)
+            results["reload_force"] = measure(lambda: reload_digital_twin(force=True))
+
+            if scenario.route_servers:
+                route_server = scenario.route_servers[0]
+                results["compare_rib_cold"] = measure(
+                    lambda: compare_rib(route_server, scenario.rib_dumps), before=dump_cache.clear
+                )
+                results["compare_rib_warm"] = measure(lambda: compare_rib(route_server, scenario.rib_dumps))
+
+            stats = manager.get_machines_stats()
+            results["stats_sample"] = measure(lambda: stats_sampler._record(next(stats)))
+            with TestClient(backend.app) as client:
+                def get_stats():
+                    for _ in range(STATS_REQUESTS):
+                        client.get("/machines/stats").raise_for_status()
+
+                results["machines_stats_requests"] = STATS_REQUESTS
+                results["machines_stats"] = measure(get_stats)
+        finally:
+            stop()
+            dump_cache.clear()
+            SimulatedKathara.uninstall()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", default="50,500,2000", help="Comma-separated numbers of members, one run each")
+    parser.add_argument("--routes", type=int, default=100000, help="Number of routes in the RIB dumps")
+    parser.add_argument("--ipv6-ratio", type=float, default=0.1, help="Fraction of IPv6 routes")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    # The operations log every step, keep the output to the results
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "runs": [],
+    }
+    for members_count in (int(value) for value in args.members.split(",")):
+        run_results = run(members_count, args.routes, args.ipv6_ratio)
+        print(json.dumps(run_results, indent=4))
+        results["runs"].append(run_results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
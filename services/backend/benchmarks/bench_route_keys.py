@@ -0,0 +1,140 @@
+"""Benchmark of the RIB diff: formatted route strings in sets versus compact keys in sorted arrays.
+
+Usage:
+    python benchmarks/bench_route_keys.py [--routes 1000000] [--diff-ratio 0.01] [--json results.json]
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from rib_parser import format_route  # noqa: E402
+from route_keys import RouteKeyCodec, diff_sorted, sorted_keys  # noqa: E402
+
+
+def generate_routes(count: int, seed: int = 42) -> list:
+    """Generate synthetic (network, AS path) routes, 90% IPv4 and 10% IPv6.
+
+    Like in a route server RIB, each network is announced with one to four AS paths, listed in a row.
+    """
+    rng = random.Random(seed)
+    as_paths = [
+        tuple(str(rng.randint(1, 400000)) for _ in range(rng.randint(1, 6))) for _ in range(max(1, count // 20))
+    ]
+    routes = []
+    while len(routes) < count:
+        if rng.random() < 0.9:
+            prefixlen = rng.randint(16, 24)
+            address = rng.getrandbits(32) & ~((1 << (32 - prefixlen)) - 1)
+            network = f"{address >> 24}.{(address >> 16) & 255}.{(address >> 8) & 255}.{address & 255}/{prefixlen}"
+        else:
+            prefixlen = rng.choice([32, 48])
+            groups = [f"{rng.getrandbits(16):x}" for _ in range(prefixlen // 16 - 1)]
+            network = f"2001:{':'.join(groups)}::/{prefixlen}"
+        for _ in range(min(rng.randint(1, 4), count - len(routes))):
+            routes.append((network, rng.choice(as_paths)))
+    return routes
+
+
+def mutate(routes: list, ratio: float, seed: int = 7) -> list:
+    """Return a copy of the routes with a fraction of their AS paths changed."""
+    rng = random.Random(seed)
+    changed = list(routes)
+    for _ in range(int(len(routes) * ratio)):
+        i = rng.randrange(len(changed))
+        network, as_path = changed[i]
+        changed[i] = (network, ("64512",) + as_path)
+    return changed
+
+
+def measure(func, *args):
+    """Run a function twice: once for the elapsed time, once under tracemalloc for the memory.
+
+    Returns:
+        tuple: The result, the elapsed seconds, the peak memory and the memory retained by the result, in bytes
+    """
+    gc.collect()
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    result = func(*args)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak, retained
+
+
+def index_strings(uploaded: list, live: list) -> tuple:
+    """Previous approach: format every route as a string and index them in sets."""
+    return {format_route(route) for route in uploaded}, {format_route(route) for route in live}
+
+
+def diff_strings(uploaded_routes: set, live_routes: set) -> tuple:
+    """Previous approach: diff the sets and sort the whole differences."""
+    return sorted(live_routes - uploaded_routes), sorted(uploaded_routes - live_routes)
+
+
+def index_keys(uploaded: list, live: list) -> tuple:
+    """Compact keys: encode routes as integers in sorted arrays, interning the AS paths."""
+    codec = RouteKeyCodec()
+    uploaded_keys = sorted_keys(codec.encode(network, as_path) for network, as_path in uploaded)
+    live_keys = sorted_keys(codec.encode(network, as_path) for network, as_path in live)
+    return codec, uploaded_keys, live_keys
+
+
+def diff_keys(codec: RouteKeyCodec, uploaded_keys: list, live_keys: list) -> tuple:
+    """Compact keys: merge the sorted arrays, format only the first page of differences."""
+    only_in_live, only_in_uploaded, _ = diff_sorted(live_keys, uploaded_keys)
+    first_page = [format_route(codec.decode(key)) for key in only_in_live[:100]]
+    return only_in_live, only_in_uploaded, first_page
+
+
+def run(routes_count: int, diff_ratio: float) -> dict:
+    """Run both approaches on the same synthetic tables.
+
+    The memory figures are the peak while indexing both tables and the memory held by the two indexes.
+    """
+    uploaded = generate_routes(routes_count)
+    live = mutate(uploaded, diff_ratio)
+
+    results = {"routes": routes_count, "diff_ratio": diff_ratio}
+    for name, index, diff in (("strings", index_strings, diff_strings), ("keys", index_keys, diff_keys)):
+        indexes, index_seconds, peak, retained = measure(index, uploaded, live)
+        start = time.perf_counter()
+        differences = diff(*indexes)
+        diff_seconds = time.perf_counter() - start
+        results[name] = {
+            "index_seconds": round(index_seconds, 3),
+            "diff_seconds": round(diff_seconds, 3),
+            "peak_mb": round(peak / 2 ** 20, 1),
+            "index_mb": round(retained / 2 ** 20, 1),
+            "differences": len(differences[0]) + len(differences[1]),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--routes", type=int, default=1000000, help="Number of routes per table")
+    parser.add_argument("--diff-ratio", type=float, default=0.01, help="Fraction of routes differing")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = run(args.routes, args.diff_ratio)
+    print(json.dumps(results, indent=4))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Synthetic IXP datasets: a member dump in the IX-F Member Export format and the matching RIB dumps.
+
+Members get consecutive addresses in the peering LAN and 4-byte private ASNs. Routes are spread round-robin over
+the members, each with a distinct network and an AS path starting with the member ASN.
+"""
+
+import ipaddress
+import json
+import random
+from typing import Iterator, List, NamedTuple
+
+PEERING_LAN_V4 = ipaddress.ip_network("172.16.0.0/16")
+PEERING_LAN_V6 = ipaddress.ip_network("2001:db8:ffff::/64")
+FIRST_ASN = 4200000000
+
+# Announced networks start after the peering LAN and never overlap it
+_FIRST_NETWORK_V4 = int(ipaddress.ip_address("11.0.0.0"))
+_FIRST_NETWORK_V6 = int(ipaddress.ip_address("2a00::"))
+
+
+class Member(NamedTuple):
+    """A member of the synthetic IXP."""
+    asn: int
+    ipv4: str
+    ipv6: str
+
+
+class Route(NamedTuple):
+    """A route announced by a member."""
+    network: str
+    as_path: List[int]
+    next_hop: str
+    asn: int
+
+
+def generate_members(count: int) -> List[Member]:
+    """Generate the members of the IXP."""
+    if count > PEERING_LAN_V4.num_addresses - 2:
+        raise ValueError(f"At most {PEERING_LAN_V4.num_addresses - 2} members are supported")
+    return [
+        Member(FIRST_ASN + i, str(PEERING_LAN_V4[i + 1]), str(PEERING_LAN_V6[i + 1]))
+        for i in range(count)
+    ]
+
+
+def generate_routes(members: List[Member], count: int, version: int, seed: int = 42) -> Iterator[Route]:
+    """Generate the routes of an address family, spread round-robin over the members.
+
+    Args:
+        members: Members announcing the routes
+        count: Number of routes
+        version: IP version, 4 (/24 networks) or 6 (/48 networks)
+        seed: Seed of the generated AS paths
+
+    Yields:
+        Route: Each route
+    """
+    rng = random.Random(seed + version)
+    for i in range(count):
+        member = members[i % len(members)]
+        if version == 4:
+            network = f"{ipaddress.IPv4Address(_FIRST_NETWORK_V4 + (i << 8))}/24"
+            next_hop = member.ipv4
+        else:
+            network = f"{ipaddress.IPv6Address(_FIRST_NETWORK_V6 + (i << 80))}/48"
+            next_hop = member.ipv6
+        upstreams = [rng.randint(1, 64495) for _ in range(rng.randint(0, 3))]
+        yield Route(network, [member.asn] + upstreams, next_hop, member.asn)
+
+
+def write_member_dump(path: str, members: List[Member]) -> None:
+    """Write the members as an IX-F Member Export (schema 1.0) JSON file."""
+    data = {
+        "version": "1.0",
+        "timestamp": "2024-01-01T00:00:00Z",
+        "ixp_list": [{
+            "ixp_id": 1,
+            "shortname": "BENCH-IX",
+            "vlan": [{
+                "id": 1,
+                "name": "Peering LAN",
+                "ipv4": {"prefix": str(PEERING_LAN_V4.network_address), "mask_length": PEERING_LAN_V4.prefixlen},
+                "ipv6": {"prefix": str(PEERING_LAN_V6.network_address), "mask_length": PEERING_LAN_V6.prefixlen},
+            }],
+        }],
+        "member_list": [
+            {
+                "asnum": member.asn,
+                "name": f"Member AS{member.asn}",
+                "member_type": "peering",
+                "connection_list": [{
+                    "ixp_id": 1,
+                    "state": "active",
+                    "if_list": [{"if_speed": 10000}],
+                    "vlan_list": [{
+                        "vlan_id": 1,
+                        "ipv4": {"address": member.ipv4, "routeserver": True, "max_prefix": 100000},
+                        "ipv6": {"address": member.ipv6, "routeserver": True, "max_prefix": 100000},
+                    }],
+                }],
+            }
+            for member in members
+        ],
+    }
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def iter_rib_lines(routes: Iterator[Route], rib_type: str, version: int) -> Iterator[str]:
+    """Format routes as the RIB output of a route server.
+
+    Args:
+        routes: Routes to format
+        rib_type: Route server type, "bird" (`birdc show route all`) or "open_bgpd" (`bgpctl show rib`)
+        version: IP version of the routes
+
+    Yields:
+        str: Each line, with its terminator
+    """
+    if rib_type == "bird":
+        yield "BIRD 2.0.12 ready.\n"
+        yield f"Table master{version}:\n"
+        for route in routes:
+            protocol = f"AS{route.asn}_{version}"
+            yield f"{route.network:<20} unicast [{protocol} 2024-01-01] * (100) [AS{route.as_path[-1]}i]\n"
+            yield f"\tvia {route.next_hop} on eth0\n"
+            yield "\tType: BGP univ\n"
+            yield "\tBGP.origin: IGP\n"
+            yield f"\tBGP.as_path: {' '.join(str(asn) for asn in route.as_path)}\n"
+            yield f"\tBGP.next_hop: {route.next_hop}\n"
+    elif rib_type == "open_bgpd":
+        yield "flags: * = Valid, > = Selected, I = via IBGP, A = Announced, S = Stale, E = Error\n"
+        yield "origin validation state: N = not-found, V = valid, ! = invalid\n"
+        yield "origin: i = IGP, e = EGP, ? = Incomplete\n\n"
+        yield "flags ovs destination          gateway          lpref   med aspath origin\n"
+        for route in routes:
+            as_path = " ".join(str(asn) for asn in route.as_path)
+            yield f"*>    N {route.network:<18} {route.next_hop:<16} 100 0 {as_path} i\n"
+    else:
+        raise ValueError(f"Unsupported RIB dump type: {rib_type}")
+
+
+def write_rib_dump(path: str, members: List[Member], count: int, rib_type: str, version: int) -> None:
+    """Write the RIB dump of an address family."""
+    with open(path, "w") as f:
+        f.writelines(iter_rib_lines(generate_routes(members, count, version), rib_type, version))
@@ -0,0 +1,454 @@
+"""Persistent history of the RIB comparisons, for drift trends and diffs between runs.
+
+Every comparison is recorded in a SQLite database in the resources directory: its route server, RIB dump files,
+timestamp and counts, and the keys of its differences. The stored keys are the route keys of `route_keys`, with
+the AS path ID replaced by the ID of the path in the database, so that they identify the same route across runs.
+They are stored as fixed-size big-endian blobs, which sort like the keys.
+
+The history and the diff of two runs are answered from the indexes, without running the comparisons again. Being
+on disk, the history is shared by the backend workers and survives restarts.
+
+Comparisons are written in the background, on a connection of their own, so that neither the compare requests nor
+the history reads wait for the difference sets to be stored. The runs of each route server are bounded both in
+number and in stored differences.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from comparisons import SIDE_LIVE, SIDE_UPLOADED, RibComparison, route_to_dict
+from config import api_settings
+from rib_parser import RouteKey
+from route_keys import RouteKeyCodec, key_path_id, key_prefix, pack_key, unpack_prefix
+
+logger = logging.getLogger(__name__)
+
+SIDES = (SIDE_LIVE, SIDE_UPLOADED)
+
+TREND_IMPROVING = "improving"
+TREND_WORSENING = "worsening"
+TREND_STABLE = "stable"
+
+# Bytes of a stored route key: address family bit, address, prefix length and AS path ID
+_KEY_BYTES = 22
+# Milliseconds a worker waits for another one writing to the history
+_BUSY_TIMEOUT_MS = 10000
+# Maximum number of parameters bound to a single IN query
+_QUERY_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS comparisons (
+    id INTEGER PRIMARY KEY,
+    comparison_id TEXT NOT NULL UNIQUE,
+    route_server TEXT NOT NULL,
+    resource_files TEXT NOT NULL,
+    resource_key TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    live_count INTEGER NOT NULL,
+    uploaded_count INTEGER NOT NULL,
+    only_in_live_count INTEGER NOT NULL,
+    only_in_uploaded_count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS comparisons_route_server ON comparisons (route_server, resource_key, created_at);
+CREATE INDEX IF NOT EXISTS comparisons_created_at ON comparisons (created_at);
+CREATE TABLE IF NOT EXISTS as_paths (
+    id INTEGER PRIMARY KEY,
+    as_path TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS differences (
+    run INTEGER NOT NULL,
+    side INTEGER NOT NULL,
+    route_key BLOB NOT NULL,
+    PRIMARY KEY (run, side, route_key)
+) WITHOUT ROWID;
+"""
+
+
+def resource_key(resource_files: Iterable[str]) -> str:
+    """Return the key identifying a set of RIB dump files, whatever their order."""
+    return json.dumps(sorted(resource_files))
+
+
+class ComparisonHistory:
+    """Indexed store of the past RIB comparisons."""
+
+    def __init__(self, db_path: str, max_runs: int, max_differences: int = 0):
+        """Initialize the history.
+
+        Args:
+            db_path: Path of the SQLite database
+            max_runs: Comparison runs kept per route server, 0 disables the history
+            max_differences: Differences kept per route server, 0 for no limit. The oldest runs are dropped beyond
+                it, the most recent run is always kept
+        """
+        self.db_path = db_path
+        self.max_runs = max_runs
+        self.max_differences = max_differences
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        # Only used by the writer thread, through the executor
+        self._writer: Optional[sqlite3.Connection] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # AS paths are never deleted nor renumbered, so they are cached: by the writer to store the keys, and by
+        # the readers to decode them
+        self._path_ids: Dict[str, int] = {}
+        self._paths: Dict[int, Tuple[str, ...]] = {}
+
+    def open(self) -> None:
+        """Open the history, creating the database if needed."""
+        with self._lock:
+            if self._connection is not None or self.max_runs == 0:
+                return
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            connection = self._connect()
+            connection.executescript(_SCHEMA)
+            self._connection = connection
+            self._writer = self._connect()
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="comparison-history")
+            logger.info(f"RIB comparison history opened ({self.db_path})")
+
+    def close(self) -> None:
+        """Close the history, once the comparisons waiting to be recorded are written."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        with self._lock:
+            for connection in (self._connection, self._writer):
+                if connection is not None:
+                    connection.close()
+            self._connection = self._writer = None
+
+    def record(self, comparison: RibComparison) -> None:
+        """Store a comparison in the background, dropping the oldest runs of its route server beyond the limits.
+
+        The comparison is listed in the history once written. Failures are logged, not raised.
+
+        Args:
+            comparison: Comparison to store
+        """
+        with self._lock:
+            if self._executor is None:
+                return
+            self._executor.submit(self._write, comparison)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        # Shared by the backend workers: readers do not block the writer, writers wait for each other
+        connection.execute(f"PRAGMA busy_timeout = {_BUSY_TIMEOUT_MS}")
+        connection.execute("PRAGMA journal_mode = WAL")
+        return connection
+
+    def _write(self, comparison: RibComparison) -> None:
+        """Write a comparison, on the writer connection. Runs on the executor thread only."""
+        codec = comparison.codec
+        sides = (comparison.only_in_live, comparison.only_in_uploaded)
+        path_ids = {key_path_id(key) for keys in sides for key in keys}
+        as_paths = {path_id: json.dumps(list(codec.get_path(path_id))) for path_id in path_ids}
+
+        writer = self._writer
+        writer.execute("BEGIN IMMEDIATE")
+        try:
+            stored_ids = {path_id: self._intern_path(as_path) for path_id, as_path in as_paths.items()}
+            run = writer.execute(
+                "INSERT INTO comparisons (comparison_id, route_server, resource_files, resource_key, created_at, "
+                "live_count, uploaded_count, only_in_live_count, only_in_uploaded_count) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (comparison.id, comparison.route_server, json.dumps(comparison.resource_files),
+                 resource_key(comparison.resource_files), comparison.created_at, comparison.live_count,
+                 comparison.uploaded_count, len(comparison.only_in_live), len(comparison.only_in_uploaded)),
+            ).lastrowid
+            for side, keys in enumerate(sides):
+                writer.executemany(
+                    "INSERT OR IGNORE INTO differences (run, side, route_key) VALUES (?, ?, ?)",
+                    ((run, side, _store_key(key, stored_ids[key_path_id(key)])) for key in keys),
+                )
+            # The runs beyond the limits, most recent first: their rank and the differences up to them
+            pruned = [
+                (row["id"],) for row in writer.execute(
+                    "SELECT id FROM (SELECT id, ROW_NUMBER() OVER runs AS rank, "
+                    "SUM(only_in_live_count + only_in_uploaded_count) OVER runs AS differences "
+                    "FROM comparisons WHERE route_server = ? "
+                    "WINDOW runs AS (ORDER BY created_at DESC, id DESC ROWS UNBOUNDED PRECEDING)) "
+                    "WHERE rank > 1 AND (rank > ? OR (? > 0 AND differences > ?))",
+                    (comparison.route_server, self.max_runs, self.max_differences, self.max_differences),
+                )
+            ]
+            writer.executemany("DELETE FROM differences WHERE run = ?", pruned)
+            writer.executemany("DELETE FROM comparisons WHERE id = ?", pruned)
+            writer.execute("COMMIT")
+        except Exception as e:
+            writer.execute("ROLLBACK")
+            # The cached IDs of the paths inserted by the transaction are not valid anymore
+            self._path_ids.clear()
+            logger.warning(f"Failed to record RIB comparison '{comparison.id}' in the history: {str(e)}")
+            return
+        logger.debug(
+            f"RIB comparison '{comparison.id}' recorded in the history, {len(pruned)} older runs of "
+            f"'{comparison.route_server}' dropped"
+        )
+
+    def get(self, comparison_id: str) -> Optional[Dict[str, Any]]:
+        """Get the summary of a recorded comparison.
+
+        Args:
+            comparison_id: ID of the comparison
+
+        Returns:
+            Optional[Dict[str, Any]]: The summary, as returned by `RibComparison.summary()`, None if not recorded
+        """
+        with self._lock:
+            if self._connection is None:
+                return None
+            row = self._connection.execute(
+                "SELECT * FROM comparisons WHERE comparison_id = ?", (comparison_id,)
+            ).fetchone()
+        return _to_dict(row) if row is not None else None
+
+    def list(self, route_server: Optional[str] = None, resource_files: Optional[List[str]] = None,
+             since: Optional[float] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """List the recorded comparisons, most recent first.
+
+        Each run carries the change of its number of differences since the previous run of the same route server
+        on the same RIB dump files, even if that run is outside the listed ones.
+
+        Args:
+            route_server: Only list the runs of this route server
+            resource_files: Only list the runs against exactly these RIB dump files
+            since: Only list the runs started at or after this timestamp
+            limit: Maximum number of runs listed
+
+        Returns:
+            List[Dict[str, Any]]: Summaries of the runs, with their differences_delta (None for a first run)
+        """
+        query = (
+            "SELECT *, only_in_live_count + only_in_uploaded_count - LAG(only_in_live_count + only_in_uploaded_count) "
+            "OVER (PARTITION BY route_server, resource_key ORDER BY created_at) AS differences_delta "
+            "FROM comparisons WHERE 1 = 1"
+        )
+        params: List[Any] = []
+        if route_server is not None:
+            query += " AND route_server = ?"
+            params.append(route_server)
+        if resource_files:
+            query += " AND resource_key = ?"
+            params.append(resource_key(resource_files))
+        # The period is filtered once the deltas are computed, so that the oldest listed run has one
+        query = f"SELECT * FROM ({query}) WHERE created_at >= ? ORDER BY created_at DESC LIMIT ?"
+        params.extend([since or 0, limit])
+
+        with self._lock:
+            if self._connection is None:
+                return []
+            rows = self._connection.execute(query, params).fetchall()
+        return [{**_to_dict(row), "differences_delta": row["differences_delta"]} for row in rows]
+
+    def previous(self, comparison_id: str) -> Optional[str]:
+        """Get the ID of the run preceding a comparison, on the same route server and RIB dump files.
+
+        Args:
+            comparison_id: ID of the comparison
+
+        Returns:
+            Optional[str]: ID of the previous run, None if the comparison is the first one or not recorded
+        """
+        with self._lock:
+            if self._connection is None:
+                return None
+            row = self._connection.execute(
+                "SELECT p.comparison_id FROM comparisons c JOIN comparisons p "
+                "ON p.route_server = c.route_server AND p.resource_key = c.resource_key "
+                "AND p.created_at < c.created_at "
+                "WHERE c.comparison_id = ? ORDER BY p.created_at DESC LIMIT 1",
+                (comparison_id,),
+            ).fetchone()
+        return row["comparison_id"] if row is not None else None
+
+    def diff(self, base_id: str, comparison_id: str, limit: int = 100) -> Optional[Dict[str, Any]]:
+        """Diff the differences of two recorded comparisons.
+
+        For each side, the differences of the base run absent from the other one are resolved, the ones only in the
+        other run are introduced, and the ones in both persist.
+
+        Args:
+            base_id: ID of the earlier comparison
+            comparison_id: ID of the later comparison
+            limit: Maximum number of resolved and introduced routes returned per side
+
+        Returns:
+            Optional[Dict[str, Any]]: Summaries of both runs, and per side the counts and first routes of each
+                change, None if a comparison is not recorded
+        """
+        with self._lock:
+            if self._connection is None:
+                return None
+            runs = {
+                row["comparison_id"]: row for row in self._connection.execute(
+                    "SELECT * FROM comparisons WHERE comparison_id IN (?, ?)", (base_id, comparison_id)
+                )
+            }
+            if base_id not in runs or comparison_id not in runs:
+                return None
+            base, current = runs[base_id], runs[comparison_id]
+
+            sides = []
+            for side, name in enumerate(SIDES):
+                resolved_count, resolved = self._only_in(base["id"], current["id"], side, limit)
+                introduced_count, introduced = self._only_in(current["id"], base["id"], side, limit)
+                sides.append({
+                    "side": name,
+                    "resolved_count": resolved_count,
+                    "introduced_count": introduced_count,
+                    "persisting_count": base[f"only_in_{name}_count"] - resolved_count,
+                    "resolved": resolved,
+                    "introduced": introduced,
+                })
+            self._load_paths(
+                key_path_id(key) for side in sides for change in ("resolved", "introduced") for key in side[change]
+            )
+            for side in sides:
+                for change in ("resolved", "introduced"):
+                    side[change] = [route_to_dict(self._decode(key)) for key in side[change]]
+
+        base_summary, summary = _to_dict(base), _to_dict(current)
+        return {
+            "base": base_summary,
+            "comparison": summary,
+            "differences_delta": summary["differences_count"] - base_summary["differences_count"],
+            "sides": sides,
+        }
+
+    def load(self, comparison_id: str) -> Optional[RibComparison]:
+        """Rebuild a recorded comparison, to page through its differences.
+
+        Args:
+            comparison_id: ID of the comparison
+
+        Returns:
+            Optional[RibComparison]: The comparison, None if not recorded
+        """
+        with self._lock:
+            if self._connection is None:
+                return None
+            row = self._connection.execute(
+                "SELECT * FROM comparisons WHERE comparison_id = ?", (comparison_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            stored = [[], []]
+            for difference in self._connection.execute(
+                "SELECT side, route_key FROM differences WHERE run = ? ORDER BY side, route_key", (row["id"],)
+            ):
+                stored[difference["side"]].append(int.from_bytes(difference["route_key"], "big"))
+            self._load_paths(key_path_id(key) for keys in stored for key in keys)
+            paths = dict(self._paths)
+
+        # Keys are renumbered with a codec of their own, as if the comparison had just run
+        codec = RouteKeyCodec()
+        sides = [
+            sorted(pack_key(*key_prefix(key), codec.intern_path(paths[key_path_id(key)])) for key in keys)
+            for keys in stored
+        ]
+        return RibComparison(
+            route_server=row["route_server"],
+            resource_files=json.loads(row["resource_files"]),
+            live_count=row["live_count"],
+            uploaded_count=row["uploaded_count"],
+            codec=codec,
+            only_in_live=sides[0],
+            only_in_uploaded=sides[1],
+            comparison_id=row["comparison_id"],
+            created_at=row["created_at"],
+        )
+
+    def _only_in(self, run: int, other: int, side: int, limit: int) -> Tuple[int, List[int]]:
+        """Count the differences of a run absent from another one, returning the first ones as stored keys."""
+        count = 0
+        keys = []
+        for row in self._connection.execute(
+            "SELECT d.route_key FROM differences d WHERE d.run = ? AND d.side = ? AND NOT EXISTS "
+            "(SELECT 1 FROM differences o WHERE o.run = ? AND o.side = d.side AND o.route_key = d.route_key) "
+            "ORDER BY d.route_key",
+            (run, side, other),
+        ):
+            if count < limit:
+                keys.append(int.from_bytes(row["route_key"], "big"))
+            count += 1
+        return count, keys
+
+    def _intern_path(self, as_path: str) -> int:
+        """Return the ID of an AS path in the database, on the writer connection."""
+        path_id = self._path_ids.get(as_path)
+        if path_id is None:
+            self._writer.execute("INSERT OR IGNORE INTO as_paths (as_path) VALUES (?)", (as_path,))
+            path_id = self._writer.execute(
+                "SELECT id FROM as_paths WHERE as_path = ?", (as_path,)
+            ).fetchone()["id"]
+            self._path_ids[as_path] = path_id
+        return path_id
+
+    def _load_paths(self, path_ids: Iterable[int]) -> None:
+        """Cache the AS paths of stored keys, the ones recorded by other workers included."""
+        missing = sorted({path_id for path_id in path_ids if path_id not in self._paths})
+        for start in range(0, len(missing), _QUERY_CHUNK):
+            chunk = missing[start:start + _QUERY_CHUNK]
+            for row in self._connection.execute(
+                f"SELECT id, as_path FROM as_paths WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+            ):
+                self._paths[row["id"]] = tuple(json.loads(row["as_path"]))
+
+    def _decode(self, key: int) -> RouteKey:
+        afi, address, prefixlen = key_prefix(key)
+        return unpack_prefix(afi, address, prefixlen), self._paths[key_path_id(key)]
+
+
+def _store_key(key: int, path_id: int) -> bytes:
+    """Return the stored form of a route key, with the AS path ID of the database."""
+    return pack_key(*key_prefix(key), path_id).to_bytes(_KEY_BYTES, "big")
+
+
+def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+    resource_files = json.loads(row["resource_files"])
+    return {
+        "comparison_id": row["comparison_id"],
+        "created_at": row["created_at"],
+        "route_server": row["route_server"],
+        "resource_file": ", ".join(resource_files),
+        "resource_files": resource_files,
+        "live_rib_lines": row["live_count"],
+        "uploaded_rib_lines": row["uploaded_count"],
+        "only_in_live_count": row["only_in_live_count"],
+        "only_in_uploaded_count": row["only_in_uploaded_count"],
+        "differences_count": row["only_in_live_count"] + row["only_in_uploaded_count"],
+    }
+
+
+def trend(runs: List[Dict[str, Any]]) -> Optional[str]:
+    """Return whether the differences decrease or increase over runs listed most recent first.
+
+    Args:
+        runs: Runs returned by `ComparisonHistory.list()`
+
+    Returns:
+        Optional[str]: improving, worsening or stable, None with less than two runs
+    """
+    if len(runs) < 2:
+        return None
+    change = runs[0]["differences_count"] - runs[-1]["differences_count"]
+    if change < 0:
+        return TREND_IMPROVING
+    return TREND_WORSENING if change > 0 else TREND_STABLE
+
+
+# Global history of the RIB comparisons
+comparison_history = ComparisonHistory(
+    os.path.join("digital_twin", "resources", ".comparisons.sqlite3"),
+    api_settings.rib_comparison_history_max,
+    api_settings.rib_comparison_history_max_differences,
+)
@@ -0,0 +1,186 @@
+"""Server-side storage of RIB comparison results, for paginated and streamed retrieval."""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from config import api_settings
+from rib_parser import RouteKey, format_route
+from route_keys import RouteKeyCodec, key_afi, key_path_id, key_prefix, pack_prefix
+
+SIDE_LIVE = "live"
+SIDE_UPLOADED = "uploaded"
+
+
+class RouteFilter:
+    """Filter of comparison routes by prefix, ASN and address family."""
+
+    def __init__(self, prefix: Optional[str] = None, asn: Optional[int] = None, afi: Optional[int] = None):
+        """Initialize the filter, unset criteria match every route.
+
+        Args:
+            prefix: Only match networks equal to or more specific than this prefix
+            asn: Only match routes whose AS path contains this ASN
+            afi: Only match routes of this address family (4 or 6)
+
+        Raises:
+            ValueError: If the prefix or the address family are not valid
+        """
+        self.prefix = pack_prefix(prefix) if prefix else None
+        if prefix and self.prefix is None:
+            raise ValueError(f"Invalid prefix: {prefix}")
+        self.asn = str(asn) if asn is not None else None
+        if afi not in (None, 4, 6):
+            raise ValueError(f"Invalid address family: {afi}")
+        self.afi = afi
+
+    def matcher(self, codec: RouteKeyCodec) -> Callable[[int], bool]:
+        """Return a predicate matching the route keys produced by a codec."""
+        path_ids = codec.path_ids_with_asn(self.asn) if self.asn is not None else None
+
+        def match(key: int) -> bool:
+            if self.afi is not None and key_afi(key) != self.afi:
+                return False
+            if path_ids is not None and key_path_id(key) not in path_ids:
+                return False
+            if self.prefix is not None:
+                afi, address, prefixlen = key_prefix(key)
+                filter_afi, filter_address, filter_prefixlen = self.prefix
+                host_bits = (32 if afi == 4 else 128) - filter_prefixlen
+                if afi != filter_afi or prefixlen < filter_prefixlen or \
+                        address >> host_bits != filter_address >> host_bits:
+                    return False
+            return True
+
+        return match
+
+
+class RibComparison:
+    """Result of a RIB comparison, with the differences held as sorted route keys.
+
+    Routes are only decoded and formatted for the pages being returned.
+    """
+
+    def __init__(self, route_server: str, resource_files: List[str], live_count: int, uploaded_count: int,
+                 codec: RouteKeyCodec, only_in_live: List[int], only_in_uploaded: List[int],
+                 comparison_id: Optional[str] = None, created_at: Optional[float] = None):
+        self.id = comparison_id or uuid.uuid4().hex
+        self.created_at = created_at if created_at is not None else time.time()
+        self.route_server = route_server
+        self.resource_files = resource_files
+        self.live_count = live_count
+        self.uploaded_count = uploaded_count
+        self.codec = codec
+        self.only_in_live = only_in_live
+        self.only_in_uploaded = only_in_uploaded
+
+    @property
+    def differences_count(self) -> int:
+        """Total number of differences."""
+        return len(self.only_in_live) + len(self.only_in_uploaded)
+
+    def get_routes(self, side: str) -> List[int]:
+        """Get the keys of the differences of one side of the comparison.
+
+        Raises:
+            ValueError: If the side is not valid
+        """
+        if side == SIDE_LIVE:
+            return self.only_in_live
+        elif side == SIDE_UPLOADED:
+            return self.only_in_uploaded
+
+        raise ValueError(f"Invalid side: {side}")
+
+    def page(self, side: str, cursor: int = 0, limit: int = 100, route_filter: Optional[RouteFilter] = None,
+             skip: int = 0) -> Tuple[List[RouteKey], Optional[int]]:
+        """Return a page of the differences of one side.
+
+        Args:
+            side: Side of the comparison (live or uploaded)
+            cursor: Position to start scanning from, as returned by the previous page
+            limit: Maximum number of routes returned
+            route_filter: Optional filter of the returned routes
+            skip: Number of matching routes to skip before the page, for page-number based access
+
+        Returns:
+            Tuple[List[RouteKey], Optional[int]]: The routes and the cursor of the next page, None on the last page
+        """
+        keys = self.get_routes(side)
+        match = route_filter.matcher(self.codec) if route_filter is not None else None
+        page = []
+        position = cursor
+        while position < len(keys) and len(page) < limit:
+            key = keys[position]
+            position += 1
+            if match is None or match(key):
+                if skip > 0:
+                    skip -= 1
+                else:
+                    page.append(self.codec.decode(key))
+        return page, (position if position < len(keys) else None)
+
+    def iter_routes(self, side: str, route_filter: Optional[RouteFilter] = None) -> Iterator[RouteKey]:
+        """Iterate over the differences of one side."""
+        match = route_filter.matcher(self.codec) if route_filter is not None else None
+        for key in self.get_routes(side):
+            if match is None or match(key):
+                yield self.codec.decode(key)
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the comparison metadata and counts."""
+        return {
+            "comparison_id": self.id,
+            "created_at": self.created_at,
+            "route_server": self.route_server,
+            "resource_file": ", ".join(self.resource_files),
+            "resource_files": self.resource_files,
+            "live_rib_lines": self.live_count,
+            "uploaded_rib_lines": self.uploaded_count,
+            "only_in_live_count": len(self.only_in_live),
+            "only_in_uploaded_count": len(self.only_in_uploaded),
+            "differences_count": self.differences_count,
+        }
+
+
+class ComparisonStore:
+    """Keeps the most recent RIB comparisons in memory."""
+
+    def __init__(self, max_comparisons: int):
+        self._comparisons: "OrderedDict[str, RibComparison]" = OrderedDict()
+        self._max_comparisons = max_comparisons
+        self._lock = threading.Lock()
+
+    def add(self, comparison: RibComparison) -> None:
+        """Store a comparison, dropping the oldest ones beyond the limit."""
+        with self._lock:
+            self._comparisons[comparison.id] = comparison
+            while len(self._comparisons) > self._max_comparisons:
+                self._comparisons.popitem(last=False)
+
+    def get(self, comparison_id: str) -> Optional[RibComparison]:
+        """Get a comparison by its ID."""
+        with self._lock:
+            return self._comparisons.get(comparison_id)
+
+
+def route_afi(route: RouteKey) -> int:
+    """Return the address family (4 or 6) of a route."""
+    return 6 if ":" in route[0] else 4
+
+
+def route_to_dict(route: RouteKey) -> Dict[str, Any]:
+    """Return the serializable representation of a route."""
+    network, as_path = route
+    return {
+        "afi": route_afi(route),
+        "network": network,
+        "as_path": list(as_path),
+        "route": format_route(route),
+    }
+
+
+# Global comparisons store
+comparison_store = ComparisonStore(max_comparisons=api_settings.rib_comparisons_max)
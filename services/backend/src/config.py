@@ -0,0 +1,75 @@
+"""API configuration, loaded from environment variables."""
+
+from typing import Optional
+
+from pydantic import Field
+from pydantic_settings import BaseSettings
+
+
+class ApiSettings(BaseSettings):
+    """Tunables of the dashboard backend.
+
+    Every field can be overridden by the environment variable with the same name (case-insensitive).
+    """
+    dump_cache_max_mb: int = Field(1024, description="Memory budget of the parsed dumps cache, in MB")
+    dump_cache_content_hash: bool = Field(
+        False, description="Key the parsed dumps cache on the SHA-256 of the files instead of their mtime and size"
+    )
+    table_dump_snapshots_max: int = Field(
+        4, ge=0,
+        description="Parsed table dumps, and route indexes, kept on disk for fast restarts, 0 disables the snapshots"
+    )
+    rib_comparisons_max: int = Field(20, description="Number of RIB comparison results kept for pagination")
+    rib_comparison_history_max: int = Field(
+        200, ge=0, description="RIB comparison runs kept in the history per route server, 0 disables the history"
+    )
+    rib_comparison_history_max_differences: int = Field(
+        1000000, ge=0, description="Differences kept in the history per route server, oldest runs first, 0 for no limit"
+    )
+    rib_compare_max_parallel: int = Field(4, description="Maximum route servers compared concurrently in a batch")
+    stats_sample_interval: float = Field(2.0, gt=0, description="Seconds between two samples of the machines stats")
+    stats_history_seconds: float = Field(900, gt=0, description="Seconds of machines stats history kept per machine")
+    reload_max_parallel: int = Field(
+        8, ge=1, description="Maximum device configurations pushed concurrently by a reload"
+    )
+    exec_max_parallel: int = Field(16, description="Maximum commands executed concurrently by a bulk exec")
+    exec_bulk_deadline: float = Field(
+        600, gt=0, description="Seconds after which the commands of a bulk exec still running or queued are stopped"
+    )
+    exec_stream_max_bytes: int = Field(
+        64 * 1024 * 1024, description="Maximum output forwarded by a streamed exec before the command is stopped"
+    )
+    upload_max_bytes: int = Field(20 * 1024 ** 3, description="Maximum size of an uploaded resource file")
+    upload_chunk_bytes: int = Field(1024 * 1024, description="Size of the chunks uploaded files are written by")
+    upload_session_ttl_seconds: int = Field(
+        24 * 3600, description="Seconds after which an incomplete resumable upload is deleted"
+    )
+    resource_catalogue_scan_interval: float = Field(
+        10.0, gt=0, description="Seconds between two scans of the resources directory for the catalogue"
+    )
+    preparse_max_workers: int = Field(
+        2, ge=0, description="Worker processes pre-parsing the uploaded RIB dumps, 0 disables the pre-parsing"
+    )
+    backend_workers: int = Field(
+        1, ge=1, description="Number of uvicorn workers the backend runs as, the state is only shared between several"
+    )
+    shared_state_poll_interval: float = Field(
+        0.5, gt=0, description="Seconds between two polls of the state shared by the backend workers"
+    )
+    reattach_on_startup: bool = Field(
+        True, description="Reattach to the digital twin deployed before a restart instead of leaving it unmanaged, "
+                          "a worker taking over from an exited leader always reattaches"
+    )
+    archive_max_files: int = Field(100000, description="Maximum number of files extracted from an uploaded archive")
+    simulation: bool = Field(
+        False, description="Serve the Kathara calls with an in-memory simulator instead of containers, for load tests"
+    )
+    simulation_exec_latency: float = Field(0.05, ge=0, description="Seconds each simulated exec takes to answer")
+    simulation_deploy_latency: float = Field(0.0, ge=0, description="Seconds each simulated machine takes to deploy")
+    simulation_rib_output: Optional[str] = Field(
+        None, description="Resource file returned by the simulated route servers as their RIB, the RIB dumps if unset"
+    )
+
+
+# Global settings instance
+api_settings = ApiSettings()
@@ -0,0 +1,89 @@
+"""Record of the deployed network scenario, so that a restarted backend reattaches to the running lab.
+
+The record is written once the digital twin is deployed, updated by the reloads and deleted when it is stopped.
+It keeps what is needed to rebuild the network scenario without deploying it again: the lab identity, the device
+limit, and the hashes of the inputs the deployed configurations were rendered from.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEPLOYMENT_RECORD_VERSION = 1
+
+
+class DeploymentRecord:
+    """JSON file describing the deployed network scenario."""
+
+    def __init__(self, path: str):
+        """Initialize the record.
+
+        Args:
+            path: Path of the record file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Load the record.
+
+        Returns:
+            Optional[Dict[str, Any]]: The record, None if there is none or it is not readable
+        """
+        try:
+            with open(self.path) as f:
+                record = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Deployment record {self.path} ignored: {str(e)}")
+            return None
+
+        if record.get("version") != DEPLOYMENT_RECORD_VERSION:
+            logger.warning(f"Deployment record {self.path} ignored: unsupported version {record.get('version')}")
+            return None
+        return record
+
+    def save(self, record: Dict[str, Any]) -> None:
+        """Write the record, atomically replacing the file.
+
+        Args:
+            record: Description of the deployed network scenario
+        """
+        content = json.dumps({**record, "version": DEPLOYMENT_RECORD_VERSION}, indent=4)
+        with self._lock:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(prefix=".deployment.", dir=directory)
+            try:
+                with os.fdopen(fd, "w") as f:
+                    f.write(content)
+                os.replace(temp_path, self.path)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+
+    def update(self, **fields: Any) -> None:
+        """Update fields of the existing record, if any."""
+        record = self.load()
+        if record is not None:
+            record.update(fields)
+            self.save(record)
+
+    def clear(self) -> None:
+        """Delete the record."""
+        with self._lock:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+
+# Global record, next to the resources and hidden like the uploads in progress
+deployment_record = DeploymentRecord(os.path.join("digital_twin", "resources", ".deployment.json"))
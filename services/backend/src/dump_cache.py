@@ -0,0 +1,217 @@
+"""Content-addressed cache of parsed member dumps and table dumps."""
+
+import hashlib
+import logging
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, Optional, Tuple
+
+from config import api_settings
+
+if TYPE_CHECKING:
+    from snapshots import Snapshot
+
+logger = logging.getLogger(__name__)
+
+
+class DumpCache:
+    """LRU cache of parsed dumps, bounded by a memory budget.
+
+    Values are stored pickled: the pickle size is what is accounted against the budget, and each `get_or_load`
+    unpickles a private clone, so callers can freely mutate what they get (e.g. trimming `entries`).
+    """
+
+    def __init__(self, max_bytes: int, content_hash: bool = False):
+        """Initialize the cache.
+
+        Args:
+            max_bytes: Memory budget for the pickled values
+            content_hash: If True, fingerprint files by SHA-256 of their content instead of mtime and size
+        """
+        self._max_bytes = max_bytes
+        self._content_hash = content_hash
+        self._entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._hashes: Dict[Tuple[str, int, int], str] = {}
+        self._lock = threading.Lock()
+        self._loading_locks: Dict[Hashable, threading.Lock] = {}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def fingerprint(self, path: str) -> Tuple:
+        """Return the cache key component identifying the current content of a file.
+
+        Args:
+            path: Path of the file
+
+        Returns:
+            Tuple: (real path, size, mtime) or (real path, SHA-256) when content hashing is enabled
+
+        Raises:
+            FileNotFoundError: If the file does not exist
+        """
+        real_path = os.path.realpath(path)
+        stat = os.stat(real_path)
+        if not self._content_hash:
+            return real_path, stat.st_size, stat.st_mtime_ns
+
+        # Hashes are memoized on (path, size, mtime), so unchanged files are hashed once
+        stat_key = (real_path, stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            digest = self._hashes.get(stat_key)
+        if digest is None:
+            digest = sha256_file(real_path)
+            with self._lock:
+                self._hashes[stat_key] = digest
+        return real_path, digest
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], snapshot: Optional["Snapshot"] = None) -> Any:
+        """Return a clone of the cached value for `key`, calling `loader` to produce it on a miss.
+
+        Concurrent misses on the same key are serialized, so the loader runs once. With a snapshot, a miss is first
+        looked up on disk, and the value produced by the loader is written to it.
+
+        Args:
+            key: Cache key, including the fingerprints of the source files
+            loader: Callable parsing the value
+            snapshot: Optional snapshot of the value on disk, see `snapshots.py`
+
+        Returns:
+            Any: A private copy of the value
+        """
+        with self._lock:
+            data = self._hit(key)
+            if data is None:
+                loading_lock = self._loading_locks.setdefault(key, threading.Lock())
+        if data is not None:
+            # Unpickled outside any lock, so concurrent readers of the same dump do not wait for each other
+            return pickle.loads(data)
+
+        try:
+            with loading_lock:
+                with self._lock:
+                    # Loaded meanwhile by a concurrent miss
+                    data = self._hit(key)
+                    if data is None:
+                        self._misses += 1
+                if data is None:
+                    value = self._read_snapshot(key, snapshot) if snapshot is not None else None
+                    if value is None:
+                        value = loader()
+                        data = self.put(key, value)
+                        if snapshot is not None and data is not None:
+                            snapshot.write(data)
+                    return value
+        finally:
+            with self._lock:
+                if self._loading_locks.get(key) is loading_lock:
+                    del self._loading_locks[key]
+        return pickle.loads(data)
+
+    def put(self, key: Hashable, value: Any) -> Optional[bytes]:
+        """Store a value, evicting least recently used entries to stay within the memory budget.
+
+        Args:
+            key: Cache key
+            value: Value to store, it must be picklable to be cached
+
+        Returns:
+            Optional[bytes]: The pickled value, None if it is not picklable
+        """
+        try:
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            logger.warning(f"Value for cache key {key} cannot be cached: {str(e)}")
+            return None
+        self.put_pickled(key, data)
+        return data
+
+    def put_pickled(self, key: Hashable, data: bytes) -> None:
+        """Store an already pickled value, e.g. parsed in another process.
+
+        Args:
+            key: Cache key
+            data: Pickled value
+        """
+        if len(data) > self._max_bytes:
+            logger.info(f"Value for cache key {key} ({len(data)} bytes) exceeds the cache budget, not cached")
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = data
+            self._bytes += len(data)
+            while self._bytes > self._max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self._evictions += 1
+
+    def _hit(self, key: Hashable) -> Optional[bytes]:
+        """Get the pickled value of a key, counting a hit, the cache lock must be held."""
+        data = self._entries.get(key)
+        if data is not None:
+            self._entries.move_to_end(key)
+            self._hits += 1
+        return data
+
+    def _read_snapshot(self, key: Hashable, snapshot: "Snapshot") -> Any:
+        data = snapshot.read()
+        if data is None:
+            return None
+        try:
+            value = pickle.loads(data)
+        except Exception as e:
+            # E.g. pickled with classes of another version of the digital twin
+            logger.warning(f"Snapshot of cache key {key} cannot be loaded, discarded: {str(e)}")
+            snapshot.discard()
+            return None
+        self.put_pickled(key, data)
+        return value
+
+    def clear(self) -> None:
+        """Drop all cached values."""
+        with self._lock:
+            self._entries.clear()
+            self._hashes.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return the hit/miss counters and the memory usage of the cache."""
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self._max_bytes,
+            }
+
+
+def sha256_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Compute the SHA-256 of a file, reading it in chunks.
+
+    Args:
+        path: Path of the file
+        chunk_size: Size of the read chunks
+
+    Returns:
+        str: Hex digest of the file content
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Global cache instance
+dump_cache = DumpCache(
+    max_bytes=api_settings.dump_cache_max_mb * 1024 * 1024,
+    content_hash=api_settings.dump_cache_content_hash,
+)
@@ -0,0 +1,80 @@
+"""Server-sent events broadcast to the dashboard clients."""
+
+import asyncio
+import json
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Queued in place of the events a slow client missed: the stream sends it a full snapshot instead
+RESYNC = None
+
+Event = Optional[Tuple[str, Any]]
+
+
+def format_event(event: str, data: Any) -> str:
+    """Format an event in the text/event-stream wire format."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class EventBroker:
+    """Fans out events published from any thread to the subscribed event loop queues."""
+
+    def __init__(self, max_queued_events: int = 256):
+        """Initialize the broker.
+
+        Args:
+            max_queued_events: Events buffered per subscriber before it is asked to resync
+        """
+        self._max_queued_events = max_queued_events
+        self._subscribers: Dict[asyncio.Queue, asyncio.AbstractEventLoop] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> asyncio.Queue:
+        """Register a subscriber. Must be called from the event loop that consumes the queue."""
+        queue = asyncio.Queue(maxsize=self._max_queued_events)
+        with self._lock:
+            self._subscribers[queue] = asyncio.get_running_loop()
+        logger.debug(f"Events subscriber added ({len(self._subscribers)} connected)")
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        """Remove a subscriber."""
+        with self._lock:
+            self._subscribers.pop(queue, None)
+        logger.debug(f"Events subscriber removed ({len(self._subscribers)} connected)")
+
+    def subscribers_count(self) -> int:
+        """Number of connected subscribers."""
+        return len(self._subscribers)
+
+    def publish(self, event: str, data: Any) -> None:
+        """Send an event to every subscriber. Safe to call from any thread.
+
+        Args:
+            event: Event name
+            data: JSON serializable payload
+        """
+        with self._lock:
+            subscribers = list(self._subscribers.items())
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._enqueue, queue, (event, data))
+            except RuntimeError:
+                # The loop of the subscriber is closed
+                self.unsubscribe(queue)
+
+    @staticmethod
+    def _enqueue(queue: asyncio.Queue, item: Event) -> None:
+        if queue.full():
+            # Deltas cannot be skipped: drop the backlog and let the stream send a snapshot
+            while not queue.empty():
+                queue.get_nowait()
+            item = RESYNC
+        queue.put_nowait(item)
+
+
+# Global broker instance
+event_broker = EventBroker()
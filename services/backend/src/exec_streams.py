@@ -0,0 +1,181 @@
+"""Streamed command executions on the digital twin machines, with a byte cap and cancellation.
+
+The command is started by a shell that first prints its PID, so a cancelled or capped execution can be killed in
+the machine instead of being left running (e.g. a `tcpdump`). The shell then replaces itself with the command, which
+is passed as arguments and split as /machines/exec splits it, so it keeps that PID and gets no shell semantics.
+"""
+
+import logging
+import shlex
+import threading
+import time
+import uuid
+from typing import Dict, Iterator, Optional
+
+from Kathara.manager.Kathara import Kathara
+
+logger = logging.getLogger(__name__)
+
+_PID_MARKER = b"__EXEC_PID__:"
+# Output read before giving up on finding the PID marker, e.g. if the machine has no `sh`
+_PID_MARKER_MAX_BYTES = 256
+
+EXEC_RUNNING = "running"
+EXEC_COMPLETED = "completed"
+EXEC_CANCELLED = "cancelled"
+EXEC_TRUNCATED = "truncated"
+EXEC_FAILED = "failed"
+
+
+class ExecSession:
+    """A streamed execution of a command on a machine."""
+
+    def __init__(self, machine_name: str, command: str, max_bytes: int):
+        """Initialize the session.
+
+        Args:
+            machine_name: Name of the machine
+            command: Command to execute
+            max_bytes: Bytes of output forwarded before the execution is stopped
+        """
+        self.id = uuid.uuid4().hex
+        self.machine_name = machine_name
+        self.command = command
+        self.max_bytes = max_bytes
+        self.status = EXEC_RUNNING
+        self.bytes_sent = 0
+        self.pid: Optional[int] = None
+        self.started_at = time.time()
+        self._cancelled = threading.Event()
+        self._killed = False
+        self._lock = threading.Lock()
+
+    def is_cancelled(self) -> bool:
+        """Check if the session has been cancelled."""
+        return self._cancelled.is_set()
+
+    def cancel(self, lab) -> None:
+        """Stop forwarding the output and kill the command in the machine."""
+        self._cancelled.set()
+        self.kill(lab)
+
+    def kill(self, lab) -> None:
+        """Kill the command in the machine, if its PID is known and it was not killed already."""
+        with self._lock:
+            if self._killed or self.pid is None:
+                return
+            self._killed = True
+
+        try:
+            Kathara.get_instance().exec(
+                machine_name=self.machine_name, command=f"kill {self.pid}", lab=lab, stream=False
+            )
+        except Exception as e:
+            logger.warning(f"Failed to kill exec {self.id} on machine '{self.machine_name}': {str(e)}")
+
+
+def _wrap_command(command: str) -> str:
+    script = f'echo {_PID_MARKER.decode()}$$; exec "$@"'
+    return shlex.join(["sh", "-c", script, "sh", *shlex.split(command)])
+
+
+def stream_exec(session: ExecSession, lab) -> Iterator[bytes]:
+    """Execute the command of a session, yielding its output while it is produced.
+
+    This is blocking and meant to be iterated outside the event loop. The iteration ends when the command exits,
+    when the session is cancelled, or when `max_bytes` have been yielded; a notice line is yielded in the last two
+    cases.
+
+    Args:
+        session: Session to execute
+        lab: Kathara lab of the machine
+
+    Yields:
+        bytes: Output chunks
+    """
+    exec_stream = Kathara.get_instance().exec(
+        machine_name=session.machine_name, command=_wrap_command(session.command), lab=lab, stream=True
+    )
+    header = b""
+    try:
+        while not session.is_cancelled():
+            try:
+                stdout, stderr = next(exec_stream)
+            except StopIteration:
+                break
+
+            chunk = (stdout or b"") + (stderr or b"")
+            if session.pid is None and header is not None:
+                # The first line carries the PID of the command, it is not part of its output
+                header += chunk
+                if b"\n" not in header and len(header) < _PID_MARKER_MAX_BYTES:
+                    continue
+                first_line, _, chunk = header.partition(b"\n")
+                if first_line.startswith(_PID_MARKER):
+                    try:
+                        session.pid = int(first_line[len(_PID_MARKER):].strip())
+                    except ValueError:
+                        chunk = header
+                    if session.is_cancelled():
+                        # Cancelled before its PID was known
+                        session.kill(lab)
+                else:
+                    chunk = header
+                header = None
+
+            if not chunk:
+                continue
+
+            remaining = session.max_bytes - session.bytes_sent
+            if len(chunk) > remaining:
+                session.bytes_sent += remaining
+                if remaining > 0:
+                    yield chunk[:remaining]
+                session.status = EXEC_TRUNCATED
+                session.kill(lab)
+                yield f"\n[output truncated after {session.max_bytes} bytes]\n".encode()
+                return
+
+            session.bytes_sent += len(chunk)
+            yield chunk
+
+        if session.is_cancelled():
+            session.status = EXEC_CANCELLED
+            yield b"\n[cancelled]\n"
+        else:
+            if header:
+                session.bytes_sent += len(header)
+                yield header
+            session.status = EXEC_COMPLETED
+    except Exception:
+        session.status = EXEC_FAILED
+        raise
+
+
+class ExecSessionRegistry:
+    """Tracks the running streamed executions, so they can be cancelled by ID."""
+
+    def __init__(self):
+        self._sessions: Dict[str, ExecSession] = {}
+        self._lock = threading.Lock()
+
+    def create(self, machine_name: str, command: str, max_bytes: int) -> ExecSession:
+        """Create and register a session."""
+        session = ExecSession(machine_name, command, max_bytes)
+        with self._lock:
+            self._sessions[session.id] = session
+        return session
+
+    def get(self, session_id: str) -> Optional[ExecSession]:
+        """Get a running session by its ID."""
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def remove(self, session_id: str) -> None:
+        """Unregister a session."""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+# Global registry instance
+exec_sessions = ExecSessionRegistry()
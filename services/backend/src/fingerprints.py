@@ -0,0 +1,161 @@
+"""Fingerprints of the configurations applied to the digital twin devices, for incremental reloads.
+
+The device info returned by the configuration managers maps each device name to the files copied to it and the
+commands executed after the copy. Its fingerprint covers the content of the referenced files, so a device whose
+rendered configuration did not change can be skipped by a reload.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterable, List, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+_READ_CHUNK_BYTES = 1024 * 1024
+
+
+def _update_with_path(digest, path: str) -> None:
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                file_path = os.path.join(root, name)
+                digest.update(os.path.relpath(file_path, path).encode())
+                _update_with_path(digest, file_path)
+        return
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(_READ_CHUNK_BYTES)
+            if not chunk:
+                break
+            digest.update(chunk)
+
+
+def _update(digest, value: Any) -> None:
+    if isinstance(value, dict):
+        digest.update(b"{")
+        for key in sorted(value, key=str):
+            _update(digest, key)
+            _update(digest, value[key])
+        digest.update(b"}")
+    elif isinstance(value, (list, tuple)):
+        digest.update(b"[")
+        for item in value:
+            _update(digest, item)
+        digest.update(b"]")
+    elif isinstance(value, (set, frozenset)):
+        _update(digest, sorted(value, key=str))
+    elif isinstance(value, bytes):
+        digest.update(b"b:" + value)
+    elif isinstance(value, str):
+        digest.update(b"s:" + value.encode())
+        if os.path.isabs(value) and os.path.exists(value):
+            # A rendered file on the host: its content is what is copied to the device
+            _update_with_path(digest, value)
+    else:
+        digest.update(b"r:" + repr(value).encode())
+
+
+def fingerprint(value: Any) -> str:
+    """Compute the fingerprint of the device info of a single device.
+
+    Args:
+        value: Files and commands of the device, as returned by `get_device_info()`
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    _update(digest, value)
+    return digest.hexdigest()
+
+
+class ReloadPlan(NamedTuple):
+    """Devices of a configuration stage, classified against the previously applied fingerprints."""
+    changed: List[str]
+    unchanged: List[str]
+    new: List[str]
+    deleted: List[str]
+    fingerprints: Dict[str, str]
+
+    def to_push(self) -> List[str]:
+        """Devices whose configuration must be copied and executed."""
+        return self.changed + self.new
+
+
+class DeviceFingerprints:
+    """Fingerprints of the last configuration successfully applied to each device, per configuration stage."""
+
+    def __init__(self):
+        self._applied: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def plan(self, stage: str, device_info: Dict[str, Any], deleted_devices: Iterable[str] = (),
+             force: bool = False) -> ReloadPlan:
+        """Classify the devices of a stage against the applied fingerprints.
+
+        Without a baseline for the stage (or with `force`), every device is considered changed.
+
+        Args:
+            stage: Name of the configuration stage (e.g. "route_servers")
+            device_info: Device info of the stage, keyed by device name
+            deleted_devices: Devices removed from the network scenario
+            force: Push every device regardless of its fingerprint
+
+        Returns:
+            ReloadPlan: Classified devices and their current fingerprints
+        """
+        fingerprints = {name: fingerprint(value) for name, value in device_info.items()}
+        deleted_devices = set(deleted_devices)
+        with self._lock:
+            applied = self._applied.get(stage)
+
+        changed, unchanged, new = [], [], []
+        for name, value in fingerprints.items():
+            if applied is None or force:
+                changed.append(name)
+            elif name not in applied:
+                new.append(name)
+            elif applied[name] != value:
+                changed.append(name)
+            else:
+                unchanged.append(name)
+        deleted = sorted((set(applied or ()) | deleted_devices) - set(fingerprints))
+        return ReloadPlan(changed, unchanged, new, deleted, fingerprints)
+
+    def commit(self, stage: str, plan: ReloadPlan, failed: Iterable[str] = ()) -> None:
+        """Record the outcome of a stage.
+
+        Args:
+            stage: Name of the configuration stage
+            plan: Plan the stage was executed with
+            failed: Devices whose push failed, they lose their fingerprint so the next reload retries them
+        """
+        failed = set(failed)
+        with self._lock:
+            applied = dict(self._applied.get(stage, {}))
+            for name in plan.deleted:
+                applied.pop(name, None)
+            for name, value in plan.fingerprints.items():
+                if name in failed:
+                    applied.pop(name, None)
+                else:
+                    applied[name] = value
+            self._applied[stage] = applied
+
+    def record(self, stage: str, device_info: Dict[str, Any]) -> None:
+        """Record the device info of a stage as applied, e.g. after a full deployment."""
+        fingerprints = {name: fingerprint(value) for name, value in device_info.items()}
+        with self._lock:
+            self._applied[stage] = fingerprints
+
+    def clear(self) -> None:
+        """Forget every fingerprint, e.g. when the digital twin is stopped."""
+        with self._lock:
+            self._applied.clear()
+
+
+# Global fingerprints instance
+device_fingerprints = DeviceFingerprints()
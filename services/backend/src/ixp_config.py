@@ -0,0 +1,177 @@
+"""Cached access to ixp.conf, with content-based ETags and atomic, validated writes."""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from digital_twin.ixp.foundation.dumps.member_dump.member_dump_factory import MemberDumpFactory
+from digital_twin.ixp.foundation.dumps.table_dump.table_dump_factory import TableDumpFactory
+from pydantic import ValidationError
+
+from schemas import IxpConfig
+
+logger = logging.getLogger(__name__)
+
+
+class IxpConfigError(Exception):
+    """Raised when ixp.conf cannot be read or written."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _etag(content: bytes) -> str:
+    return f'"{hashlib.sha256(content).hexdigest()}"'
+
+
+def _format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc']) or 'config'}: {item['msg']}" for item in error.errors()
+    )
+
+
+def _check_dump_types(config: IxpConfig) -> None:
+    """Check that the dump types are the ones the digital twin can load, with the factories its settings go through.
+
+    Raises:
+        IxpConfigError: 422 if a dump type is unknown
+    """
+    errors = []
+    for location, factory, name in (
+        ("peering_configuration.type", MemberDumpFactory, config.peering_configuration.type),
+        ("rib_dumps.type", TableDumpFactory, config.rib_dumps.type),
+    ):
+        try:
+            factory(submodule_package="digital_twin").get_class_from_name(name)
+        except Exception as e:
+            errors.append(f"{location}: unknown dump type '{name}' ({str(e)})")
+    if errors:
+        raise IxpConfigError(f"Invalid configuration: {'; '.join(errors)}", status_code=422)
+
+
+def etag_matches(header: Optional[str], etag: Optional[str]) -> bool:
+    """Check if an If-Match/If-None-Match header value matches an ETag.
+
+    Args:
+        header: Header value, a comma-separated list of ETags or "*"
+        etag: Current ETag, None if the file does not exist
+
+    Returns:
+        bool: True if any of the listed ETags (or "*") matches
+    """
+    if header is None or etag is None:
+        return False
+    candidates = [value.strip() for value in header.split(",")]
+    # Weak comparison: a proxy may have weakened the ETag
+    return "*" in candidates or etag in (value[2:] if value.startswith("W/") else value for value in candidates)
+
+
+class IxpConfigStore:
+    """Keeps the parsed ixp.conf in memory, reloaded when the file modification time or size changes."""
+
+    def __init__(self, path: str):
+        """Initialize the store.
+
+        Args:
+            path: Path of ixp.conf
+        """
+        self.path = path
+        self._cached: Optional[Tuple[Tuple[int, int], Dict[str, Any], str]] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Tuple[Dict[str, Any], Optional[str]]:
+        """Get the configuration and its ETag.
+
+        The returned dictionary is shared with the cache and must not be modified.
+
+        Returns:
+            Tuple[Dict[str, Any], Optional[str]]: The configuration, empty if the file does not exist, and its ETag,
+            None if the file does not exist
+
+        Raises:
+            IxpConfigError: If the file is not valid JSON
+        """
+        with self._lock:
+            return self._load()
+
+    def put(self, config: Dict[str, Any], if_match: Optional[str] = None) -> str:
+        """Validate and write the configuration, replacing the file atomically.
+
+        Args:
+            config: New configuration
+            if_match: If-Match header value; if set, the file is only written if its current ETag matches
+
+        Returns:
+            str: ETag of the written configuration
+
+        Raises:
+            IxpConfigError: 412 if the file changed since the client read it, 422 if the configuration is not valid
+        """
+        try:
+            validated = IxpConfig.model_validate(config)
+        except ValidationError as e:
+            raise IxpConfigError(f"Invalid configuration: {_format_validation_error(e)}", status_code=422)
+        _check_dump_types(validated)
+        content = json.dumps(config, indent=4).encode()
+
+        with self._lock:
+            if if_match is not None:
+                try:
+                    _, current_etag = self._load()
+                except IxpConfigError:
+                    current_etag = None
+                if not etag_matches(if_match, current_etag):
+                    raise IxpConfigError(
+                        "ixp.conf was modified since it was loaded, reload it before saving", status_code=412
+                    )
+
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, temp_path = tempfile.mkstemp(prefix=".ixp.conf.", dir=directory)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(content)
+                    f.flush()
+                    os.fsync(f.fileno())
+                # Keep the permissions of the replaced file, mkstemp creates it readable by the owner only
+                try:
+                    mode = os.stat(self.path).st_mode & 0o777
+                except FileNotFoundError:
+                    mode = 0o644
+                os.chmod(temp_path, mode)
+                os.replace(temp_path, self.path)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+
+            etag = _etag(content)
+            stat = os.stat(self.path)
+            self._cached = ((stat.st_mtime_ns, stat.st_size), config, etag)
+
+        logger.info(f"ixp.conf updated ({etag})")
+        return etag
+
+    def _load(self) -> Tuple[Dict[str, Any], Optional[str]]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._cached = None
+            return {}, None
+
+        version = (stat.st_mtime_ns, stat.st_size)
+        if self._cached is not None and self._cached[0] == version:
+            return self._cached[1], self._cached[2]
+
+        with open(self.path, "rb") as f:
+            content = f.read()
+        try:
+            config = json.loads(content)
+        except ValueError as e:
+            raise IxpConfigError(f"ixp.conf is not valid JSON: {str(e)}", status_code=500)
+        self._cached = (version, config, _etag(content))
+        return config, self._cached[2]
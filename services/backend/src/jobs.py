@@ -0,0 +1,266 @@
+"""Background job management for long-running digital twin operations."""
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+
+class Job:
+    """A unit of work executed by the job manager, with per-phase progress."""
+
+    def __init__(self, kind: str, params: Optional[Dict[str, Any]] = None,
+                 on_change: Optional[Callable[["Job"], None]] = None):
+        """Initialize a pending job.
+
+        Args:
+            kind: Type of the operation (e.g. "start", "reload")
+            params: Parameters the operation was submitted with
+            on_change: Callback invoked after each change of status, phase or progress
+        """
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params or {}
+        self.status = JOB_PENDING
+        self.phase: Optional[str] = None
+        self.progress_current: Optional[int] = None
+        self.progress_total: Optional[int] = None
+        self.result: Optional[Any] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        # Whether the job is run by another worker, see `mirror()`
+        self.mirrored = False
+        self._lock = threading.Lock()
+        self._on_change = on_change
+
+    def set_phase(self, phase: str, total: Optional[int] = None) -> None:
+        """Enter a new phase, resetting the progress counters.
+
+        Args:
+            phase: Name of the phase
+            total: Number of steps of the phase, if known
+        """
+        with self._lock:
+            self.phase = phase
+            self.progress_current = 0 if total is not None else None
+            self.progress_total = total
+        self.notify()
+
+    def set_progress(self, current: int, total: Optional[int] = None) -> None:
+        """Update the progress of the current phase.
+
+        Args:
+            current: Number of steps completed
+            total: Number of steps of the phase, if it changed
+        """
+        with self._lock:
+            self.progress_current = current
+            if total is not None:
+                self.progress_total = total
+        self.notify()
+
+    def notify(self) -> None:
+        """Invoke the change callback, if any."""
+        if self._on_change is None:
+            return
+        try:
+            self._on_change(self)
+        except Exception as e:
+            logger.warning(f"Job {self.id} listener failed: {str(e)}")
+
+    def mirror(self, data: Dict[str, Any]) -> None:
+        """Replace the status and progress with the ones of a job run by another worker.
+
+        Args:
+            data: Job as returned by `to_dict()` in the worker running it
+        """
+        with self._lock:
+            self.mirrored = True
+            for field in ("status", "phase", "progress_current", "progress_total", "result", "error",
+                          "started_at", "finished_at"):
+                setattr(self, field, data[field])
+        self.notify()
+
+    def is_finished(self) -> bool:
+        """Check if the job has completed, successfully or not."""
+        return self.status in (JOB_SUCCEEDED, JOB_FAILED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return a serializable snapshot of the job."""
+        with self._lock:
+            return {
+                "id": self.id,
+                "kind": self.kind,
+                "params": self.params,
+                "status": self.status,
+                "phase": self.phase,
+                "progress_current": self.progress_current,
+                "progress_total": self.progress_total,
+                "result": self.result,
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+
+class JobManager:
+    """Runs lifecycle operations on a dedicated worker executor and tracks their progress."""
+
+    def __init__(self, max_workers: int = 1, max_finished_jobs: int = 100):
+        """Initialize the job manager.
+
+        Args:
+            max_workers: Number of worker threads executing jobs
+            max_finished_jobs: Number of finished jobs kept for inspection
+        """
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dt-job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._max_finished_jobs = max_finished_jobs
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[Job], None]] = []
+        # IDs of the jobs coalesced with another job by another worker
+        self._aliases: Dict[str, str] = {}
+
+    def add_listener(self, listener: Callable[[Job], None]) -> None:
+        """Register a callback invoked after each change of a job."""
+        self._listeners.append(listener)
+
+    def submit(self, kind: str, func: Callable, *args, coalesce: bool = False, job_id: Optional[str] = None,
+               **kwargs) -> Job:
+        """Schedule `func` on the worker executor.
+
+        The function is called with the created job as `job` keyword argument, so it can report progress.
+
+        Args:
+            kind: Type of the operation
+            func: Blocking callable implementing the operation
+            *args: Positional arguments for `func`
+            coalesce: If True and a job of the same kind and parameters is still pending, return it instead of
+                scheduling another one: requests arriving while it waits are served by its single run
+            job_id: ID of the job, e.g. the one given to the request forwarded by another worker, a new one if None
+            **kwargs: Keyword arguments for `func`, also recorded as job parameters
+
+        Returns:
+            Job: The created job, or the pending job it was coalesced with
+        """
+        job = Job(kind, params=dict(kwargs), on_change=self._notify)
+        if job_id is not None:
+            job.id = job_id
+        with self._lock:
+            if coalesce:
+                for pending in self._jobs.values():
+                    if pending.status == JOB_PENDING and pending.kind == kind and pending.params == job.params:
+                        logger.info(f"Job {kind} coalesced with pending job {pending.id}")
+                        return pending
+            self._jobs[job.id] = job
+            self._prune()
+
+        self._executor.submit(self._run, job, func, args, kwargs)
+        job.notify()
+        logger.info(f"Job {job.id} ({kind}) submitted")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Get a job by its ID."""
+        with self._lock:
+            return self._jobs.get(self._aliases.get(job_id, job_id))
+
+    def mirror(self, data: Dict[str, Any]) -> Job:
+        """Track a job run by another worker, or update it.
+
+        Args:
+            data: Job as returned by `to_dict()` in the worker running it
+
+        Returns:
+            Job: The local copy of the job
+        """
+        with self._lock:
+            job = self._jobs.get(data["id"])
+            if job is None:
+                job = Job(data["kind"], params=data["params"], on_change=self._notify)
+                job.id = data["id"]
+                job.created_at = data["created_at"]
+                self._jobs[job.id] = job
+                self._prune()
+        job.mirror(data)
+        return job
+
+    def alias(self, job_id: str, target_id: str) -> None:
+        """Make a job ID refer to another job, e.g. once coalesced with it by another worker.
+
+        Args:
+            job_id: ID of the job that was coalesced, dropped from the tracked jobs
+            target_id: ID of the job it was coalesced with
+        """
+        with self._lock:
+            self._aliases[job_id] = target_id
+            self._jobs.pop(job_id, None)
+
+    def list(self) -> List[Job]:
+        """List the tracked jobs, most recent first."""
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    def latest(self, kinds: Optional[List[str]] = None) -> Optional[Job]:
+        """Get the most recently submitted job, optionally restricted to some kinds."""
+        for job in self.list():
+            if kinds is None or job.kind in kinds:
+                return job
+        return None
+
+    def unfinished(self, kinds: Optional[List[str]] = None) -> List[Job]:
+        """Get the pending and running jobs in submission order, optionally restricted to some kinds."""
+        with self._lock:
+            return [
+                job for job in self._jobs.values()
+                if not job.is_finished() and (kinds is None or job.kind in kinds)
+            ]
+
+    def shutdown(self) -> None:
+        """Stop accepting jobs and wait for the running ones."""
+        self._executor.shutdown(wait=True)
+
+    def _run(self, job: Job, func: Callable, args: tuple, kwargs: dict) -> None:
+        # Claimed under the lock, so that a request coalesced from now on gets a job of its own
+        with self._lock:
+            job.status = JOB_RUNNING
+            job.started_at = time.time()
+        job.notify()
+        try:
+            job.result = func(*args, job=job, **kwargs)
+            job.status = JOB_SUCCEEDED
+        except Exception as e:
+            job.error = str(e)
+            job.status = JOB_FAILED
+            logger.error(f"Job {job.id} ({job.kind}) failed: {str(e)}")
+        finally:
+            job.finished_at = time.time()
+            job.notify()
+
+    def _notify(self, job: Job) -> None:
+        for listener in self._listeners:
+            listener(job)
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.is_finished()]
+        for job_id in finished[:max(0, len(finished) - self._max_finished_jobs)]:
+            del self._jobs[job_id]
+        if self._aliases:
+            self._aliases = {job_id: target for job_id, target in self._aliases.items() if target in self._jobs}
+
+
+# Lifecycle operations (start, reattach, reload, stop) share a single worker so they never overlap
+job_manager = JobManager()
@@ -6,16 +6,36 @@ IXP Digital Twin network scenarios and quarantine checks.
 """
 
 import logging
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from digital_twin.ixp.globals import RESOURCES_FOLDER
 
+from comparison_history import comparison_history
+from config import api_settings
+from deployment import deployment_record
+from jobs import job_manager
+from metrics import MetricsMiddleware
+from operations import reattach_digital_twin
+from resource_catalogue import resource_catalogue
 from routes import register_routes
+from shared_state import shared_state
+from simulator import SimulatedKathara
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    yield
+    # Write the comparisons still waiting to be recorded
+    comparison_history.close()
+
+
 def create_app() -> FastAPI:
     """Create and configure the FastAPI application.
     
@@ -25,7 +45,8 @@ def create_app() -> FastAPI:
     app = FastAPI(
         title="IXP Digital Twin API",
         description="API for managing IXP Digital Twin network scenarios and quarantine checks",
-        version="1.0.0"
+        version="1.0.0",
+        lifespan=_lifespan,
     )
 
     # Configure CORS middleware
@@ -35,14 +56,46 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Exec-Id", "ETag"],
     )
 
+    # Record the latency of every request, see /metrics
+    app.add_middleware(MetricsMiddleware)
+
+    if api_settings.simulation:
+        rib_output = api_settings.simulation_rib_output
+        SimulatedKathara(
+            exec_latency=api_settings.simulation_exec_latency,
+            deploy_latency=api_settings.simulation_deploy_latency,
+            rib_output=os.path.join(RESOURCES_FOLDER, rib_output) if rib_output else None,
+        ).install()
+
     # Register all routes
     register_routes(app)
 
+    # The other workers read the catalogue the leader maintains
+    resource_catalogue.open()
+    # Every worker records its RIB comparisons in the shared history
+    comparison_history.open()
+    shared_state.start(on_leader=_lead)
+
     return app
 
 
+def _lead(failover: bool = False) -> None:
+    """Take the duties of the leader worker, see `shared_state`.
+
+    Args:
+        failover: True if the previous leader exited, the digital twin it deployed is always reattached to then
+    """
+    # Index the resources, then keep the catalogue up to date in the background
+    resource_catalogue.start()
+
+    # Reattach to the digital twin deployed before a restart, instead of deploying it again
+    if (failover or api_settings.reattach_on_startup) and deployment_record.load() is not None:
+        job_manager.submit("reattach", reattach_digital_twin)
+
+
 # Create the application instance
 app = create_app()
 
@@ -0,0 +1,143 @@
+"""Prometheus metrics of the dashboard backend, exposed at /metrics.
+
+When the backend runs several workers, `PROMETHEUS_MULTIPROC_DIR` must point to an empty directory shared by them:
+each worker then writes its metrics there and /metrics aggregates the ones of all the workers, whichever answers.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess
+
+from jobs import Job
+from state import digital_twin_state
+
+logger = logging.getLogger(__name__)
+
+# Phases of a start or reload range from milliseconds (cached dumps) to tens of minutes (deploying)
+_PHASE_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+_REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+OPERATION_SECONDS = Histogram(
+    "dt_operation_duration_seconds", "Duration of the digital twin lifecycle operations",
+    ["operation", "status"], buckets=_PHASE_BUCKETS,
+)
+PHASE_SECONDS = Histogram(
+    "dt_operation_phase_duration_seconds", "Duration of each phase of the digital twin lifecycle operations",
+    ["operation", "phase"], buckets=_PHASE_BUCKETS,
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "dt_http_request_duration_seconds", "Latency of the API requests, until the response headers are sent",
+    ["method", "route", "status"], buckets=_REQUEST_BUCKETS,
+)
+EXEC_SECONDS = Histogram(
+    "dt_exec_duration_seconds", "Duration of the commands executed on the machines",
+    ["mode", "status"], buckets=_REQUEST_BUCKETS,
+)
+RIB_COMPARE_SECONDS = Histogram(
+    "dt_rib_compare_duration_seconds", "Duration of the RIB comparisons",
+    ["mode", "status"], buckets=_PHASE_BUCKETS,
+)
+RIB_PARSED_ROUTES = Counter(
+    "dt_rib_parsed_routes_total", "Routes parsed from the live RIB of the route servers", ["route_server"],
+)
+# The gauges keep the value set last by any worker
+RIB_ROUTES = Gauge(
+    "dt_rib_routes", "Routes of the last RIB comparison of each route server", ["route_server", "source"],
+    multiprocess_mode="mostrecent",
+)
+DEVICES = Gauge("dt_devices", "Number of devices in the digital twin", multiprocess_mode="mostrecent")
+
+
+def observe_devices() -> None:
+    """State listener recording the number of devices of the digital twin."""
+    DEVICES.set(digital_twin_state.get_devices_count() or 0)
+
+
+def render_metrics() -> bytes:
+    """Render the metrics in the Prometheus text format, aggregated over the workers in multiprocess mode."""
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
+
+
+class JobPhaseObserver:
+    """Job listener recording the duration of each phase of the jobs run by this worker, and of the jobs themselves."""
+
+    def __init__(self):
+        # Current phase of each unfinished job, and when it was entered
+        self._phases: Dict[str, Tuple[Optional[str], float]] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, job: Job) -> None:
+        if job.mirrored:
+            # Observed by the worker running it
+            return
+        now = time.monotonic()
+        with self._lock:
+            if job.is_finished():
+                current = self._phases.pop(job.id, None)
+                if current is None:
+                    return
+                phase, since = current
+                if phase is not None:
+                    PHASE_SECONDS.labels(job.kind, phase).observe(now - since)
+                if job.started_at is not None and job.finished_at is not None:
+                    OPERATION_SECONDS.labels(job.kind, job.status).observe(job.finished_at - job.started_at)
+                return
+
+            current = self._phases.get(job.id)
+            if current is not None and current[0] == job.phase:
+                return
+            if current is not None and current[0] is not None:
+                PHASE_SECONDS.labels(job.kind, current[0]).observe(now - current[1])
+            self._phases[job.id] = (job.phase, now)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording the latency of the HTTP requests.
+
+    The latency is measured until the response starts, so streamed responses (events, exec output) are not
+    accounted for their whole duration. Requests are labelled by route template to bound the cardinality.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        observed = False
+
+        def observe(status: int) -> None:
+            nonlocal observed
+            if observed:
+                return
+            observed = True
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                scope["method"], getattr(route, "path", "unmatched"), str(status)
+            ).observe(time.perf_counter() - start)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                observe(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            observe(500)
+            raise
+
+
+# Global job listener instance
+job_phase_observer = JobPhaseObserver()
@@ -1,12 +1,20 @@
 """Digital twin operations - start, stop, reload logic."""
 
+import hashlib
+import json
 import logging
 import os
-from typing import Optional
+import pickle
 import re
+import threading
+import time
+from functools import lru_cache
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 import tempfile
 
 from Kathara.manager.Kathara import Kathara
+from Kathara.model.Lab import Lab
 from Kathara.setting.Setting import Setting
 from digital_twin.ixp.colored_logging import set_logging
 from digital_twin.ixp.configuration.frr_scenario_configuration_applier import FrrScenarioConfigurationApplier
@@ -18,270 +26,891 @@ from digital_twin.ixp.network_scenario.rpki_manager import RPKIManager
 from digital_twin.ixp.network_scenario.rs_manager import RouteServerManager
 from digital_twin.ixp.settings.settings import Settings
 
-from state import digital_twin_state
+from comparison_history import comparison_history
+from comparisons import RibComparison, comparison_store
+from config import api_settings
+from deployment import deployment_record
+from dump_cache import dump_cache
+from exec_streams import ExecSession, stream_exec
+from fingerprints import ReloadPlan, device_fingerprints
+from jobs import Job
+from metrics import EXEC_SECONDS, RIB_COMPARE_SECONDS, RIB_PARSED_ROUTES, RIB_ROUTES
+from rib_parser import RouteKey, iter_lines, normalize_as_path, parse_routes
+from route_keys import RouteKeyCodec, diff_sorted, sorted_keys
+from snapshots import Snapshot, snapshot_store
+from state import LIFECYCLE_IDLE, digital_twin_state
+from stats_sampler import stats_sampler
 
 logger = logging.getLogger(__name__)
 
+# Peer routers are named after the AS they emulate, e.g. "as64500" or "as64500_1"
+PEER_NAME_RE = re.compile(r"^as(\d+)(?!\d)")
+
+MACHINE_SELECTORS = ("all", "route_servers", "peers")
+
+
+def _set_phase(job: Optional[Job], phase: str, total: Optional[int] = None) -> None:
+    """Report the current phase of an operation to its job, if any."""
+    if job is not None:
+        job.set_phase(phase, total)
+
+
+def _deploy(net_scenario_manager: NetworkScenarioManager, job: Optional[Job], poll_interval: float = 0.5) -> None:
+    """Deploy the network scenario in chunks with the digital twin, reporting the number of deployed devices.
+
+    The chunks are deployed by `deploy_chunks()`: the progress is read from the lab, where Kathara attaches its
+    container to each device it deploys.
 
-async def start_digital_twin_async(max_devices: Optional[int] = None):
-    """Initialize and start the digital twin in background.
-    
     Args:
-        max_devices: Optional limit on the number of devices to start
-        
-    Raises:
-        Exception: If initialization fails
+        net_scenario_manager: Manager of the built network scenario
+        job: Optional job to report progress to
+        poll_interval: Seconds between two progress updates
     """
+    machines = list(net_scenario_manager.get().machines.values())
+    _set_phase(job, "deploying", total=len(machines))
+    if job is None:
+        net_scenario_manager.deploy_chunks()
+        return
+
+    deployed = threading.Event()
+
+    def report():
+        while not deployed.wait(poll_interval):
+            job.set_progress(sum(1 for machine in machines if machine.api_object is not None))
+
+    reporter = threading.Thread(target=report, name="deploy-progress", daemon=True)
+    reporter.start()
     try:
-        digital_twin_state.set_starting(True)
-        digital_twin_state.set_error(None)
+        net_scenario_manager.deploy_chunks()
+    finally:
+        deployed.set()
+        reporter.join()
+    job.set_progress(sum(1 for machine in machines if machine.api_object is not None))
 
-        logger.info("Starting digital twin initialization...")
 
-        # Set logging for digital twin
-        set_logging()
+def member_dump_key(peering_configuration: dict) -> tuple:
+    """Return the cache key of a member dump.
+
+    Args:
+        peering_configuration: Peering configuration, with the type and path of the member dump
+    """
+    path = os.path.join(RESOURCES_FOLDER, peering_configuration["path"])
+    return "member_dump", peering_configuration["type"], dump_cache.fingerprint(path)
 
-        # Load settings
-        logger.info("Loading settings...")
-        settings = Settings.get_instance()
-        settings.load_from_disk()
 
-        # Configure Kathara
-        Setting.get_instance().load_from_dict({"manager_type": "docker"})
+def _load_member_entries(settings, job: Optional[Job] = None) -> dict:
+    """Load the member entries of the configured member dump, going through the dumps cache.
 
-        # Load member dump
+    Args:
+        settings: Digital twin settings
+        job: Optional job to report progress to
+
+    Returns:
+        dict: A private copy of the parsed member entries
+    """
+
+    def load():
         logger.info("Loading member dump...")
+        _set_phase(job, "loading_member_dump")
         member_dump_class = MemberDumpFactory(submodule_package="digital_twin").get_class_from_name(
-            settings.peering_configuration["type"])
-        entries = member_dump_class().load_from_file(
+            settings.peering_configuration["type"]
+        )
+        return member_dump_class().load_from_file(
             os.path.join(RESOURCES_FOLDER, settings.peering_configuration["path"])
         )
 
-        # Load table dump
+    return dump_cache.get_or_load(member_dump_key(settings.peering_configuration), load)
+
+
+def table_dump_key(rib_dump_type: str, peering_configuration: dict, paths: List[str]) -> tuple:
+    """Return the cache key of a table dump loaded from the given files.
+
+    Args:
+        rib_dump_type: Type of the table dump
+        peering_configuration: Peering configuration, with the type and path of the member dump
+        paths: Paths of the RIB dump files
+    """
+    return (
+        "table_dump",
+        rib_dump_type,
+        member_dump_key(peering_configuration),
+        tuple(dump_cache.fingerprint(path) for path in paths),
+    )
+
+
+def table_dump_snapshot(rib_dump_type: str, peering_configuration: dict, paths: List[str]) -> Snapshot:
+    """Return the on-disk snapshot of a table dump loaded from the given files, see `snapshots.py`.
+
+    Args:
+        rib_dump_type: Type of the table dump
+        peering_configuration: Peering configuration, with the type and path of the member dump
+        paths: Paths of the RIB dump files
+    """
+    member_dump_path = os.path.join(RESOURCES_FOLDER, peering_configuration["path"])
+    return snapshot_store.snapshot(
+        "table_dump",
+        {"rib_dump_type": rib_dump_type, "member_dump_type": peering_configuration["type"]},
+        [member_dump_path] + paths,
+    )
+
+
+def route_index_key(table_key: tuple) -> tuple:
+    """Return the cache key of the route index of a table dump, see `_load_uploaded_routes`."""
+    return "route_index", table_key
+
+
+def route_index_snapshot(rib_dump_type: str, peering_configuration: dict, paths: List[str]) -> Snapshot:
+    """Return the on-disk snapshot of the route index of a table dump, see `table_dump_snapshot`."""
+    member_dump_path = os.path.join(RESOURCES_FOLDER, peering_configuration["path"])
+    return snapshot_store.snapshot(
+        "route_index",
+        {"rib_dump_type": rib_dump_type, "member_dump_type": peering_configuration["type"]},
+        [member_dump_path] + paths,
+    )
+
+
+def _load_table_dump(settings, resource_files: List[str], job: Optional[Job] = None) -> Any:
+    """Load the given RIB dumps in a table dump of the configured type, going through the dumps cache.
+
+    Args:
+        settings: Digital twin settings
+        resource_files: Names of the RIB dump files in the resources directory
+        job: Optional job to report progress to
+
+    Returns:
+        Any: A private copy of the loaded table dump
+    """
+    paths = [os.path.join(RESOURCES_FOLDER, file) for file in resource_files]
+    key = table_dump_key(settings.rib_dumps["type"], settings.peering_configuration, paths)
+    # Survives restarts: unchanged dumps are read back from their snapshot instead of being parsed
+    snapshot = table_dump_snapshot(settings.rib_dumps["type"], settings.peering_configuration, paths)
+
+    def load():
+        entries = _load_member_entries(settings, job)
+
         logger.info("Loading RIB dumps...")
-        table_dump = TableDumpFactory(submodule_package="digital_twin").get_class_from_name(settings.rib_dumps["type"])(
-            entries)
+        _set_phase(job, "loading_rib_dumps", total=len(paths))
+        table_dump = TableDumpFactory(submodule_package="digital_twin").get_class_from_name(
+            settings.rib_dumps["type"]
+        )(entries)
+        for i, path in enumerate(paths):
+            table_dump.load_from_file(path)
+            if job is not None:
+                job.set_progress(i + 1)
+        return table_dump
 
-        for v, file in settings.rib_dumps["dumps"].items():
-            table_dump.load_from_file(os.path.join(RESOURCES_FOLDER, file))
+    return dump_cache.get_or_load(key, load, snapshot)
 
-        # Limit devices if requested
-        if max_devices is not None:
-            logger.info(f"Limiting to {max_devices} devices...")
-            table_dump.entries = dict(list(table_dump.entries.items())[0:max_devices])
-
-        # Initialize managers
-        logger.info("Initializing network scenario manager...")
-        net_scenario_manager = NetworkScenarioManager()
-        frr_conf = FrrScenarioConfigurationApplier(table_dump)
-        rs_manager = RouteServerManager()
-        rpki_manager = RPKIManager()
-
-        # Build network scenario
-        logger.info("Building network scenario...")
-        net_scenario = net_scenario_manager.build(table_dump)
-
-        # Apply configurations
-        logger.info("Applying configurations...")
-        frr_conf.apply_to_network_scenario(net_scenario)
-        rs_manager.apply_to_network_scenario(net_scenario)
-        rpki_manager.apply_to_network_scenario(net_scenario)
-
-        # Interconnect devices
-        logger.info("Interconnecting devices...")
-        net_scenario_manager.interconnect(table_dump)
-
-        # Undeploy any existing scenario
-        logger.info("Cleaning up any existing deployment...")
-        net_scenario_manager.undeploy()
-
-        # Deploy the scenario
-        logger.info("Deploying network scenario...")
-        net_scenario_manager.deploy_chunks()
 
-        # Update state
-        digital_twin_state.set_running(True)
-        digital_twin_state.set_starting(False)
-        digital_twin_state.set_net_scenario_manager(net_scenario_manager)
-        digital_twin_state.set_table_dump(table_dump)
+def _build_network_scenario(table_dump: Any, job: Optional[Job] = None) -> tuple:
+    """Build the network scenario of a table dump and apply its configurations, without deploying it.
 
-        devices_count = len(table_dump.entries)
-        logger.info(f"Digital twin started successfully with {devices_count} devices")
+    Args:
+        table_dump: Table dump of the devices
+        job: Optional job to report progress to
 
+    Returns:
+        tuple: The network scenario manager, the network scenario, and the FRR, route server and RPKI configuration
+        appliers
+    """
+    # Initialize managers
+    logger.info("Initializing network scenario manager...")
+    net_scenario_manager = NetworkScenarioManager()
+    frr_conf = FrrScenarioConfigurationApplier(table_dump)
+    rs_manager = RouteServerManager()
+    rpki_manager = RPKIManager()
+
+    # Build network scenario
+    logger.info("Building network scenario...")
+    _set_phase(job, "building")
+    net_scenario = net_scenario_manager.build(table_dump)
+
+    # Apply configurations
+    logger.info("Applying configurations...")
+    _set_phase(job, "applying_configs")
+    frr_conf.apply_to_network_scenario(net_scenario)
+    rs_manager.apply_to_network_scenario(net_scenario)
+    rpki_manager.apply_to_network_scenario(net_scenario)
+
+    # Interconnect devices
+    logger.info("Interconnecting devices...")
+    _set_phase(job, "interconnecting")
+    net_scenario_manager.interconnect(table_dump)
+
+    return net_scenario_manager, net_scenario, frr_conf, rs_manager, rpki_manager
+
+
+def _deployment_inputs(settings, resource_files: List[str]) -> Dict[str, Any]:
+    """Return the hashes of the settings and dumps the network scenario configurations are rendered from."""
+    settings_content = json.dumps(
+        {name: value for name, value in vars(settings).items() if not name.startswith("_")},
+        sort_keys=True,
+        default=str,
+    )
+    paths = [os.path.join(RESOURCES_FOLDER, settings.peering_configuration["path"])]
+    paths += [os.path.join(RESOURCES_FOLDER, file) for file in resource_files]
+    return {
+        "settings": hashlib.sha256(settings_content.encode()).hexdigest(),
+        "sources": [snapshot_store.describe_source(path)["sha256"] for path in paths],
+    }
+
+
+def _record_deployment(settings, resource_files: List[str], max_devices: Optional[int], lab: Any) -> None:
+    """Record the deployed network scenario, for a restarted backend to reattach to it.
+
+    On failure there is no record, and a restarted backend does not reattach.
+    """
+    try:
+        deployment_record.save({
+            "lab_name": lab.name,
+            "lab_hash": lab.hash,
+            "max_devices": max_devices,
+            "devices_count": len(lab.machines),
+            "inputs": _deployment_inputs(settings, resource_files),
+            "deployed_at": time.time(),
+        })
     except Exception as e:
-        logger.error(f"Failed to start digital twin: {str(e)}", exc_info=True)
-        digital_twin_state.set_starting(False)
-        digital_twin_state.set_running(False)
-        digital_twin_state.set_error(str(e))
+        logger.warning(f"Failed to record the deployment: {str(e)}")
+        deployment_record.clear()
+
+
+def _running_machines(lab_hash: str) -> set:
+    """Return the names of the running machines of a lab."""
+    api_objects = Kathara.get_instance().get_machines_api_objects(lab_hash=lab_hash) or []
+    return {api_object.labels["name"] for api_object in api_objects if api_object.status == "running"}
+
+
+def reattach_digital_twin(job: Optional[Job] = None):
+    """Reattach to the network scenario deployed before the backend restarted, without deploying it again.
+
+    The network scenario is rebuilt in memory from the recorded deployment, the table dump coming from its snapshot,
+    and bound to the running machines. Machines that are not running anymore are deployed again. If the settings or
+    the dumps changed since the deployment, the deployed configurations are not considered applied: the next reload
+    pushes every device.
+
+    This is blocking and meant to be run by the job manager, outside the event loop.
+
+    Args:
+        job: Optional job to report per-phase progress to
+
+    Returns:
+        dict: Whether the lab was reattached, the number of devices and of machines deployed again
+    """
+    record = deployment_record.load()
+    if record is None:
+        return {"reattached": False, "devices_count": None}
+
+    try:
+        with digital_twin_state.operation("reattach") as operation:
+            logger.info(f"Reattaching to the deployed lab {record['lab_name']}...")
+            set_logging()
+
+            _set_phase(job, "discovering")
+            Setting.get_instance().load_from_dict({"manager_type": "docker"})
+            running = _running_machines(record["lab_hash"])
+            if not running:
+                logger.info("No machine of the recorded lab is running, nothing to reattach")
+                deployment_record.clear()
+                operation.outcome = LIFECYCLE_IDLE
+                return {"reattached": False, "devices_count": None}
+
+            _set_phase(job, "loading_settings")
+            settings = Settings.get_instance()
+            settings.load_from_disk()
+            resource_files = list(settings.rib_dumps["dumps"].values())
+            table_dump = _load_table_dump(settings, resource_files, job)
+            max_devices = record.get("max_devices")
+            if max_devices is not None:
+                table_dump.entries = dict(list(table_dump.entries.items())[0:max_devices])
+
+            net_scenario_manager, net_scenario, frr_conf, rs_manager, rpki_manager = _build_network_scenario(
+                table_dump, job
+            )
+            lab = net_scenario_manager.get()
+            if lab.hash != record["lab_hash"]:
+                raise Exception(
+                    f"The running lab {record['lab_name']} was deployed from another network scenario, "
+                    f"start the digital twin to deploy the configured one"
+                )
+
+            inputs_changed = _deployment_inputs(settings, resource_files) != record.get("inputs")
+            missing = set(lab.machines) - running
+            if missing:
+                logger.info(f"Deploying {len(missing)} machines not running anymore...")
+                _set_phase(job, "deploying")
+                Kathara.get_instance().deploy_lab(lab, selected_machines=missing)
+
+            # Bind the machines to their containers
+            Kathara.get_instance().update_lab_from_api(lab)
+
+            if inputs_changed:
+                logger.warning("The settings or the dumps changed since the deployment, reload to apply them")
+                device_fingerprints.clear()
+            else:
+                _record_applied_configs(net_scenario, frr_conf, rs_manager, rpki_manager)
+
+            operation.update(net_scenario_manager=net_scenario_manager, table_dump=table_dump)
+            stats_sampler.start(lab)
+
+            devices_count = len(table_dump.entries)
+            logger.info(
+                f"Reattached to the lab {lab.name}: {devices_count} devices, {len(missing)} machines redeployed"
+            )
+            return {
+                "reattached": True,
+                "devices_count": devices_count,
+                "redeployed_count": len(missing),
+                "inputs_changed": inputs_changed,
+            }
+
+    except Exception as e:
+        logger.error(f"Failed to reattach to the deployed lab: {str(e)}", exc_info=True)
         raise
 
 
-def stop_digital_twin():
-    """Stop the digital twin network scenario.
-    
+def start_digital_twin(max_devices: Optional[int] = None, job: Optional[Job] = None):
+    """Initialize and start the digital twin.
+
+    This is blocking and meant to be run by the job manager, outside the event loop.
+
+    Args:
+        max_devices: Optional limit on the number of devices to start
+        job: Optional job to report per-phase progress to
+
     Returns:
-        dict: Status message
-        
+        dict: Number of deployed devices
+
     Raises:
-        Exception: If stopping fails
+        Exception: If initialization fails
     """
     try:
-        logger.info("Stopping digital twin...")
+        with digital_twin_state.operation("start") as operation:
+            logger.info("Starting digital twin initialization...")
+
+            # Set logging for digital twin
+            set_logging()
+
+            # Load settings
+            logger.info("Loading settings...")
+            _set_phase(job, "loading_settings")
+            settings = Settings.get_instance()
+            settings.load_from_disk()
+
+            # Configure Kathara
+            Setting.get_instance().load_from_dict({"manager_type": "docker"})
+
+            # Load member dump and table dump
+            resource_files = list(settings.rib_dumps["dumps"].values())
+            table_dump = _load_table_dump(settings, resource_files, job)
 
-        net_scenario_manager = digital_twin_state.get_net_scenario_manager()
-        if net_scenario_manager is not None:
+            # Limit devices if requested
+            if max_devices is not None:
+                logger.info(f"Limiting to {max_devices} devices...")
+                table_dump.entries = dict(list(table_dump.entries.items())[0:max_devices])
+
+            net_scenario_manager, net_scenario, frr_conf, rs_manager, rpki_manager = _build_network_scenario(
+                table_dump, job
+            )
+
+            # Undeploy any existing scenario
+            logger.info("Cleaning up any existing deployment...")
+            _set_phase(job, "undeploying")
             net_scenario_manager.undeploy()
 
-        digital_twin_state.reset()
+            # Deploy the scenario
+            logger.info("Deploying network scenario...")
+            _deploy(net_scenario_manager, job)
+
+            _record_applied_configs(net_scenario, frr_conf, rs_manager, rpki_manager)
+            _record_deployment(settings, resource_files, max_devices, net_scenario_manager.get())
+
+            # Update state
+            operation.update(net_scenario_manager=net_scenario_manager, table_dump=table_dump)
+            stats_sampler.start(net_scenario_manager.get())
 
-        logger.info("Digital twin stopped successfully")
-        return {"status": "success", "message": "Digital twin stopped successfully"}
+            devices_count = len(table_dump.entries)
+            logger.info(f"Digital twin started successfully with {devices_count} devices")
+            return {"devices_count": devices_count}
 
     except Exception as e:
-        logger.error(f"Failed to stop digital twin: {str(e)}", exc_info=True)
+        logger.error(f"Failed to start digital twin: {str(e)}", exc_info=True)
         raise
 
 
-async def reload_digital_twin(rs_only: bool = False, max_devices: Optional[int] = None):
-    """Reload the digital twin configurations without full restart.
-    
+def stop_digital_twin(job: Optional[Job] = None):
+    """Stop the digital twin network scenario.
+
+    This is blocking and meant to be run by the job manager, after the lifecycle operations submitted before it.
+
     Args:
-        rs_only: If True, reload only RS configurations, skipping peerings
-        max_devices: Optional limit on the number of devices to reload
+        job: Optional job to report progress to
+
+    Returns:
+        dict: Status message
         
     Raises:
-        Exception: If reload fails
+        Exception: If stopping fails
     """
     try:
-        logger.info("Reloading digital twin configurations...")
+        with digital_twin_state.operation("stop") as operation:
+            logger.info("Stopping digital twin...")
+            stats_sampler.stop()
+            device_fingerprints.clear()
 
-        if rs_only:
-            logger.warning("Reloading RS configurations only! Peerings will not be updated!")
+            net_scenario_manager = digital_twin_state.get_net_scenario_manager()
+            if net_scenario_manager is not None:
+                _set_phase(job, "undeploying")
+                net_scenario_manager.undeploy()
+            deployment_record.clear()
+            operation.update(net_scenario_manager=None, table_dump=None)
 
-        # Set logging for digital twin
-        set_logging()
+            logger.info("Digital twin stopped successfully")
+            return {"status": "success", "message": "Digital twin stopped successfully"}
 
-        # Load settings
-        settings = Settings.get_instance()
-        settings.load_from_disk()
+    except Exception as e:
+        logger.error(f"Failed to stop digital twin: {str(e)}", exc_info=True)
+        raise
 
-        # Configure Kathara
-        Setting.get_instance().load_from_dict({"manager_type": "docker"})
 
-        # Load member dump
-        member_dump_class = MemberDumpFactory(submodule_package="digital_twin").get_class_from_name(
-            settings.peering_configuration["type"]
-        )
-        entries = member_dump_class().load_from_file(
-            os.path.join(RESOURCES_FOLDER, settings.peering_configuration["path"])
-        )
+def _record_applied_configs(net_scenario, frr_conf, rs_manager, rpki_manager) -> None:
+    """Record the fingerprints of the configurations deployed with the network scenario.
 
-        # Load table dump
-        table_dump = TableDumpFactory(submodule_package="digital_twin").get_class_from_name(
-            settings.rib_dumps["type"]
-        )(entries)
+    On failure the fingerprints stay unknown, and the next reload pushes every device.
+    """
+    device_fingerprints.clear()
+    try:
+        device_fingerprints.record("route_servers", rs_manager.get_device_info(net_scenario))
+        device_fingerprints.record("rpki", rpki_manager.get_device_info(net_scenario))
+        device_fingerprints.record("peerings", frr_conf.get_device_info(net_scenario))
+    except Exception as e:
+        logger.warning(f"Failed to fingerprint the deployed configurations: {str(e)}")
+        device_fingerprints.clear()
 
-        for v, file in settings.rib_dumps["dumps"].items():
-            table_dump.load_from_file(os.path.join(RESOURCES_FOLDER, file))
 
-        # Limit devices if requested
-        if max_devices is not None:
-            logger.info(f"Limiting to {max_devices} devices...")
-            table_dump.entries = dict(list(table_dump.entries.items())[0:max_devices])
+def _plan_stage(stage: str, device_info: Dict[str, Any], deleted_devices: Iterable[str] = (),
+                force: bool = False) -> Tuple[ReloadPlan, Dict[str, int]]:
+    """Find the devices of a stage whose configuration changed since it was last applied.
 
-        # Get network scenario manager
-        net_scenario_manager = digital_twin_state.get_net_scenario_manager()
-        if net_scenario_manager is None:
-            raise Exception("Network scenario manager not initialized")
+    Args:
+        stage: Name of the configuration stage ("route_servers", "rpki" or "peerings")
+        device_info: Device info of the stage, keyed by device name
+        deleted_devices: Devices removed from the network scenario by this reload
+        force: Push every device regardless of its fingerprint
 
-        frr_conf = FrrScenarioConfigurationApplier(table_dump)
+    Returns:
+        Tuple[ReloadPlan, Dict[str, int]]: The plan and the number of changed, unchanged, new and deleted devices
+    """
+    plan = device_fingerprints.plan(stage, device_info, deleted_devices, force)
+    counts = {
+        "changed": len(plan.changed),
+        "unchanged": len(plan.unchanged),
+        "new": len(plan.new),
+        "deleted": len(plan.deleted),
+    }
+    logger.info(
+        f"Stage {stage}: {counts['changed']} changed, {counts['unchanged']} unchanged, "
+        f"{counts['new']} new, {counts['deleted']} deleted devices"
+    )
+    return plan, counts
+
+
+def _push_stages(net_scenario_manager, stages: Dict[str, Tuple[ReloadPlan, Dict[str, Any]]], max_parallel: int,
+                 job: Optional[Job] = None) -> None:
+    """Copy and execute the planned configurations of every stage concurrently.
+
+    The stages touch disjoint sets of devices, so all the devices are pushed from a single pool, one
+    `copy_and_exec_by_device_info()` call per device.
 
-        if not rs_only:
-            # Build diff and update devices
-            logger.info("Building network scenario diff...")
-            net_scenario = net_scenario_manager.build_diff(table_dump)
-            new_devices = dict(x for x in net_scenario.machines.items() if "new" in x[1].meta and x[1].meta["new"])
-            del_devices = dict(x for x in net_scenario.machines.items() if "del" in x[1].meta and x[1].meta["del"])
+    Args:
+        net_scenario_manager: Network scenario manager of the running digital twin
+        stages: Plan and device info of each stage, keyed by stage name
+        max_parallel: Maximum number of devices pushed at the same time
+        job: Optional job to report progress to
 
-            logger.info(f"New devices: {len(new_devices)}, Deleted devices: {len(del_devices)}")
+    Raises:
+        Exception: If the configuration of any device could not be applied, listing the failed devices per stage
+    """
+    tasks = [(stage, name) for stage, (plan, _) in stages.items() for name in plan.to_push()]
+    failures: Dict[str, List[str]] = {stage: [] for stage in stages}
+    _set_phase(job, "pushing_configs", len(tasks))
+
+    if tasks:
+        with ThreadPoolExecutor(max_workers=min(max_parallel, len(tasks)), thread_name_prefix="reload") as executor:
+            futures = {
+                executor.submit(
+                    net_scenario_manager.copy_and_exec_by_device_info, {name: stages[stage][1][name]}
+                ): (stage, name)
+                for stage, name in tasks
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                stage, name = futures[future]
+                try:
+                    return_code = future.result()
+                    if return_code != 0:
+                        logger.warning(f"Failed to update device '{name}' ({stage}): return code {return_code}")
+                        failures[stage].append(name)
+                except Exception as e:
+                    logger.warning(f"Failed to update device '{name}' ({stage}): {str(e)}")
+                    failures[stage].append(name)
+                if job is not None:
+                    job.set_progress(done)
+
+    for stage, (plan, _) in stages.items():
+        device_fingerprints.commit(stage, plan, failures[stage])
+
+    errors = [
+        f"{stage.replace('_', ' ')} configurations ({', '.join(sorted(names))})"
+        for stage, names in failures.items() if names
+    ]
+    if errors:
+        raise Exception(f"Failed to update {'; '.join(errors)}")
+
+
+def reload_digital_twin(rs_only: bool = False, max_devices: Optional[int] = None, force: bool = False,
+                        job: Optional[Job] = None):
+    """Reload the digital twin configurations without full restart.
 
-            frr_conf.apply_to_devices(new_devices)
+    Only the devices whose rendered configuration differs from the last applied one are updated.
 
-            net_scenario_manager.deploy_devices(new_devices)
-            net_scenario_manager.undeploy_devices(del_devices)
-            net_scenario_manager.update_interconnection(table_dump, new_devices, set(del_devices.keys()))
-        else:
-            net_scenario = net_scenario_manager.get()
-
-        # Update RS configurations
-        logger.info("Updating Route Server configurations...")
-        rs_manager = RouteServerManager()
-        rs_info = rs_manager.get_device_info(net_scenario)
-        return_code = net_scenario_manager.copy_and_exec_by_device_info(rs_info)
-        if return_code != 0:
-            raise Exception("Failed to update Route Server configurations")
-
-        # Update RPKI configurations
-        logger.info("Updating RPKI configurations...")
-        rpki_manager = RPKIManager()
-        rpki_info = rpki_manager.get_device_info(net_scenario)
-        return_code = net_scenario_manager.copy_and_exec_by_device_info(rpki_info)
-        if return_code != 0:
-            raise Exception("Failed to update RPKI configurations")
-
-        if not rs_only:
-            # Update peerings configurations
-            logger.info("Updating peerings configurations...")
-            peerings_info = frr_conf.get_device_info(net_scenario)
-            return_code = net_scenario_manager.copy_and_exec_by_device_info(peerings_info)
-            if return_code != 0:
-                raise Exception("Failed to update peerings configurations")
-
-        # Update the global state with new table_dump
-        digital_twin_state.set_table_dump(table_dump)
-
-        logger.info("Configurations reload finished!")
-        return {"status": "success", "message": "Digital twin configurations reloaded successfully"}
+    This is blocking and meant to be run by the job manager, outside the event loop.
+
+    Args:
+        rs_only: If True, reload only RS configurations, skipping peerings
+        max_devices: Optional limit on the number of devices to reload
+        force: If True, push the configurations of every device, even the unchanged ones
+        job: Optional job to report per-phase progress to
+
+    Returns:
+        dict: Status message, with the number of changed, unchanged, new and deleted devices per stage
+        
+    Raises:
+        Exception: If reload fails
+    """
+    try:
+        with digital_twin_state.operation("reload") as operation:
+            logger.info("Reloading digital twin configurations...")
+
+            if rs_only:
+                logger.warning("Reloading RS configurations only! Peerings will not be updated!")
+
+            # Set logging for digital twin
+            set_logging()
+
+            # Load settings
+            settings = Settings.get_instance()
+            settings.load_from_disk()
+
+            # Configure Kathara
+            Setting.get_instance().load_from_dict({"manager_type": "docker"})
+
+            # Load member dump and table dump
+            resource_files = list(settings.rib_dumps["dumps"].values())
+            table_dump = _load_table_dump(settings, resource_files, job)
+
+            # Limit devices if requested
+            if max_devices is not None:
+                logger.info(f"Limiting to {max_devices} devices...")
+                table_dump.entries = dict(list(table_dump.entries.items())[0:max_devices])
+
+            # Get network scenario manager
+            net_scenario_manager = digital_twin_state.get_net_scenario_manager()
+            if net_scenario_manager is None:
+                raise Exception("Network scenario manager not initialized")
+
+            frr_conf = FrrScenarioConfigurationApplier(table_dump)
+            del_devices = {}
+
+            if not rs_only:
+                # Build diff and update devices
+                logger.info("Building network scenario diff...")
+                _set_phase(job, "building_diff")
+                net_scenario = net_scenario_manager.build_diff(table_dump)
+                new_devices = dict(x for x in net_scenario.machines.items() if "new" in x[1].meta and x[1].meta["new"])
+                del_devices = dict(x for x in net_scenario.machines.items() if "del" in x[1].meta and x[1].meta["del"])
+
+                logger.info(f"New devices: {len(new_devices)}, Deleted devices: {len(del_devices)}")
+
+                _set_phase(job, "applying_configs")
+                frr_conf.apply_to_devices(new_devices)
+
+                _set_phase(job, "deploying_devices")
+                net_scenario_manager.deploy_devices(new_devices)
+                net_scenario_manager.undeploy_devices(del_devices)
+
+                _set_phase(job, "interconnecting")
+                net_scenario_manager.update_interconnection(table_dump, new_devices, set(del_devices.keys()))
+            else:
+                net_scenario = net_scenario_manager.get()
+
+            # Render the configurations of every stage, then push the changed ones concurrently
+            logger.info("Updating device configurations...")
+            _set_phase(job, "rendering_configs")
+            device_infos = {
+                "route_servers": RouteServerManager().get_device_info(net_scenario),
+                "rpki": RPKIManager().get_device_info(net_scenario),
+            }
+            if not rs_only:
+                device_infos["peerings"] = frr_conf.get_device_info(net_scenario)
+
+            plans, stages = {}, {}
+            for stage, device_info in device_infos.items():
+                deleted_devices = del_devices.keys() if stage == "peerings" else ()
+                plan, stages[stage] = _plan_stage(stage, device_info, deleted_devices, force)
+                plans[stage] = (plan, device_info)
+            _push_stages(net_scenario_manager, plans, api_settings.reload_max_parallel, job)
+
+            # Update the global state with new table_dump
+            operation.update(table_dump=table_dump)
+            # Peerings not reloaded are rendered from older inputs: a reattach does not consider them applied
+            deployment_record.update(
+                max_devices=max_devices, inputs=None if rs_only else _deployment_inputs(settings, resource_files)
+            )
+
+            devices = {
+                key: sum(counts[key] for counts in stages.values())
+                for key in ("changed", "unchanged", "new", "deleted")
+            }
+            logger.info(f"Configurations reload finished! {devices['changed'] + devices['new']} devices updated")
+            return {
+                "status": "success",
+                "message": "Digital twin configurations reloaded successfully",
+                "devices": devices,
+                "stages": stages,
+            }
 
     except Exception as e:
         logger.error(f"Failed to reload digital twin: {str(e)}", exc_info=True)
         raise
 
 
-def _extract_routes_from_entries(entries: dict) -> set:
+def _extract_routes_from_entries(entries: dict) -> Iterator[RouteKey]:
     """Extract all routes from member entries dump.
     
     Args:
         entries: Dictionary of member entries with routers and routes
         
-    Returns:
-        set: Set of all route prefixes
+    Yields:
+        RouteKey: Each route, as (network, AS path)
     """
-    routes = set()
     for neighbour in entries.values():
         for router in neighbour.routers.values():
             for route in router.routes[4]:
-                routes.add(f"Network: {route.network} - AS Path: {route.as_path}")
+                yield str(route.network), normalize_as_path(route.as_path)
             for route in router.routes[6]:
-                routes.add(f"Network: {route.network} - AS Path: {route.as_path}")
-    return routes
+                yield str(route.network), normalize_as_path(route.as_path)
+
+
+def _index_routes(routes: Iterable[RouteKey], codec: RouteKeyCodec) -> List[int]:
+    """Encode routes as compact keys, returning them sorted and without duplicates.
+
+    Args:
+        routes: Routes to encode, routes with an invalid network are skipped
+        codec: Codec interning the AS paths
+
+    Returns:
+        List[int]: Sorted route keys
+    """
+    encode = codec.encode
+    return sorted_keys(key for key in (encode(network, as_path) for network, as_path in routes) if key is not None)
+
+
+def _read_chunks(path: str, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _load_parsed_routes(settings, resource_files: List[str]) -> Tuple[RouteKeyCodec, List[int]]:
+    """Load all the routes of uploaded RIB dumps with the incremental parser, going through the dumps cache.
+
+    Unlike `_load_uploaded_routes`, the routes are not restricted to the ones of the member dump entries: this is
+    the index the streamed live RIB, parsed the same way, is compared against.
+
+    Args:
+        settings: Digital twin settings
+        resource_files: Names of the RIB dump files in resources directory
+
+    Returns:
+        Tuple[RouteKeyCodec, List[int]]: A private copy of the codec and the sorted keys of the uploaded routes
+    """
+    paths = [os.path.join(RESOURCES_FOLDER, file) for file in resource_files]
+    rib_dump_type = settings.rib_dumps["type"]
+    key = ("parsed_routes", rib_dump_type, tuple(dump_cache.fingerprint(path) for path in paths))
+
+    def load():
+        codec = RouteKeyCodec()
+        routes = (route for path in paths for route in parse_routes(iter_lines(_read_chunks(path)), rib_dump_type))
+        return codec, _index_routes(routes, codec)
+
+    return dump_cache.get_or_load(key, load)
+
+
+def _load_uploaded_routes(settings, resource_files: List[str]) -> Tuple[RouteKeyCodec, List[int]]:
+    """Load the routes of uploaded RIB dumps, indexed for the comparison, going through the dumps cache.
+
+    Args:
+        settings: Digital twin settings
+        resource_files: Names of the RIB dump files in resources directory
+
+    Returns:
+        Tuple[RouteKeyCodec, List[int]]: A private copy of the codec and the sorted keys of the uploaded routes
+    """
+    paths = [os.path.join(RESOURCES_FOLDER, file) for file in resource_files]
+    key = route_index_key(table_dump_key(settings.rib_dumps["type"], settings.peering_configuration, paths))
+    snapshot = route_index_snapshot(settings.rib_dumps["type"], settings.peering_configuration, paths)
+
+    def load():
+        codec = RouteKeyCodec()
+        entries = _load_table_dump(settings, resource_files).entries
+        return codec, _index_routes(_extract_routes_from_entries(entries), codec)
 
+    return dump_cache.get_or_load(key, load, snapshot)
 
-async def compare_rib(route_server_name: str, resource_file: str) -> dict:
+
+def _count_member_routes(entries: dict) -> Dict[str, Dict[str, int]]:
+    """Count the routes of each member of a table dump, per address family."""
+    counts = {}
+    for asn, neighbour in entries.items():
+        routes_v4 = sum(len(router.routes[4]) for router in neighbour.routers.values())
+        routes_v6 = sum(len(router.routes[6]) for router in neighbour.routers.values())
+        counts[str(asn)] = {"4": routes_v4, "6": routes_v6}
+    return counts
+
+
+def preparse_table_dump(rib_dump_type: str, peering_configuration: dict,
+                        resource_files: List[str]) -> Tuple[List[str], Dict[str, dict]]:
+    """Parse RIB dumps in a table dump, summarizing each file, and build its route index.
+
+    This is run in a worker process by the dump preparser: the table dump and route index are written to their
+    snapshots from here, so that only the snapshot paths and the summaries are sent back to the backend process,
+    which reads the snapshots on the next lookup in its dumps cache.
+
+    Args:
+        rib_dump_type: Type of the table dump
+        peering_configuration: Peering configuration, with the type and path of the member dump
+        resource_files: Names of the RIB dump files in the resources directory
+
+    Returns:
+        Tuple[List[str], Dict[str, dict]]: The paths of the written snapshots, none if a file failed to parse or the
+        snapshots are disabled, and the summary of each file: status, parse time, routes per address family and per
+        member ASN, error
+    """
+    member_dump_class = MemberDumpFactory(submodule_package="digital_twin").get_class_from_name(
+        peering_configuration["type"]
+    )
+    entries = member_dump_class().load_from_file(os.path.join(RESOURCES_FOLDER, peering_configuration["path"]))
+    table_dump = TableDumpFactory(submodule_package="digital_twin").get_class_from_name(rib_dump_type)(entries)
+    paths = [os.path.join(RESOURCES_FOLDER, file) for file in resource_files]
+    snapshots = [
+        table_dump_snapshot(rib_dump_type, peering_configuration, paths),
+        route_index_snapshot(rib_dump_type, peering_configuration, paths),
+    ]
+    if snapshot_store.enabled:
+        # Resolved before parsing, so that the snapshots are not written if a file changes while it is parsed
+        for snapshot in snapshots:
+            snapshot.resolve()
+
+    summaries = {}
+    failed = False
+    counts = _count_member_routes(table_dump.entries)
+    for file in resource_files:
+        start = time.perf_counter()
+        try:
+            table_dump.load_from_file(os.path.join(RESOURCES_FOLDER, file))
+        except Exception as e:
+            failed = True
+            summaries[file] = {
+                "status": "failed",
+                "table_dump_type": rib_dump_type,
+                "parse_seconds": round(time.perf_counter() - start, 3),
+                "routes": {"4": 0, "6": 0},
+                "members": {},
+                "error": str(e),
+            }
+            continue
+        elapsed = time.perf_counter() - start
+
+        # The files are loaded in the same table dump, the routes of a file are the ones it added
+        previous, counts = counts, _count_member_routes(table_dump.entries)
+        members = {}
+        for asn, member_counts in counts.items():
+            added = {afi: count - previous.get(asn, {}).get(afi, 0) for afi, count in member_counts.items()}
+            if any(added.values()):
+                members[asn] = added
+        # No route is not an error: e.g. an IPv6-only dump, or a route server without peers
+        summaries[file] = {
+            "status": "parsed",
+            "table_dump_type": rib_dump_type,
+            "parse_seconds": round(elapsed, 3),
+            "routes": {afi: sum(added[afi] for added in members.values()) for afi in ("4", "6")},
+            "members": members,
+            "error": None,
+        }
+
+    if failed or not snapshot_store.enabled:
+        return [], summaries
+
+    codec = RouteKeyCodec()
+    route_index = (codec, _index_routes(_extract_routes_from_entries(table_dump.entries), codec))
+    written = []
+    for snapshot, value in zip(snapshots, (table_dump, route_index)):
+        snapshot.write(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        if os.path.isfile(snapshot.path):
+            written.append(snapshot.path)
+    return written, summaries
+
+
+def iter_exec_output(exec_stream: Any) -> Iterator[bytes]:
+    """Iterate over the output chunks of a Kathara streamed exec.
+
+    Args:
+        exec_stream: Stream returned by `manager.exec(..., stream=True)`
+
+    Yields:
+        bytes: Each output chunk, stdout or stderr
+    """
+    while True:
+        try:
+            stdout, stderr = next(exec_stream)
+        except StopIteration:
+            return
+        if stdout:
+            yield stdout
+        if stderr:
+            yield stderr
+
+
+def compare_rib(route_server_name: str, resource_file: Union[str, List[str]], streaming: bool = False) -> dict:
     """Compare RIB between live route server and uploaded resource dump.
-    
+
+    This is blocking and meant to be run outside the event loop.
+
+    By default, the whole output is collected and parsed with the configured table dump class, as the uploaded
+    dumps are: only the routes of the member dump entries are compared. In streaming mode, the live RIB is parsed
+    while it is read from the route server, so the raw output is never held in memory nor written to disk; the
+    uploaded dumps are then parsed with the same incremental parser, and all the routes are compared. Routes are
+    encoded as compact keys and diffed as sorted arrays.
+
     Args:
         route_server_name: Name of the route server device
-        resource_file: Name of the RIB dump file in resources directory
+        resource_file: Name of the RIB dump file in resources directory, or list of names to compare against the
+            union of their routes
+        streaming: If True, use the streaming comparison
         
     Returns:
-        dict: Comparison results with live/uploaded routes and differences
+        dict: Comparison summary, the differences are stored in the comparisons store and the history under its ID
         
     Raises:
         Exception: If comparison fails
     """
+    resource_files = [resource_file] if isinstance(resource_file, str) else list(resource_file)
+    mode = "streaming" if streaming else "buffered"
+    start = time.perf_counter()
     try:
-        logger.info(f"Comparing RIB for route server '{route_server_name}' with resource file '{resource_file}'")
+        logger.info(f"Comparing RIB for route server '{route_server_name}' with resource files {resource_files}")
 
         # Get settings to find route server configuration
         settings = Settings.get_instance()
@@ -293,11 +922,7 @@ async def compare_rib(route_server_name: str, resource_file: str) -> dict:
 
         # Get Kathara manager instance
         manager = Kathara.get_instance()
-        net_scenario_manager = digital_twin_state.get_net_scenario_manager()
-        if net_scenario_manager is None:
-            raise Exception("Network scenario manager not initialized")
-
-        lab = net_scenario_manager.get()
+        lab = get_lab()
 
         # Execute appropriate command based on route server type
         if rs_type == "bird":
@@ -307,72 +932,353 @@ async def compare_rib(route_server_name: str, resource_file: str) -> dict:
         else:
             raise ValueError(f"Unsupported route server type: {rs_type}")
 
+        for file in resource_files:
+            resource_path = os.path.join(RESOURCES_FOLDER, file)
+            if not os.path.exists(resource_path):
+                raise FileNotFoundError(f"Resource file '{file}' not found at {resource_path}")
+
+        logger.info(f"Loading uploaded RIB dumps from {resource_files}")
+        if streaming:
+            # Both sides go through the incremental parser, which does not filter the routes by member
+            codec, uploaded_keys = _load_parsed_routes(settings, resource_files)
+        else:
+            codec, uploaded_keys = _load_uploaded_routes(settings, resource_files)
+
         logger.info(f"Executing command on {route_server_name}: {command}")
-        output = manager.exec(machine_name=route_server_name, command=command, lab=lab, stream=False)
-        live_output = output[0] if output[0] else output[1]
-        live_output = live_output.decode('utf-8') if isinstance(live_output, bytes) else live_output
-        
-        # Write live_output to temporary file
-        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.txt') as tmp_file:
-            tmp_file.write(live_output)
-            temp_file_path = tmp_file.name
-        logger.debug(f"Live output written to temporary file: {temp_file_path}")
-        logger.debug(f"Live output written to temporary file: {live_output}")
-
-        resource_path = os.path.join(RESOURCES_FOLDER, resource_file)
-        if not os.path.exists(resource_path):
-            raise FileNotFoundError(f"Resource file '{resource_file}' not found at {resource_path}")
-
-        logger.info(f"Loading uploaded RIB dump from {resource_file}")
-        member_dump_class = MemberDumpFactory(submodule_package="digital_twin").get_class_from_name(
-            settings.peering_configuration["type"]
+        if streaming:
+            # Routes are encoded as they are parsed, the raw output is never held in memory
+            exec_stream = manager.exec(machine_name=route_server_name, command=command, lab=lab, stream=True)
+            live_keys = _index_routes(parse_routes(iter_lines(iter_exec_output(exec_stream)), rs_type), codec)
+        else:
+            live_keys = _index_routes(_load_live_routes_from_table_dump(settings, manager.exec(
+                machine_name=route_server_name, command=command, lab=lab, stream=False
+            )), codec)
+
+        only_in_live, only_in_uploaded, _ = diff_sorted(live_keys, uploaded_keys)
+
+        # Store the sorted differences, clients page through them by comparison ID
+        comparison = RibComparison(
+            route_server=route_server_name,
+            resource_files=resource_files,
+            live_count=len(live_keys),
+            uploaded_count=len(uploaded_keys),
+            codec=codec,
+            only_in_live=only_in_live,
+            only_in_uploaded=only_in_uploaded,
         )
-        entries = member_dump_class().load_from_file(
-            os.path.join(RESOURCES_FOLDER, settings.peering_configuration["path"])
+        comparison_store.add(comparison)
+        # Written in the background, the comparison is served from the store meanwhile
+        comparison_history.record(comparison)
+        total_differences = comparison.differences_count
+
+        logger.info(
+            f"RIB comparison complete: Live={len(live_keys)}, Uploaded={len(uploaded_keys)}, "
+            f"Differences={total_differences}"
         )
+        RIB_COMPARE_SECONDS.labels(mode, "success").observe(time.perf_counter() - start)
+        RIB_PARSED_ROUTES.labels(route_server_name).inc(len(live_keys))
+        RIB_ROUTES.labels(route_server_name, "live").set(len(live_keys))
+        RIB_ROUTES.labels(route_server_name, "uploaded").set(len(uploaded_keys))
+
+        return {
+            "status": "success",
+            **comparison.summary(),
+            "message": f"Found {total_differences} differences between live and uploaded RIB"
+        }
+
+    except Exception as e:
+        RIB_COMPARE_SECONDS.labels(mode, "error").observe(time.perf_counter() - start)
+        logger.error(f"Failed to compare RIB: {str(e)}", exc_info=True)
+        raise
+
+
+def compare_rib_batch(route_servers: Optional[List[str]] = None, resource_files: Optional[List[str]] = None,
+                      max_parallel: Optional[int] = None, streaming: bool = False) -> dict:
+    """Compare the RIB of several route servers concurrently.
 
-        # Create a table dump instance and load the uploaded file
+    This is blocking and meant to be run outside the event loop.
+
+    Args:
+        route_servers: Names of the route servers to compare, all the configured ones if None
+        resource_files: RIB dump files each route server is compared against (the union of their routes), all
+            the configured RIB dumps if None
+        max_parallel: Maximum number of concurrent comparisons, the configured default if None
+        streaming: If True, use the streaming comparison
+
+    Returns:
+        dict: Aggregated summary with the per route server results and timings
+
+    Raises:
+        ValueError: If a route server is not configured or no RIB dump is selected
+    """
+    settings = Settings.get_instance()
+    if route_servers is None:
+        route_servers = list(settings.route_servers.keys())
+    unknown = [name for name in route_servers if name not in settings.route_servers]
+    if unknown:
+        raise ValueError(f"Route servers not found in configuration: {', '.join(unknown)}")
+
+    if resource_files is None:
+        resource_files = list(settings.rib_dumps.get("dumps", {}).values())
+    if not resource_files:
+        raise ValueError("No RIB dump files to compare against")
+
+    max_parallel = max(1, min(max_parallel or api_settings.rib_compare_max_parallel, len(route_servers) or 1))
+    logger.info(f"Comparing RIB of {len(route_servers)} route servers, {max_parallel} at a time")
+
+    def compare(route_server_name: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            result = compare_rib(route_server_name, resource_files, streaming)
+            result["error"] = None
+        except Exception as e:
+            result = {"status": "error", "route_server": route_server_name, "error": str(e)}
+        result["seconds"] = round(time.perf_counter() - start, 3)
+        return result
+
+    start = time.perf_counter()
+    # Comparisons on the same dumps share the uploaded index: the dumps cache loads it once
+    with ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix="rib-compare") as executor:
+        results = list(executor.map(compare, route_servers))
+
+    succeeded = [result for result in results if result["status"] == "success"]
+    return {
+        "status": "success" if len(succeeded) == len(results) else "partial" if succeeded else "error",
+        "resource_files": resource_files,
+        "route_servers_count": len(results),
+        "failed_count": len(results) - len(succeeded),
+        "differences_count": sum(result["differences_count"] for result in succeeded),
+        "seconds": round(time.perf_counter() - start, 3),
+        "results": results,
+    }
+
+
+def _load_live_routes_from_table_dump(settings, output: tuple) -> List[RouteKey]:
+    """Parse a collected live RIB output with the configured table dump class.
+
+    Args:
+        settings: Digital twin settings
+        output: (stdout, stderr, return code) tuple of the non-streamed exec
+
+    Returns:
+        list: The live routes
+    """
+    live_output = output[0] if output[0] else output[1]
+    live_output = live_output.decode('utf-8') if isinstance(live_output, bytes) else live_output
+
+    # The table dump class only loads from files, the temporary file is removed right after parsing
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.txt') as tmp_file:
+        tmp_file.write(live_output)
+        tmp_file.flush()
+
+        # Both dumps share the same member entries, the cache hands out a private copy for the live one
+        live_entries = _load_member_entries(settings)
         table_dump_class = TableDumpFactory(submodule_package="digital_twin").get_class_from_name(
             settings.rib_dumps["type"]
         )
-        uploaded_dump = table_dump_class(entries)
-        uploaded_dump.load_from_file(resource_path)
-
-        live_entries = member_dump_class().load_from_file(
-            os.path.join(RESOURCES_FOLDER, settings.peering_configuration["path"])
-        )
-        
-        logger.debug(f"Live entries loaded: {live_entries}")
         live_dump = table_dump_class(live_entries)
-        live_dump.load_from_file(temp_file_path)
+        live_dump.load_from_file(tmp_file.name)
 
-        # Extract all routes from the uploaded dump
-        uploaded_routes = _extract_routes_from_entries(uploaded_dump.entries)
-        
-        live_routes = _extract_routes_from_entries(live_dump.entries)
+    return list(_extract_routes_from_entries(live_dump.entries))
 
-        # Compute differences
-        only_in_live = sorted(list(live_routes - uploaded_routes))
-        only_in_uploaded = sorted(list(uploaded_routes - live_routes))
-        total_differences = len(only_in_live) + len(only_in_uploaded)
 
-        logger.info(
-            f"RIB comparison complete: Live={len(live_routes)}, Uploaded={len(uploaded_routes)}, "
-            f"Differences={total_differences}"
+@lru_cache(maxsize=1)
+def _replica_lab(lab_name: str, machine_names: Tuple[str, ...]) -> Lab:
+    # Kathara addresses the machines by lab hash and machine name, derived from the names alone
+    lab = Lab(lab_name)
+    for machine_name in machine_names:
+        lab.get_or_new_machine(machine_name)
+    return lab
+
+
+def get_lab() -> Any:
+    """Get the Kathara lab of the running digital twin.
+
+    In the workers mirroring the leader, the lab only has the name and the machines of the deployed one, which is
+    enough to reach its machines.
+    """
+    net_scenario_manager = digital_twin_state.get_net_scenario_manager()
+    if net_scenario_manager is not None:
+        return net_scenario_manager.get()
+    replica = digital_twin_state.get_replica()
+    if replica is not None and replica["lab_name"] is not None:
+        return _replica_lab(replica["lab_name"], tuple(replica["machines"]))
+    raise RuntimeError("Network scenario manager not initialized")
+
+
+def exec_machine_command(machine_name: str, command: str) -> str:
+    """Execute a command on a machine of the digital twin.
+
+    This is blocking and meant to be run outside the event loop.
+
+    Args:
+        machine_name: Name of the machine
+        command: Command to execute
+
+    Returns:
+        str: Output of the command, stdout or stderr if stdout is empty
+    """
+    start = time.perf_counter()
+    try:
+        output = Kathara.get_instance().exec(
+            machine_name=machine_name,
+            command=command,
+            lab=get_lab(),
+            stream=False,
         )
+    except Exception:
+        EXEC_SECONDS.labels("exec", "error").observe(time.perf_counter() - start)
+        raise
+    EXEC_SECONDS.labels("exec", "success").observe(time.perf_counter() - start)
+    output = output[0] if output[0] else output[1]
+    return output.decode("utf-8").strip() if output else ""
+
+
+def select_machines(machine_names: Optional[List[str]] = None, selector: Optional[str] = None,
+                    asn: Optional[int] = None) -> List[str]:
+    """Resolve the machines targeted by a bulk operation.
+
+    Exactly one of the arguments must be set.
+
+    Args:
+        machine_names: Explicit list of machine names
+        selector: "all" machines, "route_servers" or "peers"
+        asn: Peer routers of this AS
 
+    Returns:
+        List[str]: Names of the selected machines, sorted
+
+    Raises:
+        ValueError: If the selection is invalid, refers to unknown machines or is empty
+    """
+    if sum(value is not None for value in (machine_names, selector, asn)) != 1:
+        raise ValueError("Exactly one of machine_names, selector and asn must be set")
+
+    lab_machines = set(get_lab().machines.keys())
+
+    if machine_names is not None:
+        unknown = [name for name in machine_names if name not in lab_machines]
+        if unknown:
+            raise ValueError(f"Machines not found: {', '.join(unknown)}")
+        selected = set(machine_names)
+    elif selector == "all":
+        selected = lab_machines
+    elif selector == "route_servers":
+        selected = lab_machines & set(Settings.get_instance().route_servers.keys())
+    elif selector == "peers":
+        selected = {name for name in lab_machines if PEER_NAME_RE.match(name)}
+    elif selector is not None:
+        raise ValueError(f"Unknown selector '{selector}', expected one of: {', '.join(MACHINE_SELECTORS)}")
+    else:
+        selected = {
+            name for name in lab_machines
+            if (match := PEER_NAME_RE.match(name)) is not None and int(match.group(1)) == asn
+        }
+
+    if not selected:
+        raise ValueError("No machine matches the selection")
+    return sorted(selected)
+
+
+def bulk_exec(machine_names: List[str], command: str, timeout: float, max_parallel: Optional[int] = None,
+              deadline: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+    """Execute a command on several machines concurrently, yielding each result as soon as it is available.
+
+    The commands are run as streamed execs, see `exec_streams.py`, so that they can be killed in their machine: a
+    command still running after `timeout` seconds is killed and reported as timed out, releasing its slot for the
+    queued machines. Once `deadline` seconds have passed, the running commands are killed and the queued machines
+    are skipped, all reported as timed out.
+
+    Args:
+        machine_names: Names of the machines
+        command: Command to execute
+        timeout: Seconds after which a command is reported as timed out
+        max_parallel: Maximum number of concurrent execs, the configured default if None
+        deadline: Seconds after which the whole execution is stopped, the configured default if None
+
+    Yields:
+        Dict[str, Any]: Result of each machine, in completion order
+    """
+    max_parallel = max(1, min(max_parallel or api_settings.exec_max_parallel, len(machine_names)))
+    deadline = deadline or api_settings.exec_bulk_deadline
+    logger.info(f"Executing command on {len(machine_names)} machines, {max_parallel} at a time: {command}")
+    lab = get_lab()
+    sessions: Dict[str, ExecSession] = {}
+    started_at: Dict[str, float] = {}
+    ends_at = time.monotonic() + deadline
+    # Set once the deadline passed, under the lock so that no command starts while the running ones are killed
+    stopped = threading.Event()
+    lock = threading.Lock()
+
+    def run(machine_name: str) -> str:
+        session = ExecSession(machine_name, command, api_settings.exec_stream_max_bytes)
+        with lock:
+            if stopped.is_set():
+                raise TimeoutError(f"Command not started within the {deadline}s deadline")
+            sessions[machine_name] = session
+            started_at[machine_name] = time.monotonic()
+        start = time.perf_counter()
+        try:
+            output = b"".join(stream_exec(session, lab))
+        except Exception:
+            EXEC_SECONDS.labels("bulk", "error").observe(time.perf_counter() - start)
+            raise
+        EXEC_SECONDS.labels("bulk", session.status).observe(time.perf_counter() - start)
+        return output.decode("utf-8", errors="replace").strip()
+
+    def timed_out(machine_name: str, now: float, error: str) -> Dict[str, Any]:
+        session = sessions.get(machine_name)
+        if session is not None:
+            # Killed in the machine, so the worker thread is released for the queued machines
+            session.cancel(lab)
         return {
-            "status": "success",
-            "route_server": route_server_name,
-            "resource_file": resource_file,
-            "live_rib_lines": len(live_routes),
-            "uploaded_rib_lines": len(uploaded_routes),
-            "only_in_live": only_in_live,
-            "only_in_uploaded": only_in_uploaded,
-            "differences_count": total_differences,
-            "message": f"Found {total_differences} differences between live and uploaded RIB"
+            "machine_name": machine_name,
+            "status": "timeout",
+            "output": None,
+            "error": error,
+            "seconds": round(now - started_at[machine_name], 3) if machine_name in started_at else 0.0,
         }
 
-    except Exception as e:
-        logger.error(f"Failed to compare RIB: {str(e)}", exc_info=True)
-        raise
\ No newline at end of file
+    executor = ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix="bulk-exec")
+    futures = {executor.submit(run, machine_name): machine_name for machine_name in machine_names}
+    pending = set(futures)
+    try:
+        while pending:
+            # Woken up at the next timeout, or after a second to check the machines started meanwhile
+            now = time.monotonic()
+            expiries = [started_at[futures[future]] + timeout for future in pending if futures[future] in started_at]
+            wait_seconds = max(0.0, min([now + 1.0, ends_at] + expiries) - now)
+            done, pending = wait(pending, timeout=wait_seconds, return_when=FIRST_COMPLETED)
+            now = time.monotonic()
+            for future in done:
+                machine_name = futures[future]
+                result = {
+                    "machine_name": machine_name,
+                    "status": "success",
+                    "output": None,
+                    "error": None,
+                    "seconds": round(now - started_at[machine_name], 3),
+                }
+                try:
+                    result["output"] = future.result()
+                except Exception as e:
+                    result.update(status="error", error=str(e))
+                yield result
+
+            if now >= ends_at:
+                with lock:
+                    stopped.set()
+                for future in pending:
+                    future.cancel()
+                for future in pending:
+                    yield timed_out(futures[future], now, f"Command did not complete within the {deadline}s deadline")
+                break
+
+            for future in list(pending):
+                machine_name = futures[future]
+                if machine_name in started_at and now - started_at[machine_name] > timeout:
+                    pending.remove(future)
+                    yield timed_out(machine_name, now, f"Command did not complete within {timeout}s")
+    finally:
+        # Also reached when the client disconnects: machines not started yet are skipped
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,212 @@
+"""Background pre-parsing of the uploaded RIB dumps.
+
+Each uploaded RIB dump is parsed by a worker process with the table dump class of the configured RIB dump type, so
+a bad dump is reported right after its upload instead of at the next start or comparison. The summary of each file
+(routes per address family and per member ASN, parse time, error) is stored in the resource catalogue. The worker
+writes the snapshots of the parsed table dump and route index itself, only their paths come back to the backend:
+the next start or comparison against them reads the snapshots instead of parsing the dumps, even after a restart.
+
+A file that is one of the configured RIB dumps is parsed together with the other ones, as the digital twin loads
+them, so that the cached table dump is the one it looks up.
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
+from digital_twin.ixp.globals import RESOURCES_FOLDER
+
+from ixp_config import IxpConfigError, IxpConfigStore
+from operations import preparse_table_dump
+from resource_catalogue import FORMAT_BIRD, FORMAT_OPEN_BGPD, detect_format, resource_catalogue
+
+logger = logging.getLogger(__name__)
+
+# Lines of a file read to check that it is a RIB dump
+_DETECT_MAX_LINES = 200
+
+PREPARSE_PENDING = "pending"
+
+
+def _read_head(path: str) -> List[str]:
+    lines = []
+    with open(path, "r", errors="replace") as f:
+        for line in f:
+            lines.append(line)
+            if len(lines) >= _DETECT_MAX_LINES:
+                break
+    return lines
+
+
+class DumpPreparser:
+    """Hands the uploaded RIB dumps to a process pool, storing their summaries and snapshotting the parsed dumps."""
+
+    def __init__(self, config_store: IxpConfigStore, max_workers: int):
+        """Initialize the preparser.
+
+        Args:
+            config_store: Store of ixp.conf, read for the RIB dump type and the member dump
+            max_workers: Number of worker processes, 0 disables the pre-parsing
+        """
+        self.config_store = config_store
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending: Dict[Tuple[str, ...], Future] = {}
+        self._resubmit: Dict[Tuple[str, ...], Tuple[str, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, relative_path: str) -> bool:
+        """Pre-parse a resource file if it is a RIB dump, or if it is the configured member dump.
+
+        When the file is one of the configured RIB dumps or the member dump, the configured RIB dumps are parsed.
+
+        Args:
+            relative_path: Path relative to the resources directory
+
+        Returns:
+            bool: True if a pre-parse was started
+        """
+        config = self._load_config()
+        if config is None:
+            return False
+        rib_dump_type, peering_configuration, configured = config
+        relative_path = relative_path.replace(os.sep, "/").strip("/")
+
+        if relative_path == peering_configuration["path"] or relative_path in configured:
+            return self._submit(rib_dump_type, peering_configuration, configured)
+
+        path = os.path.join(RESOURCES_FOLDER, relative_path)
+        try:
+            file_format = detect_format(_read_head(path))
+        except (FileNotFoundError, IsADirectoryError):
+            return False
+        if file_format not in (FORMAT_BIRD, FORMAT_OPEN_BGPD):
+            return False
+        return self._submit(rib_dump_type, peering_configuration, [relative_path])
+
+    def submit_configured(self) -> bool:
+        """Pre-parse the configured RIB dumps, e.g. after ixp.conf changed.
+
+        Returns:
+            bool: True if a pre-parse was started
+        """
+        config = self._load_config()
+        if config is None:
+            return False
+        return self._submit(*config)
+
+    def status(self, relative_path: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Get the pre-parse status of a file and its summary.
+
+        Args:
+            relative_path: Path relative to the resources directory
+
+        Returns:
+            Tuple[str, Optional[Dict[str, Any]]]: "pending", the summary status ("parsed", "failed") or
+            "not_parsed", and the summary
+        """
+        relative_path = relative_path.replace(os.sep, "/").strip("/")
+        with self._lock:
+            pending = any(relative_path in files for files in self._pending)
+        summary = resource_catalogue.get_summary(relative_path)
+        if pending:
+            return PREPARSE_PENDING, summary
+        return (summary["status"] if summary is not None else "not_parsed"), summary
+
+    def shutdown(self) -> None:
+        """Stop the worker processes, cancelling the pending pre-parses."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _load_config(self) -> Optional[Tuple[str, Dict[str, Any], List[str]]]:
+        if self.max_workers <= 0:
+            return None
+        try:
+            config, _ = self.config_store.get()
+        except IxpConfigError as e:
+            logger.warning(f"RIB dumps not pre-parsed: {str(e)}")
+            return None
+
+        rib_dumps = config.get("rib_dumps") or {}
+        peering_configuration = config.get("peering_configuration") or {}
+        if not rib_dumps.get("type") or not peering_configuration.get("type") or not peering_configuration.get("path"):
+            return None
+        # In the order of ixp.conf, as the digital twin loads them
+        configured = list((rib_dumps.get("dumps") or {}).values())
+        return rib_dumps["type"], peering_configuration, configured
+
+    def _submit(self, rib_dump_type: str, peering_configuration: Dict[str, Any], files: List[str]) -> bool:
+        files = [file for file in files if os.path.isfile(os.path.join(RESOURCES_FOLDER, file))]
+        if not files:
+            return False
+
+        try:
+            # Recorded now: if a file changes while it is parsed, its summary is stored for a stale version
+            versions = {}
+            for file in files:
+                stat = os.stat(os.path.join(RESOURCES_FOLDER, file))
+                versions[file] = (stat.st_size, stat.st_mtime_ns)
+        except FileNotFoundError as e:
+            logger.warning(f"RIB dumps {files} not pre-parsed: {str(e)}")
+            return False
+
+        pending_key = tuple(files)
+        with self._lock:
+            if pending_key in self._pending:
+                # Already being parsed, maybe an older version: parsed again once done
+                self._resubmit[pending_key] = (rib_dump_type, peering_configuration)
+                return True
+            if self._executor is None:
+                # Spawned, not forked: the workers do not inherit the threads and locks of the backend
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            try:
+                future = self._executor.submit(preparse_table_dump, rib_dump_type, peering_configuration, files)
+            except RuntimeError as e:
+                # Shut down meanwhile, e.g. a parse of a file changed during the previous one finishing on exit
+                logger.warning(f"RIB dumps {files} not pre-parsed: {str(e)}")
+                return False
+            self._pending[pending_key] = future
+
+        logger.info(f"Pre-parsing RIB dumps {files} as {rib_dump_type}...")
+        future.add_done_callback(
+            lambda done: self._on_done(done, pending_key, versions)
+        )
+        return True
+
+    def _on_done(self, future: Future, pending_key: Tuple[str, ...], versions: Dict[str, Tuple[int, int]]) -> None:
+        try:
+            if future.cancelled():
+                return
+            try:
+                snapshot_paths, summaries = future.result()
+            except Exception as e:
+                logger.error(f"Failed to pre-parse RIB dumps {list(pending_key)}: {str(e)}")
+                if isinstance(e, BrokenProcessPool):
+                    # A worker died, e.g. killed for its memory: the next submission starts a new pool
+                    with self._lock:
+                        self._executor = None
+                summaries = {file: {"status": "failed", "error": str(e)} for file in pending_key}
+                snapshot_paths = []
+
+            for file, summary in summaries.items():
+                resource_catalogue.set_summary(file, *versions[file], summary)
+                if summary["status"] == "failed":
+                    logger.warning(f"RIB dump {file} failed to pre-parse: {summary['error']}")
+
+            if snapshot_paths:
+                names = [os.path.basename(path) for path in snapshot_paths]
+                logger.info(f"RIB dumps {list(pending_key)} pre-parsed, snapshots {names} written")
+        finally:
+            with self._lock:
+                self._pending.pop(pending_key, None)
+                resubmit = self._resubmit.pop(pending_key, None)
+            if resubmit is not None:
+                self._submit(*resubmit, list(pending_key))
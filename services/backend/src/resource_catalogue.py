@@ -0,0 +1,483 @@
+"""Persistent catalogue of the resource files, with their metadata, content hash and detected dump format.
+
+The catalogue is a SQLite database in the resources directory. A background thread keeps it up to date: it
+periodically compares the sizes and modification times of the entries with the indexed ones, and
+re-indexes only the files that changed. Uploads refresh their entry right away, and the listing endpoints read the
+catalogue instead of the disk.
+
+Indexing a file reads it once, computing its SHA-256, detecting its format from the first lines, and counting the
+IPv4 and IPv6 routes of the BIRD and OpenBGPD dumps.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from config import api_settings
+from rib_parser import iter_lines, parse_routes
+
+logger = logging.getLogger(__name__)
+
+FORMAT_BIRD = "bird"
+FORMAT_OPEN_BGPD = "open_bgpd"
+FORMAT_JSON = "json"
+FORMAT_UNKNOWN = "unknown"
+
+_READ_CHUNK_BYTES = 1024 * 1024
+# Lines of a file inspected to detect its format
+_DETECT_MAX_LINES = 200
+# Milliseconds a worker waits for another one writing to the catalogue
+_BUSY_TIMEOUT_MS = 10000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS resources (
+    path TEXT PRIMARY KEY,
+    parent TEXT NOT NULL,
+    type TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    files_count INTEGER NOT NULL,
+    sha256 TEXT,
+    format TEXT,
+    routes_v4 INTEGER,
+    routes_v6 INTEGER,
+    indexed_at REAL,
+    summary TEXT
+);
+CREATE INDEX IF NOT EXISTS resources_parent ON resources (parent);
+"""
+
+
+def detect_format(lines: List[str]) -> str:
+    """Detect the format of a resource file from its first lines.
+
+    Args:
+        lines: First lines of the file
+
+    Returns:
+        str: bird, open_bgpd, json or unknown
+    """
+    for line in lines:
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if stripped[0] in "{[":
+            return FORMAT_JSON
+        break
+
+    for line in lines:
+        stripped = line.strip()
+        if stripped.startswith("BIRD ") or stripped.startswith("BGP.as_path:"):
+            return FORMAT_BIRD
+        if stripped.startswith("flags ") and "destination" in stripped or stripped.startswith("origin validation"):
+            return FORMAT_OPEN_BGPD
+    return FORMAT_UNKNOWN
+
+
+def _iter_chunks(path: str, digest) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(_READ_CHUNK_BYTES)
+            if not chunk:
+                return
+            digest.update(chunk)
+            yield chunk
+
+
+def index_file(path: str) -> Dict[str, Any]:
+    """Read a resource file once, computing its hash, format and route counts.
+
+    Args:
+        path: Path of the file
+
+    Returns:
+        Dict[str, Any]: sha256, format, routes_v4 and routes_v6 (None if the file is not a RIB dump)
+    """
+    digest = hashlib.sha256()
+    lines = iter_lines(_iter_chunks(path, digest))
+    head = []
+    for line in lines:
+        head.append(line)
+        if len(head) >= _DETECT_MAX_LINES:
+            break
+    file_format = detect_format(head)
+
+    routes = {4: None, 6: None}
+    if file_format in (FORMAT_BIRD, FORMAT_OPEN_BGPD):
+        routes = {4: 0, 6: 0}
+        for network, _ in parse_routes(_chain(head, lines), file_format):
+            routes[6 if ":" in network else 4] += 1
+    else:
+        # Hash the rest of the file
+        for _ in lines:
+            pass
+
+    return {"sha256": digest.hexdigest(), "format": file_format, "routes_v4": routes[4], "routes_v6": routes[6]}
+
+
+def _chain(head: List[str], rest: Iterator[str]) -> Iterator[str]:
+    yield from head
+    yield from rest
+
+
+class ResourceCatalogue:
+    """Index of the files and directories of the resources directory."""
+
+    def __init__(self, resources_dir: str, scan_interval: float):
+        """Initialize the catalogue.
+
+        Args:
+            resources_dir: Resources directory
+            scan_interval: Seconds between two scans of the directory for changes
+        """
+        self.resources_dir = resources_dir
+        self.db_path = os.path.join(resources_dir, ".catalogue.sqlite3")
+        self.scan_interval = scan_interval
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._queued = set()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def open(self) -> None:
+        """Open the catalogue without indexing, e.g. in the workers reading the catalogue the leader maintains."""
+        with self._lock:
+            if self._connection is not None:
+                return
+            os.makedirs(self.resources_dir, exist_ok=True)
+            connection = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            # Shared by the backend workers: readers do not block the writer, writers wait for each other
+            connection.execute(f"PRAGMA busy_timeout = {_BUSY_TIMEOUT_MS}")
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.executescript(_SCHEMA)
+            columns = {row["name"] for row in connection.execute("PRAGMA table_info(resources)")}
+            if "summary" not in columns:
+                # Catalogues created before the dumps were pre-parsed
+                try:
+                    connection.execute("ALTER TABLE resources ADD COLUMN summary TEXT")
+                except sqlite3.OperationalError:
+                    # Added by another worker meanwhile
+                    pass
+            self._connection = connection
+
+    def start(self) -> None:
+        """Open the catalogue, synchronize it with the directory and start the background indexing."""
+        if self._thread is not None:
+            return
+        self.open()
+        self.scan()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="resource-catalogue", daemon=True)
+        self._thread.start()
+        logger.info(f"Resource catalogue started ({self.db_path})")
+
+    def stop(self) -> None:
+        """Stop the background indexing and close the catalogue."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._queue.put("")
+            self._thread.join(timeout=5)
+            self._thread = None
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def scan(self, top: Optional[str] = None) -> None:
+        """Synchronize the catalogue with the directory: add, update and remove entries, and queue the changed files.
+
+        Only the sizes and modification times are read, the changed files are indexed in the background.
+
+        Args:
+            top: Top-level entry to synchronize, the whole directory if None
+        """
+        entries = self._walk(top)
+        with self._lock:
+            if self._connection is None:
+                return
+            if top is None:
+                rows = self._connection.execute("SELECT * FROM resources")
+            else:
+                rows = self._connection.execute(
+                    "SELECT * FROM resources WHERE path = ? OR substr(path, 1, ?) = ?", (top, len(top) + 1, f"{top}/")
+                )
+            indexed = {row["path"]: row for row in rows}
+
+            removed = [(path,) for path in indexed if path not in entries]
+            changed = []
+            to_index = []
+            for path, (entry_type, size, mtime_ns, files_count) in entries.items():
+                row = indexed.get(path)
+                if row is None or (row["size"], row["mtime_ns"], row["files_count"]) != (size, mtime_ns, files_count):
+                    changed.append((path, _parent(path), entry_type, size, mtime_ns, files_count))
+                    if entry_type == "file":
+                        to_index.append(path)
+                elif entry_type == "file" and row["indexed_at"] is None:
+                    to_index.append(path)
+
+            self._connection.execute("BEGIN")
+            self._connection.executemany("DELETE FROM resources WHERE path = ?", removed)
+            # The detected metadata is reset, until the file is indexed again
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO resources (path, parent, type, size, mtime_ns, files_count) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                changed,
+            )
+            self._connection.execute("COMMIT")
+
+        if removed or changed:
+            logger.info(f"Resource catalogue updated: {len(changed)} entries changed, {len(removed)} removed")
+        for path in to_index:
+            self._enqueue(path)
+
+    def refresh(self, relative_path: str) -> None:
+        """Synchronize the top-level entry containing a path, e.g. after an upload.
+
+        Args:
+            relative_path: Path relative to the resources directory
+        """
+        top = relative_path.replace(os.sep, "/").strip("/").split("/")[0]
+        if top and not top.startswith("."):
+            self.scan(top)
+
+    def list(self, directory: str = "", recursive: bool = False, entry_type: Optional[str] = None,
+             file_format: Optional[str] = None, search: Optional[str] = None) -> List[Dict[str, Any]]:
+        """List the catalogued entries of a directory, directories first.
+
+        Args:
+            directory: Directory to list, relative to the resources directory
+            recursive: List the entries of the subdirectories too
+            entry_type: Only list the entries of this type (file or directory)
+            file_format: Only list the files of this detected format
+            search: Only list the entries whose path contains this text (case-insensitive)
+
+        Returns:
+            List[Dict[str, Any]]: Entries with their metadata
+        """
+        directory = directory.strip("/")
+        if recursive and directory:
+            query = "SELECT * FROM resources WHERE substr(path, 1, ?) = ?"
+            params: List[Any] = [len(directory) + 1, f"{directory}/"]
+        elif recursive:
+            query = "SELECT * FROM resources WHERE 1 = 1"
+            params = []
+        else:
+            query = "SELECT * FROM resources WHERE parent = ?"
+            params = [directory]
+        if entry_type is not None:
+            query += " AND type = ?"
+            params.append(entry_type)
+        if file_format is not None:
+            query += " AND format = ?"
+            params.append(file_format)
+        if search:
+            query += " AND instr(lower(path), ?) > 0"
+            params.append(search.lower())
+        query += " ORDER BY type = 'file', path"
+
+        with self._lock:
+            if self._connection is None:
+                return []
+            return [_to_dict(row) for row in self._connection.execute(query, params)]
+
+    def get(self, path: str) -> Optional[Dict[str, Any]]:
+        """Get a catalogued entry.
+
+        Args:
+            path: Path relative to the resources directory
+
+        Returns:
+            Optional[Dict[str, Any]]: The entry with its metadata, None if it is not catalogued
+        """
+        with self._lock:
+            if self._connection is None:
+                return None
+            row = self._connection.execute("SELECT * FROM resources WHERE path = ?", (path.strip("/"),)).fetchone()
+        return _to_dict(row) if row is not None else None
+
+    def indexed_sha256(self, path: str, size: int, mtime_ns: int) -> Optional[str]:
+        """Get the SHA-256 of a file if it is indexed and did not change since.
+
+        Args:
+            path: Path relative to the resources directory
+            size: Current size of the file
+            mtime_ns: Current modification time of the file
+
+        Returns:
+            Optional[str]: The SHA-256 hex digest, None if the file is not indexed in this version
+        """
+        with self._lock:
+            if self._connection is None:
+                return None
+            row = self._connection.execute(
+                "SELECT sha256 FROM resources WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (path.replace(os.sep, "/"), size, mtime_ns),
+            ).fetchone()
+        return row["sha256"] if row is not None else None
+
+    def get_summary(self, path: str) -> Optional[Dict[str, Any]]:
+        """Get the pre-parse summary of a RIB dump, see `DumpPreparser`.
+
+        Args:
+            path: Path relative to the resources directory
+
+        Returns:
+            Optional[Dict[str, Any]]: The summary, None if the file has not been pre-parsed since it last changed
+        """
+        with self._lock:
+            if self._connection is None:
+                return None
+            row = self._connection.execute(
+                "SELECT summary FROM resources WHERE path = ?", (path.strip("/"),)
+            ).fetchone()
+        return json.loads(row["summary"]) if row is not None and row["summary"] is not None else None
+
+    def set_summary(self, path: str, size: int, mtime_ns: int, summary: Dict[str, Any]) -> None:
+        """Store the pre-parse summary of a RIB dump, unless the file changed since it was parsed.
+
+        Args:
+            path: Path relative to the resources directory
+            size: Size of the parsed file
+            mtime_ns: Modification time of the parsed file
+            summary: Summary to store
+        """
+        with self._lock:
+            if self._connection is None:
+                return
+            self._connection.execute(
+                "UPDATE resources SET summary = ? WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (json.dumps(summary), path, size, mtime_ns),
+            )
+
+    def _walk(self, top: Optional[str]) -> Dict[str, list]:
+        """Read the type, size, modification time and files count of the entries, hidden ones excluded.
+
+        The size and files count of a directory are the totals of the files it contains, and its modification time
+        the most recent one, so that a change deep in the tree is seen at every level.
+        """
+        entries: Dict[str, list] = {}
+        start = os.path.join(self.resources_dir, top) if top else self.resources_dir
+        if top and not os.path.isdir(start):
+            try:
+                stat = os.stat(start)
+            except FileNotFoundError:
+                return entries
+            entries[top] = ["file", stat.st_size, stat.st_mtime_ns, 1]
+            return entries
+
+        for dirpath, dirs, files in os.walk(start):
+            dirs[:] = [name for name in dirs if not name.startswith(".")]
+            relative_dir = os.path.relpath(dirpath, self.resources_dir).replace(os.sep, "/")
+            if relative_dir != ".":
+                try:
+                    entries[relative_dir] = ["directory", 0, os.stat(dirpath).st_mtime_ns, 0]
+                except FileNotFoundError:
+                    continue
+
+            for name in files:
+                if name.startswith("."):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(dirpath, name))
+                except FileNotFoundError:
+                    continue
+                path = name if relative_dir == "." else f"{relative_dir}/{name}"
+                entries[path] = ["file", stat.st_size, stat.st_mtime_ns, 1]
+
+                ancestor = _parent(path)
+                while ancestor:
+                    totals = entries[ancestor]
+                    totals[1] += stat.st_size
+                    totals[2] = max(totals[2], stat.st_mtime_ns)
+                    totals[3] += 1
+                    ancestor = _parent(ancestor)
+
+        return entries
+
+    def _enqueue(self, path: str) -> None:
+        with self._lock:
+            if path in self._queued:
+                return
+            self._queued.add(path)
+        self._queue.put(path)
+
+    def _index(self, path: str) -> None:
+        full_path = os.path.join(self.resources_dir, path)
+        try:
+            stat = os.stat(full_path)
+            metadata = index_file(full_path)
+        except (FileNotFoundError, IsADirectoryError):
+            return
+
+        with self._lock:
+            if self._connection is None:
+                return
+            # Skipped if the file changed since it was read, the next scan queues it again
+            self._connection.execute(
+                "UPDATE resources SET sha256 = ?, format = ?, routes_v4 = ?, routes_v6 = ?, indexed_at = ? "
+                "WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (metadata["sha256"], metadata["format"], metadata["routes_v4"], metadata["routes_v6"], time.time(),
+                 path, stat.st_size, stat.st_mtime_ns),
+            )
+        logger.debug(f"Resource '{path}' indexed: {metadata}")
+
+    def _run(self) -> None:
+        next_scan = time.monotonic() + self.scan_interval
+        while not self._stop_event.is_set():
+            try:
+                path = self._queue.get(timeout=max(0.0, next_scan - time.monotonic()))
+            except queue.Empty:
+                path = None
+
+            if path:
+                with self._lock:
+                    self._queued.discard(path)
+                try:
+                    self._index(path)
+                except Exception as e:
+                    logger.warning(f"Failed to index resource '{path}': {str(e)}")
+
+            if time.monotonic() >= next_scan and not self._stop_event.is_set():
+                try:
+                    self.scan()
+                except Exception as e:
+                    logger.warning(f"Failed to scan the resources directory: {str(e)}")
+                next_scan = time.monotonic() + self.scan_interval
+
+
+def _parent(path: str) -> str:
+    return path.rsplit("/", 1)[0] if "/" in path else ""
+
+
+def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+    summary = json.loads(row["summary"]) if row["summary"] is not None else None
+    if summary is not None:
+        # The routes per member are only returned by `get_summary`, they can be thousands
+        summary.pop("members", None)
+    return {
+        "name": row["path"],
+        "type": row["type"],
+        "size": row["size"],
+        "mtime": row["mtime_ns"] / 1e9,
+        "files_count": row["files_count"],
+        "sha256": row["sha256"],
+        "format": row["format"],
+        "routes_v4": row["routes_v4"],
+        "routes_v6": row["routes_v6"],
+        "indexed": row["type"] == "directory" or row["indexed_at"] is not None,
+        "summary": summary,
+    }
+
+
+# Global catalogue of the resources directory
+resource_catalogue = ResourceCatalogue(
+    os.path.join("digital_twin", "resources"), api_settings.resource_catalogue_scan_interval
+)
@@ -0,0 +1,126 @@
+"""Incremental parsers for route server RIB outputs.
+
+The parsers consume the output of `birdc show route all` or `bgpctl show rib` line by line, so a RIB can be
+processed while it is streamed from the route server, without buffering the whole output.
+"""
+
+import codecs
+from typing import Any, Iterable, Iterator, Optional, Tuple, Union
+
+# A route is identified by its network and AS path, networks are validated and normalized when encoded as keys
+RouteKey = Tuple[str, Tuple[str, ...]]
+
+
+def normalize_as_path(as_path: Any) -> Tuple[str, ...]:
+    """Return an AS path as a tuple of tokens, whatever its original representation."""
+    if as_path is None:
+        return ()
+    if isinstance(as_path, str):
+        return tuple(as_path.split())
+    return tuple(str(asn) for asn in as_path)
+
+
+def format_route(route: RouteKey) -> str:
+    """Format a route as displayed in the comparison results."""
+    network, as_path = route
+    return f"Network: {network} - AS Path: {' '.join(as_path)}"
+
+
+def iter_lines(chunks: Iterable[Union[bytes, str, None]]) -> Iterator[str]:
+    """Split a stream of output chunks into lines.
+
+    Args:
+        chunks: Output chunks, as bytes or str, None chunks are skipped
+
+    Yields:
+        str: Each line, without the line terminator
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    for chunk in chunks:
+        if not chunk:
+            continue
+        pending += decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        lines = pending.split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line.rstrip("\r")
+
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+class BirdRouteParser:
+    """Parser of the `birdc show route all` output (BIRD 1.6 and 2.x)."""
+
+    def __init__(self):
+        self._network: Optional[str] = None
+
+    def feed(self, line: str) -> Optional[RouteKey]:
+        """Parse a line, returning a route when its AS path has been read."""
+        if not line:
+            return None
+
+        if not line[0].isspace():
+            # A line starting in the first column opens the routes of a new network
+            token = line.split(None, 1)[0]
+            self._network = token if "/" in token else None
+            return None
+
+        stripped = line.strip()
+        if stripped.startswith("BGP.as_path:") and self._network is not None:
+            return self._network, normalize_as_path(stripped[len("BGP.as_path:"):])
+
+        return None
+
+
+class OpenBgpdRouteParser:
+    """Parser of the `bgpctl show rib` output."""
+
+    def feed(self, line: str) -> Optional[RouteKey]:
+        """Parse a line, returning the route it describes, if any."""
+        tokens = line.split()
+        for i, token in enumerate(tokens):
+            if "/" not in token:
+                continue
+            # destination, gateway, lpref, med, aspath..., origin
+            if len(tokens) < i + 5:
+                return None
+            return token, tuple(tokens[i + 4:-1])
+
+        return None
+
+
+def get_parser(rib_type: str) -> Union[BirdRouteParser, OpenBgpdRouteParser]:
+    """Return a parser for the given route server type.
+
+    Args:
+        rib_type: Route server type ("bird" or "open_bgpd")
+
+    Raises:
+        ValueError: If the type is not supported
+    """
+    if rib_type == "bird":
+        return BirdRouteParser()
+    elif rib_type == "open_bgpd":
+        return OpenBgpdRouteParser()
+
+    raise ValueError(f"Unsupported route server type: {rib_type}")
+
+
+def parse_routes(lines: Iterable[str], rib_type: str) -> Iterator[RouteKey]:
+    """Parse routes out of RIB output lines.
+
+    Args:
+        lines: Lines of the RIB output
+        rib_type: Route server type ("bird" or "open_bgpd")
+
+    Yields:
+        RouteKey: Each parsed route
+    """
+    parser = get_parser(rib_type)
+    for line in lines:
+        route = parser.feed(line)
+        if route is not None:
+            yield route
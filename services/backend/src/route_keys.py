@@ -0,0 +1,194 @@
+"""Compact integer keys for routes, and diff of sorted key arrays.
+
+A route key packs, from the most significant bits: the address family (0 for IPv4, 1 for IPv6), the network
+address (128 bits), the prefix length (8 bits) and the ID of the interned AS path (32 bits). Keys therefore sort
+by address family, network and prefix length, and a full table is held as a sorted list of integers instead of a
+set of formatted strings.
+"""
+
+import itertools
+import socket
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from rib_parser import RouteKey
+
+_PATH_BITS = 32
+_PREFIXLEN_BITS = 8
+_ADDRESS_BITS = 128
+_PATH_MASK = (1 << _PATH_BITS) - 1
+_PREFIXLEN_MASK = (1 << _PREFIXLEN_BITS) - 1
+_ADDRESS_MASK = (1 << _ADDRESS_BITS) - 1
+_AFI_SHIFT = _ADDRESS_BITS + _PREFIXLEN_BITS + _PATH_BITS
+
+
+def pack_prefix(network: str) -> Optional[Tuple[int, int, int]]:
+    """Parse a network in CIDR notation, clearing its host bits.
+
+    Args:
+        network: Network, e.g. "192.0.2.0/24" or "2001:db8::/32"
+
+    Returns:
+        Optional[Tuple[int, int, int]]: (address family, address, prefix length), None if the network is invalid
+    """
+    address, _, prefixlen = network.partition("/")
+    try:
+        if ":" in address:
+            afi, bits, value = 6, 128, int.from_bytes(socket.inet_pton(socket.AF_INET6, address), "big")
+        else:
+            afi, bits, value = 4, 32, int.from_bytes(socket.inet_pton(socket.AF_INET, address), "big")
+        length = int(prefixlen) if prefixlen else bits
+    except (OSError, ValueError):
+        return None
+    if not 0 <= length <= bits:
+        return None
+    host_bits = bits - length
+    return afi, value >> host_bits << host_bits, length
+
+
+def unpack_prefix(afi: int, address: int, prefixlen: int) -> str:
+    """Format a packed prefix in CIDR notation."""
+    if afi == 6:
+        return f"{socket.inet_ntop(socket.AF_INET6, address.to_bytes(16, 'big'))}/{prefixlen}"
+    return f"{socket.inet_ntop(socket.AF_INET, address.to_bytes(4, 'big'))}/{prefixlen}"
+
+
+class RouteKeyCodec:
+    """Encodes routes as integer keys, interning their AS paths.
+
+    Keys are only meaningful with the codec that produced them: routes that must be compared have to be encoded
+    with the same codec (or a fork of it).
+    """
+
+    def __init__(self):
+        self._path_ids: Dict[Tuple[str, ...], int] = {}
+        self._paths: List[Tuple[str, ...]] = []
+        # RIB outputs list all the paths of a network in a row, so the last packed network is reused
+        self._last_network: Optional[str] = None
+        self._last_prefix_bits = 0
+
+    def intern_path(self, as_path: Tuple[str, ...]) -> int:
+        """Return the ID of an AS path, registering it if new."""
+        path_id = self._path_ids.get(as_path)
+        if path_id is None:
+            path_id = len(self._paths)
+            self._path_ids[as_path] = path_id
+            self._paths.append(as_path)
+        return path_id
+
+    def encode(self, network: str, as_path: Tuple[str, ...]) -> Optional[int]:
+        """Encode a route.
+
+        Args:
+            network: Network in CIDR notation
+            as_path: AS path as a tuple of tokens
+
+        Returns:
+            Optional[int]: The route key, None if the network is invalid
+        """
+        if network != self._last_network:
+            prefix = pack_prefix(network)
+            if prefix is None:
+                return None
+            afi, address, prefixlen = prefix
+            self._last_network = network
+            self._last_prefix_bits = (
+                ((1 if afi == 6 else 0) << _AFI_SHIFT)
+                | (address << (_PREFIXLEN_BITS + _PATH_BITS))
+                | (prefixlen << _PATH_BITS)
+            )
+
+        path_id = self._path_ids.get(as_path)
+        if path_id is None:
+            path_id = self.intern_path(as_path)
+        return self._last_prefix_bits | path_id
+
+    def decode(self, key: int) -> RouteKey:
+        """Decode a route key into its (network, AS path) representation."""
+        afi, address, prefixlen = key_prefix(key)
+        return unpack_prefix(afi, address, prefixlen), self._paths[key & _PATH_MASK]
+
+    def get_path(self, path_id: int) -> Tuple[str, ...]:
+        """Return an interned AS path by its ID."""
+        return self._paths[path_id]
+
+    def path_ids_with_asn(self, asn: str) -> Set[int]:
+        """Return the IDs of the AS paths containing an ASN."""
+        return {path_id for path_id, as_path in enumerate(self._paths) if asn in as_path}
+
+    def fork(self) -> "RouteKeyCodec":
+        """Return a copy of the codec: keys of this codec stay valid, new paths are only added to the copy."""
+        codec = RouteKeyCodec()
+        codec._path_ids = dict(self._path_ids)
+        codec._paths = list(self._paths)
+        return codec
+
+    def __len__(self) -> int:
+        """Number of interned AS paths."""
+        return len(self._paths)
+
+
+def key_prefix(key: int) -> Tuple[int, int, int]:
+    """Return the (address family, address, prefix length) of a route key."""
+    afi = 6 if key >> _AFI_SHIFT else 4
+    return (
+        afi,
+        (key >> (_PREFIXLEN_BITS + _PATH_BITS)) & _ADDRESS_MASK,
+        (key >> _PATH_BITS) & _PREFIXLEN_MASK,
+    )
+
+
+def pack_key(afi: int, address: int, prefixlen: int, path_id: int) -> int:
+    """Build a route key from its parts, the inverse of `key_prefix` and `key_path_id`."""
+    return (
+        ((1 if afi == 6 else 0) << _AFI_SHIFT)
+        | (address << (_PREFIXLEN_BITS + _PATH_BITS))
+        | (prefixlen << _PATH_BITS)
+        | path_id
+    )
+
+
+def key_afi(key: int) -> int:
+    """Return the address family (4 or 6) of a route key."""
+    return 6 if key >> _AFI_SHIFT else 4
+
+
+def key_path_id(key: int) -> int:
+    """Return the AS path ID of a route key."""
+    return key & _PATH_MASK
+
+
+def sorted_keys(keys: Iterable[int]) -> List[int]:
+    """Return the sorted keys, without duplicates."""
+    return [key for key, _ in itertools.groupby(sorted(keys))]
+
+
+def diff_sorted(a: List[int], b: List[int]) -> Tuple[List[int], List[int], int]:
+    """Diff two sorted lists of unique keys with a single merge pass.
+
+    Args:
+        a: First sorted list
+        b: Second sorted list
+
+    Returns:
+        Tuple[List[int], List[int], int]: Keys only in `a`, keys only in `b` (both sorted) and number of common keys
+    """
+    only_a = []
+    only_b = []
+    common = 0
+    i = j = 0
+    len_a, len_b = len(a), len(b)
+    while i < len_a and j < len_b:
+        x, y = a[i], b[j]
+        if x == y:
+            common += 1
+            i += 1
+            j += 1
+        elif x < y:
+            only_a.append(x)
+            i += 1
+        else:
+            only_b.append(y)
+            j += 1
+    only_a.extend(a[i:])
+    only_b.extend(b[j:])
+    return only_a, only_b, common
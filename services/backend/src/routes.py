@@ -1,10 +1,17 @@
 """API routes for digital twin management."""
 
+import asyncio
 import logging
 import os
 import json
-from fastapi import HTTPException, BackgroundTasks, UploadFile, File
-from Kathara.manager.Kathara import Kathara
+import threading
+import time
+import uuid
+from typing import List, Optional
+from fastapi import HTTPException, UploadFile, File, Header, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from prometheus_client import CONTENT_TYPE_LATEST
 
 from schemas import (
     StartDigitalTwinRequest,
@@ -12,18 +19,66 @@ from schemas import (
     DigitalTwinStatusResponse,
     ReloadDigitalTwinRequest,
     ReloadDigitalTwinResponse,
+    StopDigitalTwinResponse,
+    JobResponse,
+    JobListResponse,
+    CacheStatsResponse,
     MachineStatsResponse,
+    MachineStatsSample,
+    MachineStatsHistoryResponse,
     MachineExecRequest,
     MachineExecResponse,
+    MachineExecStreamRequest,
+    MachineExecCancelResponse,
+    MachineBulkExecRequest,
     RibComparisonRequest,
     RibComparisonResponse,
+    RibComparisonRoute,
+    RibBatchComparisonRequest,
+    RibBatchComparisonResponse,
+    RibComparisonRoutesResponse,
+    RibComparisonHistoryEntry,
+    RibComparisonHistoryResponse,
+    RibComparisonDiffResponse,
+    UploadSessionRequest,
+    UploadSessionResponse,
+    UploadSessionListResponse,
+)
+from comparison_history import comparison_history, trend
+from comparisons import SIDE_LIVE, SIDE_UPLOADED, RibComparison, RouteFilter, comparison_store, route_to_dict
+from config import api_settings
+from dump_cache import dump_cache
+from events import RESYNC, event_broker, format_event
+from exec_streams import EXEC_RUNNING, exec_sessions, stream_exec
+from ixp_config import IxpConfigError, IxpConfigStore, etag_matches
+from jobs import job_manager
+from metrics import EXEC_SECONDS, job_phase_observer, observe_devices, render_metrics
+from preparse import DumpPreparser
+from resource_catalogue import resource_catalogue
+from rib_parser import format_route
+from shared_state import shared_state
+from state import LIFECYCLE_OPERATIONS, LifecycleError, digital_twin_state
+from stats_sampler import stats_sampler
+from uploads import (
+    UploadError,
+    UploadSessionStore,
+    extract_archive,
+    is_hidden_path,
+    iter_request_body,
+    iter_upload_file,
+    resolve_resource_path,
+    write_stream,
 )
-from state import digital_twin_state
 from operations import (
-    start_digital_twin_async,
+    start_digital_twin,
     stop_digital_twin,
     reload_digital_twin,
     compare_rib,
+    compare_rib_batch,
+    exec_machine_command,
+    get_lab,
+    select_machines,
+    bulk_exec,
 )
 
 logger = logging.getLogger(__name__)
@@ -31,6 +86,31 @@ logger = logging.getLogger(__name__)
 ixp_config_path = os.path.join("digital_twin", "ixp.conf")
 ixp_resource_path = os.path.join("digital_twin", "resources")
 
+upload_sessions = UploadSessionStore(ixp_resource_path)
+ixp_config = IxpConfigStore(ixp_config_path)
+dump_preparser = DumpPreparser(ixp_config, api_settings.preparse_max_workers)
+
+# Lifecycle operations, requested from any worker and run by the leader
+shared_state.register_command("start", start_digital_twin)
+shared_state.register_command("reload", reload_digital_twin, coalesce=True)
+shared_state.register_command("stop", stop_digital_twin)
+
+
+def _cancel_exec(exec_id: str) -> None:
+    """Cancel a streamed exec of this worker, on the request of another worker."""
+    session = exec_sessions.get(exec_id)
+    if session is not None:
+        session.cancel(get_lab())
+
+
+shared_state.register_exec_canceller(_cancel_exec)
+
+# Number of NDJSON lines sent per chunk when streaming RIB comparison results
+NDJSON_BATCH_SIZE = 1000
+
+# Seconds of inactivity after which a comment is sent on the events stream, so proxies keep it open
+EVENTS_KEEPALIVE_SECONDS = 15
+
 
 def register_routes(app):
     """Register all API routes to the FastAPI app.
@@ -44,107 +124,166 @@ def register_routes(app):
         """Health check endpoint."""
         return {"status": "ok", "message": "IXP Digital Twin API is running"}
 
+    def _build_status() -> DigitalTwinStatusResponse:
+        job = job_manager.latest(kinds=list(LIFECYCLE_OPERATIONS))
+        state = digital_twin_state.snapshot()
+        return DigitalTwinStatusResponse(
+            lifecycle=state.lifecycle,
+            running=state.running,
+            starting=state.starting,
+            devices_count=state.devices_count,
+            error=state.error,
+            job=JobResponse(**job.to_dict()) if job is not None else None,
+        )
+
+    def _check_lifecycle(kind: str) -> None:
+        # Validated against the state left by the lifecycle operations queued before this one
+        queued = [job.kind for job in job_manager.unfinished(kinds=list(LIFECYCLE_OPERATIONS))]
+        try:
+            digital_twin_state.check(kind, queued)
+        except LifecycleError as e:
+            raise HTTPException(status_code=e.status_code, detail=str(e))
+
+    def _publish_status(*args) -> None:
+        if event_broker.subscribers_count():
+            event_broker.publish("status", _build_status().model_dump(mode="json"))
+
+    def _publish_stats(changed, removed, sampled_at) -> None:
+        if (changed or removed) and event_broker.subscribers_count():
+            event_broker.publish(
+                "stats", {"full": False, "machines": changed, "removed": removed, "sampled_at": sampled_at}
+            )
+
+    def _events_snapshot() -> str:
+        stats = {
+            "full": True, "machines": stats_sampler.latest(), "removed": [], "sampled_at": stats_sampler.sampled_at()
+        }
+        return format_event("status", _build_status().model_dump(mode="json")) + format_event("stats", stats)
+
+    digital_twin_state.add_listener(_publish_status)
+    job_manager.add_listener(_publish_status)
+    stats_sampler.add_listener(_publish_stats)
+    job_manager.add_listener(job_phase_observer)
+    digital_twin_state.add_listener(observe_devices)
+
+    @app.get("/metrics")
+    async def get_metrics():
+        """Expose the metrics in the Prometheus text format."""
+        return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
     @app.get("/status", response_model=DigitalTwinStatusResponse)
     async def get_status():
         """Get the current status of the digital twin."""
-        return DigitalTwinStatusResponse(
-            running=digital_twin_state.is_running(),
-            starting=digital_twin_state.is_starting(),
-            devices_count=digital_twin_state.get_devices_count(),
-            error=digital_twin_state.get_error(),
+        return _build_status()
+
+    @app.get("/events")
+    async def stream_events(request: Request):
+        """Stream status changes and machines stats deltas as server-sent events.
+
+        The stream starts with a full snapshot ("status" and "stats" with `full` set), followed by a "status" event
+        on each change of the digital twin or of its start/reload job, and a "stats" event after each sample with
+        the changed and removed machines only.
+        """
+        queue = event_broker.subscribe()
+
+        async def generate():
+            try:
+                yield _events_snapshot()
+                while not await request.is_disconnected():
+                    try:
+                        item = await asyncio.wait_for(queue.get(), timeout=EVENTS_KEEPALIVE_SECONDS)
+                    except asyncio.TimeoutError:
+                        yield ": keepalive\n\n"
+                        continue
+                    yield _events_snapshot() if item is RESYNC else format_event(*item)
+            finally:
+                event_broker.unsubscribe(queue)
+
+        return StreamingResponse(
+            generate(),
+            media_type="text/event-stream",
+            # Disable response buffering in reverse proxies, which would hold the events back
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
         )
 
+    @app.get("/jobs", response_model=JobListResponse)
+    async def list_jobs():
+        """List the background jobs, most recent first."""
+        return JobListResponse(jobs=[JobResponse(**job.to_dict()) for job in job_manager.list()])
+
+    @app.get("/jobs/{job_id}", response_model=JobResponse)
+    async def get_job(job_id: str):
+        """Get the status and progress of a background job."""
+        job = job_manager.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+        return JobResponse(**job.to_dict())
+
+    @app.get("/cache/stats", response_model=CacheStatsResponse)
+    async def get_cache_stats():
+        """Get the hit/miss counters and memory usage of the parsed dumps cache."""
+        return CacheStatsResponse(**dump_cache.stats())
+
     @app.post("/start", response_model=StartDigitalTwinResponse)
-    async def start_digital_twin(
-        request: StartDigitalTwinRequest, background_tasks: BackgroundTasks
-    ):
+    async def start_digital_twin(request: StartDigitalTwinRequest):
         """Start the digital twin network scenario."""
-        if digital_twin_state.is_running():
-            raise HTTPException(
-                status_code=400, detail="Digital twin is already running"
-            )
+        _check_lifecycle("start")
 
-        if digital_twin_state.is_starting():
-            raise HTTPException(
-                status_code=400, detail="Digital twin is already starting"
-            )
-
-        # Start in background
-        background_tasks.add_task(start_digital_twin_async, request.max_devices)
+        # Start on the job worker, so the event loop keeps serving requests
+        job = shared_state.submit("start", max_devices=request.max_devices)
 
         return StartDigitalTwinResponse(
             status="starting",
-            message="Digital twin is starting in background. Check /status for progress.",
+            message="Digital twin is starting in background. Check /status or /jobs/{job_id} for progress.",
             devices_count=None,
+            job_id=job.id,
         )
 
-    @app.post("/stop")
+    @app.post("/stop", response_model=StopDigitalTwinResponse)
     async def stop_digital_twin_endpoint():
-        """Stop the digital twin network scenario."""
-        if not digital_twin_state.is_running() and not digital_twin_state.is_starting():
-            raise HTTPException(status_code=400, detail="Digital twin is not running")
-
-        try:
-            return stop_digital_twin()
-        except Exception as e:
-            raise HTTPException(
-                status_code=500, detail=f"Failed to stop digital twin: {str(e)}"
-            )
+        """Stop the digital twin network scenario, once the lifecycle operations in progress are done."""
+        _check_lifecycle("stop")
+
+        job = shared_state.submit("stop")
+        return StopDigitalTwinResponse(
+            status="stopping",
+            message="Digital twin is stopping in background. Check /jobs/{job_id} for progress.",
+            job_id=job.id,
+        )
 
     @app.get("/machines/stats", response_model=MachineStatsResponse)
     async def get_machines_stats_endpoint():
-        """Get statistics about running devices/machines."""
+        """Get statistics about running devices/machines, from the last background sample."""
         if not digital_twin_state.is_running():
             raise HTTPException(status_code=400, detail="Digital twin is not running")
 
-        try:
-            logger.debug("Fetching machines statistics...")
-
-            # Get Kathara manager instance
-            manager = Kathara.get_instance()
-
-            # Get network scenario from manager
-            net_scenario_manager = digital_twin_state.get_net_scenario_manager()
-            if net_scenario_manager is None:
-                raise HTTPException(
-                    status_code=500, detail="Network scenario manager not initialized"
-                )
+        machines_stats = stats_sampler.latest()
+        logger.debug(f"Retrieved statistics for {len(machines_stats)} machines")
+        return MachineStatsResponse(
+            status="success", machines=machines_stats, sampled_at=stats_sampler.sampled_at()
+        )
 
-            lab = net_scenario_manager.get()
-
-            # Check if we already have a generator in state
-            machines_generator = digital_twin_state.get_machines_stats_generator()
-            if machines_generator is None:
-                logger.debug("Creating new machines stats generator...")
-                machines_generator = manager.get_machines_stats(lab=lab)
-                digital_twin_state.set_machines_stats_generator(machines_generator)
-            else:
-                logger.debug("Using existing machines stats generator from state...")
-
-            # Get the next batch from the generator
-            machines_dict = next(machines_generator)
-
-            machines_stats = {}
-            for machine_id, stats in machines_dict.items():
-                machines_stats[machine_id] = {
-                    "status": stats.status,
-                    "image": stats.image,
-                    "cpu_usage": stats.cpu_usage,
-                    "memory_usage": stats.mem_usage,
-                    "pids": stats.pids,
-                    "name": stats.name,
-                }
-
-            logger.debug(f"Retrieved statistics for {len(machines_stats)} machines")
-            return MachineStatsResponse(status="success", machines=machines_stats)
+    @app.get("/machines/stats/history", response_model=MachineStatsHistoryResponse)
+    async def get_machines_stats_history(
+        window: Optional[float] = Query(None, gt=0, description="Seconds of history to return, all kept if not set"),
+        machine_name: Optional[str] = Query(None, description="Only return the history of this machine"),
+    ):
+        """Get the sampled statistics history of the machines."""
+        if not digital_twin_state.is_running():
+            raise HTTPException(status_code=400, detail="Digital twin is not running")
 
-        except HTTPException:
-            raise
-        except Exception as e:
-            logger.error(f"Failed to get machines statistics: {str(e)}", exc_info=True)
-            raise HTTPException(
-                status_code=500, detail=f"Failed to get machines statistics: {str(e)}"
-            )
+        history = stats_sampler.history(window, machine_name)
+        if machine_name is not None and machine_name not in history:
+            raise HTTPException(status_code=404, detail=f"No statistics for machine '{machine_name}'")
+
+        return MachineStatsHistoryResponse(
+            status="success",
+            interval=stats_sampler.interval,
+            machines={
+                name: [MachineStatsSample(**sample._asdict()) for sample in samples]
+                for name, samples in history.items()
+            },
+        )
 
     @app.post("/machines/exec", response_model=MachineExecResponse)
     async def execute_machine_command(request: MachineExecRequest):
@@ -157,27 +296,7 @@ def register_routes(app):
                 f"Executing command on machine '{request.machine_name}': {request.command}"
             )
 
-            # Get Kathara manager instance
-            manager = Kathara.get_instance()
-
-            # Get network scenario from manager
-            net_scenario_manager = digital_twin_state.get_net_scenario_manager()
-            if net_scenario_manager is None:
-                raise HTTPException(
-                    status_code=500, detail="Network scenario manager not initialized"
-                )
-
-            lab = net_scenario_manager.get()
-
-            # Execute command on the machine
-            output = manager.exec(
-                machine_name=request.machine_name,
-                command=request.command,
-                lab=lab,
-                stream=False,
-            )
-            output = output[0] if output[0] else output[1]
-            output = output.decode("utf-8").strip()
+            output = await run_in_threadpool(exec_machine_command, request.machine_name, request.command)
 
             logger.info(
                 f"Command executed successfully on machine '{request.machine_name}'"
@@ -189,8 +308,6 @@ def register_routes(app):
                 output=output,
             )
 
-        except HTTPException:
-            raise
         except Exception as e:
             logger.error(
                 f"Failed to execute command on machine: {str(e)}", exc_info=True
@@ -202,72 +319,181 @@ def register_routes(app):
                 error=str(e),
             )
 
-    @app.post("/reload", response_model=ReloadDigitalTwinResponse)
-    async def reload_digital_twin_endpoint(request: ReloadDigitalTwinRequest):
-        """Reload the digital twin configurations without full restart."""
+    @app.post("/machines/exec/stream")
+    async def stream_machine_command(request: MachineExecStreamRequest):
+        """Execute a command on a machine, streaming its output while it is produced.
+
+        The response is chunked plain text; its `X-Exec-Id` header identifies the execution for
+        /machines/exec/{exec_id}/cancel. The command is also stopped when the client disconnects or when the output
+        reaches the byte cap, in which case a notice line ends the output.
+        """
         if not digital_twin_state.is_running():
-            raise HTTPException(
-                status_code=400, detail="Digital twin is not running. Start it first."
-            )
+            raise HTTPException(status_code=400, detail="Digital twin is not running")
 
         try:
-            result = await reload_digital_twin(request.rs_only, request.max_devices)
-            return ReloadDigitalTwinResponse(
-                status=result["status"], message=result["message"]
-            )
-        except Exception as e:
-            raise HTTPException(
-                status_code=500, detail=f"Failed to reload digital twin: {str(e)}"
-            )
+            lab = get_lab()
+        except RuntimeError as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+        max_bytes = min(request.max_bytes or api_settings.exec_stream_max_bytes, api_settings.exec_stream_max_bytes)
+        session = exec_sessions.create(request.machine_name, request.command, max_bytes)
+        await run_in_threadpool(shared_state.track_exec, session.id)
+        logger.info(f"Streaming command on machine '{request.machine_name}' (exec {session.id}): {request.command}")
+        chunks = stream_exec(session, lab)
+
+        async def generate():
+            try:
+                while True:
+                    chunk = await run_in_threadpool(next, chunks, None)
+                    if chunk is None:
+                        break
+                    yield chunk
+            except Exception as e:
+                logger.error(f"Streamed exec {session.id} failed: {str(e)}", exc_info=True)
+                yield f"\n[error: {str(e)}]\n".encode()
+            finally:
+                if session.status == EXEC_RUNNING:
+                    # The client went away: kill the command without waiting, the event loop may be cancelling us
+                    threading.Thread(target=session.cancel, args=(lab,), daemon=True).start()
+                exec_sessions.remove(session.id)
+                threading.Thread(target=shared_state.untrack_exec, args=(session.id,), daemon=True).start()
+                status = session.status if session.status != EXEC_RUNNING else "cancelled"
+                EXEC_SECONDS.labels("stream", status).observe(time.time() - session.started_at)
+
+        return StreamingResponse(
+            generate(),
+            media_type="text/plain; charset=utf-8",
+            headers={"X-Exec-Id": session.id, "Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @app.post("/machines/exec/{exec_id}/cancel", response_model=MachineExecCancelResponse)
+    async def cancel_machine_command(exec_id: str):
+        """Cancel a streamed exec, killing its command."""
+        session = exec_sessions.get(exec_id)
+        if session is None:
+            # Served by another worker, which cancels it on its next poll
+            if await run_in_threadpool(shared_state.cancel_exec, exec_id):
+                return MachineExecCancelResponse(status="cancelling", exec_id=exec_id)
+            raise HTTPException(status_code=404, detail=f"Exec '{exec_id}' not found or already finished")
+
+        await run_in_threadpool(session.cancel, get_lab())
+        return MachineExecCancelResponse(status="cancelled", exec_id=exec_id, bytes_sent=session.bytes_sent)
+
+    @app.post("/machines/exec/bulk")
+    async def execute_bulk_command(request: MachineBulkExecRequest):
+        """Execute a command on several machines concurrently, streaming the results as NDJSON.
+
+        Each line is the result of a machine (machine_name, status, output, error, seconds), in completion order.
+        The last line is a summary with the number of succeeded, failed and timed out machines.
+        """
+        if not digital_twin_state.is_running():
+            raise HTTPException(status_code=400, detail="Digital twin is not running")
+
+        try:
+            machine_names = select_machines(request.machine_names, request.selector, request.asn)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        def generate():
+            start = time.perf_counter()
+            counts = {"success": 0, "error": 0, "timeout": 0}
+            for result in bulk_exec(
+                    machine_names, request.command, request.timeout, request.max_parallel, request.deadline
+            ):
+                counts[result["status"]] += 1
+                yield json.dumps(result) + "\n"
+            summary = {
+                "machines_count": len(machine_names),
+                "succeeded_count": counts["success"],
+                "failed_count": counts["error"],
+                "timed_out_count": counts["timeout"],
+                "seconds": round(time.perf_counter() - start, 3),
+            }
+            yield json.dumps({"summary": summary}) + "\n"
+
+        return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+    @app.post("/reload", response_model=ReloadDigitalTwinResponse)
+    async def reload_digital_twin_endpoint(request: ReloadDigitalTwinRequest):
+        """Reload the digital twin configurations without full restart.
+
+        Reloads requested while another one with the same parameters waits are served by the waiting one.
+        """
+        _check_lifecycle("reload")
+
+        job = shared_state.submit(
+            "reload", rs_only=request.rs_only, max_devices=request.max_devices, force=request.force
+        )
+        return ReloadDigitalTwinResponse(
+            status="reloading",
+            message="Digital twin is reloading in background. Check /jobs/{job_id} for progress.",
+            job_id=job.id,
+        )
 
     @app.get("/config/ixp")
-    async def get_ixp_config():
-        """Return the current ixp.conf as JSON."""
+    async def get_ixp_config(if_none_match: Optional[str] = Header(None)):
+        """Return the current ixp.conf as JSON.
+
+        The response carries the ETag of the file, a request with a matching `If-None-Match` gets a 304.
+        """
         try:
-            if not os.path.exists(ixp_config_path):
-                return {}
-            with open(ixp_config_path, "r") as f:
-                data = json.load(f)
-            return data
+            config, etag = ixp_config.get()
+        except IxpConfigError as e:
+            logger.error(f"Failed to read ixp.conf: {str(e)}")
+            raise HTTPException(status_code=e.status_code, detail=str(e))
         except Exception as e:
             logger.error(f"Failed to read ixp.conf: {str(e)}", exc_info=True)
             raise HTTPException(
                 status_code=500, detail=f"Failed to read ixp.conf: {str(e)}"
             )
 
+        headers = {"Cache-Control": "no-cache"}
+        if etag is not None:
+            headers["ETag"] = etag
+            if etag_matches(if_none_match, etag):
+                return Response(status_code=304, headers=headers)
+        return JSONResponse(config, headers=headers)
+
     @app.put("/config/ixp")
-    async def update_ixp_config(config: dict):
-        """Overwrite ixp.conf with provided JSON body."""
+    async def update_ixp_config(config: dict, if_match: Optional[str] = Header(None)):
+        """Validate ixp.conf and replace it atomically with the provided JSON body.
+
+        With an `If-Match` header, the file is only written if it was not modified since the client read it,
+        otherwise a 412 is returned.
+        """
         try:
-            # Validate by serializing
-            serialized = json.dumps(config, indent=4)
-            with open(ixp_config_path, "w") as f:
-                f.write(serialized)
-            return {"status": "success", "message": "ixp.conf updated"}
+            etag = ixp_config.put(config, if_match)
+        except IxpConfigError as e:
+            raise HTTPException(status_code=e.status_code, detail=str(e))
         except Exception as e:
             logger.error(f"Failed to write ixp.conf: {str(e)}", exc_info=True)
             raise HTTPException(
                 status_code=500, detail=f"Failed to write ixp.conf: {str(e)}"
             )
+        # The RIB dumps or the member dump may have changed, the next start loads them from the cache
+        await run_in_threadpool(dump_preparser.submit_configured)
+        return JSONResponse(
+            {"status": "success", "message": "ixp.conf updated", "etag": etag}, headers={"ETag": etag}
+        )
 
     @app.get("/resources/files")
-    async def list_resource_files():
-        """List all files and directories in the resources directory with type information."""
+    async def list_resource_files(
+        directory: str = Query("", description="Directory to list, relative to the resources directory"),
+        recursive: bool = Query(False, description="List the entries of the subdirectories too"),
+        type: Optional[str] = Query(None, pattern="^(file|directory)$", description="Only list this entry type"),
+        format: Optional[str] = Query(
+            None, description="Only list the files of this detected format (bird, open_bgpd, json, unknown)"
+        ),
+        search: Optional[str] = Query(None, description="Only list the entries whose path contains this text"),
+    ):
+        """List the files and directories of the resources directory, from the resource catalogue.
+
+        Each entry has its type, size, modification time, and for files the SHA-256, detected format and IPv4/IPv6
+        route counts of the RIB dumps, null until the file is indexed in the background.
+        """
         try:
-            if not os.path.exists(ixp_resource_path):
-                return {"files": []}
-
-            files = []
-            for item in os.listdir(ixp_resource_path):
-                if item != ".gitkeep":
-                    item_path = os.path.join(ixp_resource_path, item)
-                    is_dir = os.path.isdir(item_path)
-                    files.append({
-                        "name": item,
-                        "type": "directory" if is_dir else "file"
-                    })
-
-            return {"files": sorted(files, key=lambda x: (x["type"] == "file", x["name"]))}
+            files = await run_in_threadpool(resource_catalogue.list, directory, recursive, type, format, search)
+            return {"files": files}
         except Exception as e:
             logger.error(f"Failed to list resource files: {str(e)}", exc_info=True)
             raise HTTPException(
@@ -276,38 +502,58 @@ def register_routes(app):
 
     @app.get("/resources/rib-dumps")
     async def list_rib_dumps():
-        """List all configured RIB dump file names."""
+        """List all configured RIB dump file names, with their catalogue entries."""
         try:
             from digital_twin.ixp.settings.settings import Settings
 
             settings = Settings.get_instance()
-            rib_dump_files = list(settings.rib_dumps.get("dumps", {}).values())
-            return {"rib_dumps": sorted(rib_dump_files)}
+            rib_dump_files = sorted(settings.rib_dumps.get("dumps", {}).values())
+            entries = [await run_in_threadpool(resource_catalogue.get, file) for file in rib_dump_files]
+            return {
+                "rib_dumps": rib_dump_files,
+                "files": [entry or {"name": file, "type": None} for file, entry in zip(rib_dump_files, entries)],
+            }
         except Exception as e:
             logger.error(f"Failed to list RIB dumps: {str(e)}", exc_info=True)
             raise HTTPException(
                 status_code=500, detail=f"Failed to list RIB dumps: {str(e)}"
             )
 
+    @app.get("/resources/summary")
+    async def get_resource_summary(path: str = Query(..., description="RIB dump, relative to the resources directory")):
+        """Get the pre-parse summary of a RIB dump: routes per address family and per member ASN, parse time, error.
+
+        Uploaded RIB dumps are parsed in the background with the configured RIB dump type; the status is "pending"
+        while they are, "not_parsed" if the file is not a RIB dump or was not uploaded since the backend started.
+        """
+        if await run_in_threadpool(resource_catalogue.get, path) is None:
+            raise HTTPException(status_code=404, detail=f"Resource '{path}' not found")
+        status, summary = await run_in_threadpool(dump_preparser.status, path)
+        return {"name": path, "status": status, "summary": summary}
+
     @app.post("/resources/upload")
     async def upload_resource_file(file: UploadFile = File(...)):
-        """Upload a file to the resources directory."""
-        try:
-            # Create resources directory if it doesn't exist
-            os.makedirs(ixp_resource_path, exist_ok=True)
+        """Upload a file to the resources directory.
 
-            # Save file
-            filepath = os.path.join(ixp_resource_path, file.filename)
-            with open(filepath, "wb") as f:
-                content = await file.read()
-                f.write(content)
+        The file is streamed to disk in chunks and atomically replaces any file with the same name. The multipart
+        body is spooled by Starlette before the size limit is checked, large files go through /resources/uploads.
+        """
+        try:
+            filepath = resolve_resource_path(ixp_resource_path, file.filename)
+            size, sha256 = await write_stream(iter_upload_file(file), filepath)
+            await run_in_threadpool(resource_catalogue.refresh, file.filename)
+            await run_in_threadpool(dump_preparser.submit, file.filename)
 
-            logger.info(f"File uploaded: {file.filename}")
+            logger.info(f"File uploaded: {file.filename} ({size} bytes)")
             return {
                 "status": "success",
                 "filename": file.filename,
+                "size": size,
+                "sha256": sha256,
                 "message": f"File {file.filename} uploaded successfully",
             }
+        except UploadError as e:
+            raise HTTPException(status_code=e.status_code, detail=str(e))
         except Exception as e:
             logger.error(f"Failed to upload file: {str(e)}", exc_info=True)
             raise HTTPException(
@@ -316,64 +562,201 @@ def register_routes(app):
 
     @app.post("/resources/upload-directory")
     async def upload_resource_directory(files: list[UploadFile] = File(...)):
-        """Upload multiple files preserving directory structure."""
-        try:
-            # Create resources directory if it doesn't exist
-            os.makedirs(ixp_resource_path, exist_ok=True)
+        """Upload multiple files preserving directory structure.
 
+        Hidden entries, e.g. the `.DS_Store` files browsers include, are skipped and listed in the response. If a
+        file fails, the files this request created are removed. The multipart body is spooled by Starlette before
+        the size limit of each file is checked.
+        """
+        try:
             if not files:
                 raise HTTPException(
                     status_code=400, detail="No files provided"
                 )
 
+            # All the paths are checked before anything is written
+            targets = []
+            skipped = []
+            for file in files:
+                if is_hidden_path(file.filename):
+                    skipped.append({"filename": file.filename, "error": "Hidden files are not uploaded"})
+                    continue
+                targets.append((file, file.filename, resolve_resource_path(ixp_resource_path, file.filename)))
+
             uploaded_files = []
             dir_name = None
-
-            # Process each file
-            for file in files:
-                # Get the relative path from the file
-                relative_path = file.filename
-                
-                # Extract directory name from the first file's path
-                if dir_name is None and "/" in relative_path:
-                    dir_name = relative_path.split("/")[0]
-                elif dir_name is None:
-                    dir_name = relative_path.rsplit(".", 1)[0]  # fallback to filename without extension
-
-                # Create full path preserving directory structure
-                full_path = os.path.join(ixp_resource_path, relative_path)
-                
-                # Create subdirectories if needed
-                os.makedirs(os.path.dirname(full_path), exist_ok=True)
-
-                # Save file
-                with open(full_path, "wb") as f:
-                    content = await file.read()
-                    f.write(content)
-
-                uploaded_files.append(relative_path)
-                logger.info(f"File uploaded: {relative_path}")
+            total_size = 0
+            created = []
+
+            try:
+                for file, relative_path, full_path in targets:
+                    # Extract directory name from the first file's path
+                    if dir_name is None and "/" in relative_path:
+                        dir_name = relative_path.split("/")[0]
+                    elif dir_name is None:
+                        dir_name = relative_path.rsplit(".", 1)[0]  # fallback to filename without extension
+
+                    # Stream the file to its path, preserving directory structure
+                    if not os.path.exists(full_path):
+                        created.append(full_path)
+                    size, sha256 = await write_stream(iter_upload_file(file), full_path)
+                    total_size += size
+
+                    uploaded_files.append({"filename": relative_path, "size": size, "sha256": sha256})
+                    logger.info(f"File uploaded: {relative_path} ({size} bytes)")
+            except BaseException:
+                # The files replaced so far keep their new content
+                for path in created:
+                    if os.path.exists(path):
+                        os.remove(path)
+                raise
 
             if not uploaded_files:
                 raise HTTPException(
-                    status_code=400, detail="No files were uploaded"
+                    status_code=400, detail="No files were uploaded, hidden files are skipped"
                 )
+            for top in {item["filename"].split("/")[0] for item in uploaded_files}:
+                await run_in_threadpool(resource_catalogue.refresh, top)
+            for item in uploaded_files:
+                await run_in_threadpool(dump_preparser.submit, item["filename"])
 
-            logger.info(f"Directory uploaded: {dir_name} with {len(uploaded_files)} files")
+            logger.info(f"Directory uploaded: {dir_name} with {len(uploaded_files)} files, {len(skipped)} skipped")
             return {
                 "status": "success",
                 "directory": dir_name,
                 "files_count": len(uploaded_files),
+                "size": total_size,
+                "files": uploaded_files,
+                "skipped": skipped,
                 "message": f"Directory {dir_name} uploaded successfully with {len(uploaded_files)} files",
             }
         except HTTPException:
             raise
+        except UploadError as e:
+            raise HTTPException(status_code=e.status_code, detail=str(e))
         except Exception as e:
             logger.error(f"Failed to upload directory: {str(e)}", exc_info=True)
             raise HTTPException(
                 status_code=500, detail=f"Failed to upload directory: {str(e)}"
             )
 
+    @app.post("/resources/upload-archive")
+    async def upload_resource_archive(
+        request: Request,
+        directory: Optional[str] = Query(None, description="Directory of the resources to extract into"),
+    ):
+        """Upload a tar (.tar, .tar.gz, .tgz, ...) or zip archive, sent as the raw request body, and extract it.
+
+        The archive is streamed to a temporary file, then extracted member by member while the progress is streamed
+        as NDJSON: one line per member (filename, status "extracted" with its size or "rejected" with an error),
+        then a summary line with the number of files and the total bytes written.
+        """
+        try:
+            if directory is not None:
+                resolve_resource_path(ixp_resource_path, directory)
+            archive_path = os.path.join(upload_sessions.directory, f"archive-{uuid.uuid4().hex}")
+            archive_size, archive_sha256 = await write_stream(iter_request_body(request), archive_path)
+        except UploadError as e:
+            raise HTTPException(status_code=e.status_code, detail=str(e))
+        except Exception as e:
+            logger.error(f"Failed to upload archive: {str(e)}", exc_info=True)
+            raise HTTPException(status_code=500, detail=f"Failed to upload archive: {str(e)}")
+
+        logger.info(f"Archive uploaded ({archive_size} bytes), extracting...")
+
+        def generate():
+            extracted = []
+            summary = {
+                "status": "success",
+                "archive_size": archive_size,
+                "archive_sha256": archive_sha256,
+                "files_count": 0,
+                "rejected_count": 0,
+                "bytes_written": 0,
+            }
+            try:
+                for entry in extract_archive(archive_path, ixp_resource_path, directory):
+                    if entry["status"] == "extracted":
+                        extracted.append(entry["filename"])
+                        summary["files_count"] += 1
+                        summary["bytes_written"] += entry["size"]
+                    else:
+                        summary["rejected_count"] += 1
+                    yield json.dumps(entry) + "\n"
+            except Exception as e:
+                logger.error(f"Failed to extract archive: {str(e)}", exc_info=not isinstance(e, UploadError))
+                summary.update(status="error", error=str(e))
+            finally:
+                os.remove(archive_path)
+                if directory:
+                    resource_catalogue.refresh(directory)
+                else:
+                    resource_catalogue.scan()
+                for filename in extracted:
+                    dump_preparser.submit(filename)
+
+            logger.info(
+                f"Archive extracted: {summary['files_count']} files, {summary['bytes_written']} bytes written"
+            )
+            yield json.dumps({"summary": summary}) + "\n"
+
+        return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+    @app.post("/resources/uploads", response_model=UploadSessionResponse)
+    async def create_upload_session(request: UploadSessionRequest):
+        """Start a resumable upload.
+
+        The content is then sent as raw request bodies to PUT /resources/uploads/{upload_id}?offset=N, in order. After
+        an interruption, GET /resources/uploads/{upload_id} returns the offset to resume from.
+        """
+        try:
+            session = await run_in_threadpool(upload_sessions.create, request.filename, request.size, request.sha256)
+            return UploadSessionResponse(**session.to_dict())
+        except UploadError as e:
+            raise HTTPException(status_code=e.status_code, detail=str(e))
+
+    @app.get("/resources/uploads", response_model=UploadSessionListResponse)
+    async def list_upload_sessions():
+        """List the incomplete resumable uploads."""
+        sessions = await run_in_threadpool(upload_sessions.list)
+        return UploadSessionListResponse(uploads=[UploadSessionResponse(**session.to_dict()) for session in sessions])
+
+    @app.get("/resources/uploads/{upload_id}", response_model=UploadSessionResponse)
+    async def get_upload_session(upload_id: str):
+        """Get the number of bytes received by a resumable upload."""
+        session = upload_sessions.get(upload_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail=f"Upload '{upload_id}' not found")
+        return UploadSessionResponse(**session.to_dict())
+
+    @app.put("/resources/uploads/{upload_id}", response_model=UploadSessionResponse)
+    async def upload_chunk(upload_id: str, request: Request, offset: int = Query(..., ge=0)):
+        """Append a chunk, sent as the raw request body, to a resumable upload.
+
+        The upload is completed, checksummed and moved to its destination once all its bytes are received.
+        """
+        session = upload_sessions.get(upload_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail=f"Upload '{upload_id}' not found")
+
+        try:
+            result = await upload_sessions.append(session, offset, iter_request_body(request))
+            if result["completed"]:
+                await run_in_threadpool(resource_catalogue.refresh, session.filename)
+                await run_in_threadpool(dump_preparser.submit, session.filename)
+            return UploadSessionResponse(**result)
+        except UploadError as e:
+            raise HTTPException(status_code=e.status_code, detail=str(e))
+
+    @app.delete("/resources/uploads/{upload_id}")
+    async def delete_upload_session(upload_id: str):
+        """Abort a resumable upload, deleting the received bytes."""
+        session = upload_sessions.get(upload_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail=f"Upload '{upload_id}' not found")
+        await run_in_threadpool(upload_sessions.remove, session)
+        return {"status": "success", "message": f"Upload {upload_id} aborted"}
+
     @app.post("/rib/compare", response_model=RibComparisonResponse)
     async def compare_rib_endpoint(request: RibComparisonRequest):
         """Compare RIB between route server and uploaded resource dump."""
@@ -385,18 +768,17 @@ def register_routes(app):
                 f"Comparing RIB for route server '{request.route_server}' with file '{request.resource_file}'"
             )
 
-            result = await compare_rib(request.route_server, request.resource_file)
+            result = await run_in_threadpool(
+                compare_rib, request.route_server, request.resource_file, request.streaming
+            )
+            comparison = comparison_store.get(result["comparison_id"])
 
             return RibComparisonResponse(
-                status=result["status"],
-                route_server=result["route_server"],
-                resource_file=result["resource_file"],
-                live_rib_lines=result["live_rib_lines"],
-                uploaded_rib_lines=result["uploaded_rib_lines"],
-                only_in_live=result["only_in_live"],
-                only_in_uploaded=result["only_in_uploaded"],
-                differences_count=result["differences_count"],
-                message=result.get("message"),
+                **result,
+                only_in_live=[format_route(r) for r in comparison.page(SIDE_LIVE, limit=request.page_size)[0]],
+                only_in_uploaded=[
+                    format_route(r) for r in comparison.page(SIDE_UPLOADED, limit=request.page_size)[0]
+                ],
             )
 
         except HTTPException:
@@ -416,3 +798,152 @@ def register_routes(app):
             raise HTTPException(
                 status_code=500, detail=f"Failed to compare RIB: {str(e)}"
             )
+
+    @app.post("/rib/compare/batch", response_model=RibBatchComparisonResponse)
+    async def compare_rib_batch_endpoint(request: RibBatchComparisonRequest):
+        """Compare the RIB of several route servers concurrently, with an aggregated summary."""
+        if not digital_twin_state.is_running():
+            raise HTTPException(status_code=400, detail="Digital twin is not running")
+
+        try:
+            result = await run_in_threadpool(
+                compare_rib_batch, request.route_servers, request.resource_files, request.max_parallel,
+                request.streaming
+            )
+            return RibBatchComparisonResponse(**result)
+        except ValueError as e:
+            logger.error(f"Invalid request parameters: {str(e)}", exc_info=True)
+            raise HTTPException(
+                status_code=400, detail=f"Invalid request parameters: {str(e)}"
+            )
+        except Exception as e:
+            logger.error(f"Failed to compare RIBs: {str(e)}", exc_info=True)
+            raise HTTPException(
+                status_code=500, detail=f"Failed to compare RIBs: {str(e)}"
+            )
+
+    async def _get_comparison(comparison_id: str) -> RibComparison:
+        comparison = comparison_store.get(comparison_id)
+        if comparison is None:
+            # Expired from memory, or run by another worker
+            comparison = await run_in_threadpool(comparison_history.load, comparison_id)
+            if comparison is None:
+                raise HTTPException(
+                    status_code=404, detail=f"RIB comparison '{comparison_id}' not found or expired"
+                )
+            comparison_store.add(comparison)
+        return comparison
+
+    def _build_route_filter(prefix: Optional[str], asn: Optional[int], afi: Optional[int]) -> RouteFilter:
+        try:
+            return RouteFilter(prefix=prefix, asn=asn, afi=afi)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid filter: {str(e)}")
+
+    @app.get("/rib/comparisons", response_model=RibComparisonHistoryResponse)
+    async def list_rib_comparisons(
+        route_server: Optional[str] = Query(None, description="Only the runs of this route server"),
+        resource_file: Optional[List[str]] = Query(None, description="Only the runs against exactly these RIB dumps"),
+        since: Optional[float] = Query(None, description="Only the runs started at or after this timestamp"),
+        limit: int = Query(100, ge=1, le=10000),
+    ):
+        """Get the history of the RIB comparisons, most recent first, with the trend of their differences."""
+        runs = await run_in_threadpool(comparison_history.list, route_server, resource_file, since, limit)
+        return RibComparisonHistoryResponse(
+            status="success",
+            route_server=route_server,
+            # Only meaningful when the runs are against the same RIB dumps
+            trend=trend(runs) if resource_file else None,
+            comparisons=[RibComparisonHistoryEntry(**run) for run in runs],
+        )
+
+    @app.get("/rib/comparisons/{comparison_id}", response_model=RibComparisonResponse)
+    async def get_rib_comparison(comparison_id: str):
+        """Get the summary of a stored RIB comparison."""
+        comparison = comparison_store.get(comparison_id)
+        if comparison is not None:
+            summary = comparison.summary()
+        else:
+            summary = await run_in_threadpool(comparison_history.get, comparison_id)
+        if summary is None:
+            raise HTTPException(status_code=404, detail=f"RIB comparison '{comparison_id}' not found or expired")
+        return RibComparisonResponse(status="success", **summary)
+
+    @app.get("/rib/comparisons/{comparison_id}/diff", response_model=RibComparisonDiffResponse)
+    async def diff_rib_comparisons(
+        comparison_id: str,
+        base: Optional[str] = Query(
+            None, description="ID of the run to diff against, the previous run on the same RIB dumps if not set"
+        ),
+        limit: int = Query(100, ge=0, le=10000, description="Resolved and introduced routes returned per side"),
+    ):
+        """Diff the differences of two recorded RIB comparison runs, from the history index."""
+        if base is None:
+            base = await run_in_threadpool(comparison_history.previous, comparison_id)
+            if base is None:
+                raise HTTPException(
+                    status_code=404, detail=f"No previous run of RIB comparison '{comparison_id}' in the history"
+                )
+
+        result = await run_in_threadpool(comparison_history.diff, base, comparison_id, limit)
+        if result is None:
+            raise HTTPException(
+                status_code=404, detail=f"RIB comparison '{comparison_id}' or '{base}' not found in the history"
+            )
+        return RibComparisonDiffResponse(status="success", **result)
+
+    @app.get("/rib/comparisons/{comparison_id}/routes", response_model=RibComparisonRoutesResponse)
+    async def get_rib_comparison_routes(
+        comparison_id: str,
+        side: str = Query(SIDE_LIVE, pattern=f"^({SIDE_LIVE}|{SIDE_UPLOADED})$"),
+        cursor: Optional[str] = Query(None, description="Cursor returned by the previous page"),
+        page: Optional[int] = Query(None, ge=0, description="Page number, alternative to the cursor"),
+        limit: int = Query(100, ge=1, le=10000),
+        prefix: Optional[str] = Query(None, description="Only routes equal to or more specific than this prefix"),
+        asn: Optional[int] = Query(None, description="Only routes whose AS path contains this ASN"),
+        afi: Optional[int] = Query(None, description="Only routes of this address family (4 or 6)"),
+    ):
+        """Get a page of the differences of a stored RIB comparison."""
+        comparison = await _get_comparison(comparison_id)
+        route_filter = _build_route_filter(prefix, asn, afi)
+
+        try:
+            start = int(cursor) if cursor else 0
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid cursor: {cursor}")
+
+        routes, next_cursor = comparison.page(
+            side, cursor=start, limit=limit, route_filter=route_filter, skip=(page or 0) * limit
+        )
+        return RibComparisonRoutesResponse(
+            comparison_id=comparison_id,
+            side=side,
+            routes=[RibComparisonRoute(**route_to_dict(route)) for route in routes],
+            next_cursor=str(next_cursor) if next_cursor is not None else None,
+        )
+
+    @app.get("/rib/comparisons/{comparison_id}/stream")
+    async def stream_rib_comparison_routes(
+        comparison_id: str,
+        side: Optional[str] = Query(None, pattern=f"^({SIDE_LIVE}|{SIDE_UPLOADED})$"),
+        prefix: Optional[str] = Query(None, description="Only routes equal to or more specific than this prefix"),
+        asn: Optional[int] = Query(None, description="Only routes whose AS path contains this ASN"),
+        afi: Optional[int] = Query(None, description="Only routes of this address family (4 or 6)"),
+    ):
+        """Stream the differences of a stored RIB comparison as NDJSON, one route per line."""
+        comparison = await _get_comparison(comparison_id)
+        route_filter = _build_route_filter(prefix, asn, afi)
+        sides = [side] if side else [SIDE_LIVE, SIDE_UPLOADED]
+
+        def generate():
+            lines = []
+            for current_side in sides:
+                for route in comparison.iter_routes(current_side, route_filter):
+                    lines.append(json.dumps({"side": current_side, **route_to_dict(route)}) + "\n")
+                    if len(lines) >= NDJSON_BATCH_SIZE:
+                        yield "".join(lines)
+                        lines = []
+            if lines:
+                yield "".join(lines)
+
+        return StreamingResponse(generate(), media_type="application/x-ndjson")
@@ -1,7 +1,7 @@
 """Pydantic models for API requests and responses."""
 
-from typing import Optional, Dict, Any, List
-from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any, List, Literal
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class StartDigitalTwinRequest(BaseModel):
@@ -14,14 +14,48 @@ class StartDigitalTwinResponse(BaseModel):
     status: str
     message: str
     devices_count: Optional[int] = None
+    job_id: Optional[str] = Field(None, description="ID of the job running the start, see /jobs/{job_id}")
+
+
+class JobResponse(BaseModel):
+    """Response model for a background job."""
+    id: str
+    kind: str
+    params: Dict[str, Any] = Field(default_factory=dict)
+    status: str = Field(description="One of pending, running, succeeded, failed")
+    phase: Optional[str] = Field(None, description="Current phase of the operation")
+    progress_current: Optional[int] = Field(None, description="Steps completed in the current phase")
+    progress_total: Optional[int] = Field(None, description="Total steps of the current phase, if known")
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+
+class JobListResponse(BaseModel):
+    """Response model for listing background jobs."""
+    jobs: List[JobResponse] = Field(default_factory=list)
+
+
+class CacheStatsResponse(BaseModel):
+    """Response model for the parsed dumps cache statistics."""
+    hits: int
+    misses: int
+    evictions: int
+    entries: int = Field(description="Number of cached dumps")
+    bytes: int = Field(description="Memory used by the cached dumps")
+    max_bytes: int = Field(description="Memory budget of the cache")
 
 
 class DigitalTwinStatusResponse(BaseModel):
     """Response model for digital twin status."""
+    lifecycle: str = Field(..., description="Lifecycle state: idle, starting, running, reloading, stopping or error")
     running: bool
     starting: bool
     devices_count: Optional[int] = None
     error: Optional[str] = None
+    job: Optional[JobResponse] = Field(None, description="Most recent lifecycle job (start, reattach, reload, stop)")
 
 
 class QuarantineCheckRequest(BaseModel):
@@ -43,18 +77,45 @@ class ReloadDigitalTwinRequest(BaseModel):
     """Request model for reloading the digital twin."""
     rs_only: bool = Field(False, description="Reload only RS configurations, skipping peerings")
     max_devices: Optional[int] = Field(None, description="Limit the number of devices to reload")
+    force: bool = Field(False, description="Push the configurations of every device, even the unchanged ones")
 
 
 class ReloadDigitalTwinResponse(BaseModel):
     """Response model for reloading the digital twin."""
     status: str
     message: str
+    job_id: Optional[str] = Field(None, description="ID of the job running the reload, see /jobs/{job_id}")
+
+
+class StopDigitalTwinResponse(BaseModel):
+    """Response model for stopping the digital twin."""
+    status: str
+    message: str
+    job_id: Optional[str] = Field(None, description="ID of the job running the stop, see /jobs/{job_id}")
 
 
 class MachineStatsResponse(BaseModel):
     """Response model for machine statistics."""
     status: str
     machines: Dict[str, Any] = Field(default_factory=dict, description="Machine statistics keyed by device name")
+    sampled_at: Optional[float] = Field(None, description="Timestamp of the sample, None until the first one")
+
+
+class MachineStatsSample(BaseModel):
+    """Statistics of a machine at a point in time."""
+    timestamp: float
+    cpu_percent: Optional[float] = None
+    memory_bytes: Optional[int] = None
+    pids: Optional[int] = None
+
+
+class MachineStatsHistoryResponse(BaseModel):
+    """Response model for the machine statistics history."""
+    status: str
+    interval: float = Field(description="Seconds between two samples")
+    machines: Dict[str, List[MachineStatsSample]] = Field(
+        default_factory=dict, description="Samples keyed by device name, oldest first"
+    )
 
 
 class MachineExecRequest(BaseModel):
@@ -71,21 +132,229 @@ class MachineExecResponse(BaseModel):
     output: Optional[str] = None
     error: Optional[str] = None
 
+class MachineExecStreamRequest(BaseModel):
+    """Request model for executing a command on a machine with streamed output."""
+    machine_name: str = Field(..., description="Name of the machine to execute command on")
+    command: str = Field(..., description="Command to execute on the machine")
+    max_bytes: Optional[int] = Field(
+        None, gt=0, description="Bytes of output after which the command is stopped, capped by the server limit"
+    )
+
+
+class MachineExecCancelResponse(BaseModel):
+    """Response model for cancelling a streamed exec."""
+    status: str = Field(description="cancelled, or cancelling when the exec runs in another worker")
+    exec_id: str
+    bytes_sent: Optional[int] = Field(None, description="Bytes of output sent, absent when cancelling")
+
+
+class MachineBulkExecRequest(BaseModel):
+    """Request model for executing a command on several machines.
+
+    The machines are selected by exactly one of `machine_names`, `selector` and `asn`.
+    """
+    command: str = Field(..., description="Command to execute on the machines")
+    machine_names: Optional[List[str]] = Field(None, description="Names of the machines")
+    selector: Optional[Literal["all", "route_servers", "peers"]] = Field(None, description="Group of machines")
+    asn: Optional[int] = Field(None, description="Select the peer routers of this AS")
+    timeout: float = Field(30, gt=0, le=3600, description="Seconds after which a machine is reported as timed out")
+    max_parallel: Optional[int] = Field(None, ge=1, le=128, description="Maximum concurrent commands")
+    deadline: Optional[float] = Field(
+        None, gt=0, le=3600,
+        description="Seconds after which the machines still running or queued are reported as timed out"
+    )
+
+
 class RibComparisonRequest(BaseModel):
     """Request model for comparing RIB between route server and uploaded resource."""
     route_server: str = Field(..., description="Name of the route server")
     resource_file: str = Field(..., description="Name of the RIB dump file in resources")
+    streaming: bool = Field(
+        False,
+        description="Parse the live RIB while it is streamed instead of collecting it and using the table dump parser;"
+        " all the routes are then compared, not only the ones of the member dump entries"
+    )
+    page_size: int = Field(100, ge=0, le=10000, description="Number of differences per side included in the response")
 
 
 class RibComparisonResponse(BaseModel):
     """Response model for RIB comparison."""
     status: str
+    comparison_id: Optional[str] = Field(None, description="ID to fetch the full differences from /rib/comparisons")
     route_server: str
     resource_file: str
+    resource_files: List[str] = Field(default_factory=list, description="RIB dump files compared against")
     live_rib_lines: int = Field(description="Number of routes in live RIB")
     uploaded_rib_lines: int = Field(description="Number of routes in uploaded RIB")
-    only_in_live: List[str] = Field(default_factory=list, description="Routes only in live RIB")
-    only_in_uploaded: List[str] = Field(default_factory=list, description="Routes only in uploaded RIB")
+    only_in_live: List[str] = Field(default_factory=list, description="First page of the routes only in live RIB")
+    only_in_uploaded: List[str] = Field(
+        default_factory=list, description="First page of the routes only in uploaded RIB"
+    )
+    only_in_live_count: int = Field(0, description="Number of routes only in live RIB")
+    only_in_uploaded_count: int = Field(0, description="Number of routes only in uploaded RIB")
     differences_count: int = Field(description="Total number of differences")
     message: Optional[str] = None
-    error: Optional[str] = None
\ No newline at end of file
+    error: Optional[str] = None
+
+
+class RibBatchComparisonRequest(BaseModel):
+    """Request model for comparing the RIB of several route servers."""
+    route_servers: Optional[List[str]] = Field(None, description="Route servers to compare, all if not set")
+    resource_files: Optional[List[str]] = Field(
+        None, description="RIB dump files compared against the union of their routes, all configured dumps if not set"
+    )
+    max_parallel: Optional[int] = Field(None, ge=1, le=64, description="Maximum concurrent comparisons")
+    streaming: bool = Field(
+        False, description="Parse the live RIBs while they are streamed, comparing all the routes, see /rib/compare"
+    )
+
+
+class RibBatchComparisonResult(BaseModel):
+    """Result of the comparison of one route server in a batch."""
+    status: str
+    route_server: str
+    comparison_id: Optional[str] = Field(None, description="ID to fetch the differences from /rib/comparisons")
+    live_rib_lines: Optional[int] = None
+    uploaded_rib_lines: Optional[int] = None
+    only_in_live_count: Optional[int] = None
+    only_in_uploaded_count: Optional[int] = None
+    differences_count: Optional[int] = None
+    seconds: float = Field(description="Duration of the comparison")
+    error: Optional[str] = None
+
+
+class RibBatchComparisonResponse(BaseModel):
+    """Response model for comparing the RIB of several route servers."""
+    status: str = Field(description="success, partial if some comparisons failed, error if all failed")
+    resource_files: List[str]
+    route_servers_count: int
+    failed_count: int
+    differences_count: int = Field(description="Total number of differences of the successful comparisons")
+    seconds: float = Field(description="Duration of the whole batch")
+    results: List[RibBatchComparisonResult] = Field(default_factory=list)
+
+
+class RibComparisonRoute(BaseModel):
+    """A route of a RIB comparison result."""
+    afi: int = Field(description="Address family, 4 or 6")
+    network: str
+    as_path: List[str]
+    route: str = Field(description="Human readable representation of the route")
+
+
+class RibComparisonRoutesResponse(BaseModel):
+    """Response model for a page of RIB comparison differences."""
+    comparison_id: str
+    side: str = Field(description="live for the routes only in live RIB, uploaded for the ones only in uploaded RIB")
+    routes: List[RibComparisonRoute] = Field(default_factory=list)
+    next_cursor: Optional[str] = Field(None, description="Cursor of the next page, absent on the last page")
+
+
+class RibComparisonHistoryEntry(BaseModel):
+    """A RIB comparison run recorded in the history."""
+    comparison_id: str
+    created_at: float = Field(description="Timestamp of the comparison")
+    route_server: str
+    resource_files: List[str] = Field(default_factory=list, description="RIB dump files compared against")
+    live_rib_lines: int
+    uploaded_rib_lines: int
+    only_in_live_count: int
+    only_in_uploaded_count: int
+    differences_count: int
+    differences_delta: Optional[int] = Field(
+        None,
+        description="Change of the differences since the previous run on the same RIB dumps, absent for a first run"
+    )
+
+
+class RibComparisonHistoryResponse(BaseModel):
+    """Response model for the history of the RIB comparisons."""
+    status: str
+    route_server: Optional[str] = None
+    trend: Optional[str] = Field(
+        None, description="improving, worsening or stable from the oldest to the most recent listed run"
+    )
+    comparisons: List[RibComparisonHistoryEntry] = Field(default_factory=list, description="Runs, most recent first")
+
+
+class RibComparisonDiffSide(BaseModel):
+    """Changes of the differences of one side between two RIB comparison runs."""
+    side: str = Field(description="live for the routes only in live RIB, uploaded for the ones only in uploaded RIB")
+    resolved_count: int = Field(description="Differences of the base run absent from the compared run")
+    introduced_count: int = Field(description="Differences of the compared run absent from the base run")
+    persisting_count: int = Field(description="Differences in both runs")
+    resolved: List[RibComparisonRoute] = Field(default_factory=list, description="First resolved routes")
+    introduced: List[RibComparisonRoute] = Field(default_factory=list, description="First introduced routes")
+
+
+class RibComparisonDiffResponse(BaseModel):
+    """Response model for the diff between two RIB comparison runs."""
+    status: str
+    base: RibComparisonHistoryEntry
+    comparison: RibComparisonHistoryEntry
+    differences_delta: int = Field(description="Change of the number of differences from the base run")
+    sides: List[RibComparisonDiffSide] = Field(default_factory=list)
+
+
+class UploadSessionRequest(BaseModel):
+    """Request model for starting a resumable upload."""
+    filename: str = Field(..., description="Destination path, relative to the resources directory")
+    size: int = Field(..., ge=0, description="Total size of the file in bytes")
+    sha256: Optional[str] = Field(
+        None, pattern=r"^[0-9a-fA-F]{64}$", description="Expected SHA-256, checked once the upload is complete"
+    )
+
+
+class UploadSessionResponse(BaseModel):
+    """Response model for a resumable upload."""
+    upload_id: str
+    filename: str
+    size: int = Field(description="Total size of the file in bytes")
+    offset: int = Field(description="Bytes received so far, where the next chunk must start")
+    created_at: float
+    completed: bool = False
+    sha256: Optional[str] = Field(None, description="SHA-256 of the file, once completed")
+
+
+class UploadSessionListResponse(BaseModel):
+    """Response model for listing the resumable uploads."""
+    uploads: List[UploadSessionResponse] = Field(default_factory=list)
+
+
+class PeeringConfiguration(BaseModel):
+    """Member dump section of ixp.conf."""
+    model_config = ConfigDict(extra="allow")
+    type: str = Field(..., min_length=1, description="Member dump type, e.g. ixp_manager or raw_json")
+    path: str = Field(..., min_length=1, description="Member dump file, relative to the resources directory")
+
+
+class RibDumpsConfiguration(BaseModel):
+    """RIB dumps section of ixp.conf."""
+    model_config = ConfigDict(extra="allow")
+    type: str = Field(..., min_length=1, description="Table dump type, e.g. bird or open_bgpd")
+    dumps: Dict[str, str] = Field(
+        default_factory=dict, description="RIB dump files, relative to the resources directory, loaded in this order"
+    )
+
+
+class RouteServerConfiguration(BaseModel):
+    """Route server entry of ixp.conf."""
+    model_config = ConfigDict(extra="allow")
+    type: str = Field(..., min_length=1, description="Route server type, e.g. bird or open_bgpd")
+
+
+class IxpConfig(BaseModel):
+    """Structure of ixp.conf, as loaded by the digital twin settings.
+
+    Only the sections the digital twin cannot start without are required. Unknown keys are kept as they are. The
+    dump types are only checked to be set here: they are resolved by the digital twin factories, see `ixp_config.py`.
+    """
+    model_config = ConfigDict(extra="allow")
+    scenario_name: Optional[str] = None
+    host_interface: Optional[str] = None
+    peering_lan: Optional[Dict[str, str]] = None
+    peering_configuration: PeeringConfiguration
+    rib_dumps: RibDumpsConfiguration
+    route_servers: Dict[str, RouteServerConfiguration] = Field(default_factory=dict)
+    rpki: List[Dict[str, Any]] = Field(default_factory=list)
+    quarantine: Optional[Dict[str, Any]] = None
@@ -0,0 +1,423 @@
+"""State shared by the backend workers, so that the API can run as several uvicorn workers.
+
+One worker, the leader, runs the lifecycle operations, samples the machines statistics and indexes the resources:
+it is the worker holding an exclusive lock on the leader file. When it exits, the lock is released and another worker
+takes over, reattaching to the deployed digital twin.
+
+The leader writes the digital twin state, the jobs and the statistics samples to a SQLite database in WAL mode, where
+readers do not block the writer. The other workers poll it and mirror them into their own `digital_twin_state`,
+`job_manager` and `stats_sampler`, so they serve the read endpoints and the events stream as the leader does. The
+lifecycle requests they receive are queued in the database with the ID of the job they answer with, and submitted by
+the leader.
+
+Streamed command executions stay in the worker serving them: they are listed in the database, so that a cancellation
+received by another worker is flagged there and carried out by the worker running the command.
+
+When the backend runs as a single worker, nobody reads the database: the worker leads without opening it.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config import api_settings
+from jobs import JOB_FAILED, JOB_PENDING, JOB_RUNNING, Job, job_manager
+from state import digital_twin_state
+from stats_sampler import stats_sampler
+
+logger = logging.getLogger(__name__)
+
+# Milliseconds a worker waits for another one writing to the database
+_BUSY_TIMEOUT_MS = 10000
+# Jobs kept in the database for the workers that start later
+_MAX_JOBS = 200
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    seq INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    seq INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_aliases (
+    id TEXT PRIMARY KEY,
+    target TEXT NOT NULL,
+    seq INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stats_samples (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    sampled_at REAL,
+    machines TEXT
+);
+CREATE TABLE IF NOT EXISTS commands (
+    job_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    submitted_at REAL NOT NULL,
+    claimed INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS execs (
+    exec_id TEXT PRIMARY KEY,
+    worker INTEGER NOT NULL,
+    cancel_requested INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class SharedState:
+    """SQLite database through which the leader worker shares its state with the other workers."""
+
+    def __init__(self, path: str, poll_interval: float, history_seconds: float, workers: int = 1):
+        """Initialize the shared state.
+
+        Args:
+            path: Path of the database, the leader lock is the same path suffixed with ".leader"
+            poll_interval: Seconds between two polls of the database, for changes or queued requests
+            history_seconds: Seconds of statistics samples kept in the database
+            workers: Number of backend workers, the database is only used with more than one
+        """
+        self.path = path
+        self.poll_interval = poll_interval
+        self.history_seconds = history_seconds
+        self.workers = workers
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._leader_fd: Optional[int] = None
+        self._on_leader: Optional[Callable[[bool], None]] = None
+        self._commands: Dict[str, Tuple[Callable, bool]] = {}
+        self._exec_canceller: Optional[Callable[[str], None]] = None
+        # Sequence numbers of the last written (leader) or mirrored (other workers) rows
+        self._seq = 0
+        self._seen = {"state": 0, "jobs": 0, "job_aliases": 0, "stats_samples": 0}
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def register_command(self, kind: str, func: Callable, coalesce: bool = False) -> None:
+        """Register a lifecycle operation that the workers submit with `submit()`.
+
+        Args:
+            kind: Kind of the job running the operation
+            func: Blocking callable implementing the operation
+            coalesce: Coalesce the operation with an identical pending one, see `JobManager.submit()`
+        """
+        self._commands[kind] = (func, coalesce)
+
+    def is_leader(self) -> bool:
+        """Check if this worker is the leader."""
+        return self._leader_fd is not None
+
+    def register_exec_canceller(self, canceller: Callable[[str], None]) -> None:
+        """Register the function cancelling a streamed exec of this worker, for cancellations received by others.
+
+        Args:
+            canceller: Called with the ID of the exec to cancel, from the polling thread
+        """
+        self._exec_canceller = canceller
+
+    def track_exec(self, exec_id: str) -> None:
+        """List a streamed exec run by this worker, so that the other workers can cancel it."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO execs (exec_id, worker) VALUES (?, ?)", (exec_id, os.getpid())
+                )
+
+    def untrack_exec(self, exec_id: str) -> None:
+        """Remove a finished streamed exec of this worker."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.execute("DELETE FROM execs WHERE exec_id = ?", (exec_id,))
+
+    def cancel_exec(self, exec_id: str) -> bool:
+        """Request the cancellation of a streamed exec run by another worker.
+
+        Args:
+            exec_id: ID of the exec
+
+        Returns:
+            bool: True if the exec is running in a live worker, which cancels it on its next poll
+        """
+        with self._lock:
+            if self._connection is None:
+                return False
+            row = self._connection.execute("SELECT worker FROM execs WHERE exec_id = ?", (exec_id,)).fetchone()
+            if row is None:
+                return False
+            if not _is_alive(row["worker"]):
+                # The exec ended with its worker
+                self._connection.execute("DELETE FROM execs WHERE exec_id = ?", (exec_id,))
+                return False
+            self._connection.execute("UPDATE execs SET cancel_requested = 1 WHERE exec_id = ?", (exec_id,))
+        return True
+
+    def start(self, on_leader: Callable[[bool], None]) -> None:
+        """Open the database, try to become the leader, and start polling.
+
+        Args:
+            on_leader: Called once this worker becomes the leader, right away or when the leader exits, with True
+                in the latter case: the digital twin the previous leader managed has to be taken over
+        """
+        if self._thread is not None or self._leader_fd is not None:
+            return
+        self._on_leader = on_leader
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        if self.workers == 1:
+            # Still locked, so that a worker started with a wrong number of workers is noticed
+            if self._try_lead():
+                logger.info(f"Worker {os.getpid()} is the only worker, the state is not shared")
+                on_leader(False)
+                return
+            logger.warning("Another worker holds the leader lock, although a single worker is configured: "
+                           "set BACKEND_WORKERS to the number of uvicorn workers")
+        connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        connection.execute(f"PRAGMA busy_timeout = {_BUSY_TIMEOUT_MS}")
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.executescript(_SCHEMA)
+        # Left by a previous process with the same PID
+        connection.execute("DELETE FROM execs WHERE worker = ?", (os.getpid(),))
+        self._connection = connection
+
+        digital_twin_state.add_listener(self._publish_state)
+        job_manager.add_listener(self._publish_job)
+        stats_sampler.add_listener(self._publish_stats)
+
+        if self._try_lead():
+            self._promote(failover=False)
+        else:
+            logger.info(f"Worker {os.getpid()} mirrors the state of the leader worker")
+            self._mirror()
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="shared-state", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop polling, release the leadership and close the database."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 5)
+            self._thread = None
+        with self._lock:
+            if self._leader_fd is not None:
+                os.close(self._leader_fd)
+                self._leader_fd = None
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def submit(self, kind: str, **params: Any) -> Job:
+        """Submit a lifecycle operation: on the job manager in the leader, through the database otherwise.
+
+        Args:
+            kind: Kind of the operation, registered with `register_command()`
+            **params: Keyword arguments of the operation
+
+        Returns:
+            Job: The job running the operation, mirrored from the leader in the other workers
+        """
+        func, coalesce = self._commands[kind]
+        if self.is_leader():
+            return job_manager.submit(kind, func, coalesce=coalesce, **params)
+
+        job = job_manager.mirror(Job(kind, params=params).to_dict())
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO commands (job_id, kind, params, submitted_at) VALUES (?, ?, ?, ?)",
+                (job.id, kind, json.dumps(params), time.time()),
+            )
+        logger.info(f"Job {job.id} ({kind}) forwarded to the leader worker")
+        return job
+
+    def _try_lead(self) -> bool:
+        fd = os.open(f"{self.path}.leader", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._leader_fd = fd
+        return True
+
+    def _promote(self, failover: bool) -> None:
+        logger.info(f"Worker {os.getpid()} is the leader")
+        with self._lock:
+            self._seq = max(
+                self._connection.execute(f"SELECT coalesce(max(seq), 0) FROM {table}").fetchone()[0]
+                for table in ("state", "jobs", "job_aliases")
+            )
+            rows = self._connection.execute("SELECT data FROM jobs").fetchall()
+
+        # The jobs the previous leader was running are lost with it
+        for row in rows:
+            data = json.loads(row["data"])
+            if data["status"] in (JOB_PENDING, JOB_RUNNING):
+                job_manager.mirror({
+                    **data, "status": JOB_FAILED, "error": "The worker running the job exited",
+                    "finished_at": time.time(),
+                })
+
+        if digital_twin_state.get_replica() is not None:
+            # Mirrored from the previous leader, the network scenario is reattached to by `on_leader`
+            digital_twin_state.reset()
+        self._publish_state()
+        # The samples of the previous leader are dropped, the sampling restarts with the digital twin
+        self._publish_stats({}, [], None)
+        if self._on_leader is not None:
+            self._on_leader(failover)
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                if self.is_leader():
+                    self._claim_commands()
+                elif self._try_lead():
+                    self._promote(failover=True)
+                else:
+                    self._mirror()
+                self._cancel_execs()
+            except Exception as e:
+                logger.warning(f"Failed to synchronize the shared state: {str(e)}")
+
+    def _next_seq(self) -> int:
+        self._seq += 1
+        return self._seq
+
+    def _publish_state(self) -> None:
+        if not self.is_leader():
+            return
+        value = json.dumps(digital_twin_state.export())
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO state (key, value, seq) VALUES ('digital_twin', ?, ?)",
+                (value, self._next_seq()),
+            )
+
+    def _publish_job(self, job: Job) -> None:
+        if not self.is_leader():
+            return
+        data = json.dumps(job.to_dict(), default=str)
+        with self._lock:
+            seq = self._next_seq()
+            self._connection.execute(
+                "INSERT OR REPLACE INTO jobs (id, data, seq) VALUES (?, ?, ?)", (job.id, data, seq)
+            )
+            if seq % _MAX_JOBS == 0:
+                self._connection.execute("DELETE FROM jobs WHERE seq <= ?", (seq - 10 * _MAX_JOBS,))
+
+    def _publish_stats(self, changed: Dict[str, Dict[str, Any]], removed: list, sampled_at: Optional[float]) -> None:
+        if not self.is_leader():
+            return
+        # A sample without timestamp tells the other workers that the sampling stopped
+        machines = json.dumps(stats_sampler.latest(), separators=(",", ":")) if sampled_at is not None else None
+        with self._lock:
+            self._connection.execute("BEGIN")
+            self._connection.execute(
+                "INSERT INTO stats_samples (sampled_at, machines) VALUES (?, ?)", (sampled_at, machines)
+            )
+            self._connection.execute(
+                "DELETE FROM stats_samples WHERE sampled_at < ? OR seq < "
+                "(SELECT coalesce(max(seq), 0) FROM stats_samples WHERE sampled_at IS NULL)",
+                (time.time() - self.history_seconds,),
+            )
+            self._connection.execute("COMMIT")
+
+    def _claim_commands(self) -> None:
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            rows = self._connection.execute(
+                "SELECT * FROM commands WHERE claimed = 0 ORDER BY submitted_at"
+            ).fetchall()
+            self._connection.executemany(
+                "UPDATE commands SET claimed = 1 WHERE job_id = ?", [(row["job_id"],) for row in rows]
+            )
+            self._connection.execute("DELETE FROM commands WHERE claimed = 1 AND submitted_at < ?",
+                                     (time.time() - 3600,))
+            self._connection.execute("COMMIT")
+
+        for row in rows:
+            if row["kind"] not in self._commands:
+                logger.warning(f"Unknown forwarded job {row['job_id']} ({row['kind']}) ignored")
+                continue
+            func, coalesce = self._commands[row["kind"]]
+            job = job_manager.submit(
+                row["kind"], func, coalesce=coalesce, job_id=row["job_id"], **json.loads(row["params"])
+            )
+            if job.id != row["job_id"]:
+                with self._lock:
+                    self._connection.execute(
+                        "INSERT OR REPLACE INTO job_aliases (id, target, seq) VALUES (?, ?, ?)",
+                        (row["job_id"], job.id, self._next_seq()),
+                    )
+
+    def _cancel_execs(self) -> None:
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT exec_id FROM execs WHERE worker = ? AND cancel_requested = 1", (os.getpid(),)
+            ).fetchall()
+            self._connection.executemany("DELETE FROM execs WHERE exec_id = ?", [(row["exec_id"],) for row in rows])
+
+        for row in rows:
+            logger.info(f"Exec {row['exec_id']} cancelled by another worker")
+            if self._exec_canceller is not None:
+                self._exec_canceller(row["exec_id"])
+
+    def _mirror(self) -> None:
+        with self._lock:
+            state = self._connection.execute(
+                "SELECT value, seq FROM state WHERE key = 'digital_twin' AND seq > ?", (self._seen["state"],)
+            ).fetchone()
+            jobs = self._connection.execute(
+                "SELECT data, seq FROM jobs WHERE seq > ? ORDER BY seq", (self._seen["jobs"],)
+            ).fetchall()
+            aliases = self._connection.execute(
+                "SELECT id, target, seq FROM job_aliases WHERE seq > ? ORDER BY seq", (self._seen["job_aliases"],)
+            ).fetchall()
+            samples = self._connection.execute(
+                "SELECT seq, sampled_at, machines FROM stats_samples WHERE seq > ? ORDER BY seq",
+                (self._seen["stats_samples"],),
+            ).fetchall()
+
+        if state is not None:
+            self._seen["state"] = state["seq"]
+            digital_twin_state.mirror(json.loads(state["value"]))
+        for row in jobs:
+            self._seen["jobs"] = row["seq"]
+            job_manager.mirror(json.loads(row["data"]))
+        for row in aliases:
+            self._seen["job_aliases"] = row["seq"]
+            job_manager.alias(row["id"], row["target"])
+        for row in samples:
+            self._seen["stats_samples"] = row["seq"]
+            if row["sampled_at"] is None:
+                stats_sampler.stop()
+            else:
+                stats_sampler.ingest(json.loads(row["machines"]), row["sampled_at"])
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+# Global shared state, next to the resources and hidden like the uploads in progress
+shared_state = SharedState(
+    os.path.join("digital_twin", "resources", ".shared_state.sqlite3"),
+    api_settings.shared_state_poll_interval,
+    api_settings.stats_history_seconds,
+    api_settings.backend_workers,
+)
@@ -0,0 +1,174 @@
+"""In-memory simulator of the Kathara manager, for load-testing the dashboard without containers.
+
+When installed as the Kathara instance, the network scenario is built by the digital twin as usual but its
+machines are only recorded as deployed. Execs wait for a configurable latency; the RIB commands on the route
+servers return a canned RIB output, other commands return no output. The machines statistics follow a random walk
+around realistic values. Manager methods that are not modelled are accepted as no-ops.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from Kathara.manager.Kathara import Kathara
+from digital_twin.ixp.globals import RESOURCES_FOLDER
+from digital_twin.ixp.settings.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+_EXEC_CHUNK_BYTES = 64 * 1024
+_RIB_COMMANDS = ("show route", "show rib")
+
+
+class SimulatedMachineStats:
+    """Statistics of a simulated machine, with the attributes of the Kathara machine stats."""
+
+    def __init__(self, name: str, image: str, cpu_percent: float, memory_bytes: int, pids: int):
+        self.name = name
+        self.status = "running"
+        self.image = image
+        self.cpu_usage = f"{cpu_percent:.2f}%"
+        self.mem_usage = f"{memory_bytes / 1024 ** 2:.1f} MiB / 3.84 GiB"
+        self.pids = pids
+
+
+class _MachineLoad:
+    """Random walk of the load of a machine."""
+
+    def __init__(self, rng: random.Random, route_server: bool):
+        self.route_server = route_server
+        self.cpu_percent = rng.uniform(0.5, 5.0) if route_server else rng.uniform(0.0, 1.0)
+        self.memory_bytes = rng.randint(150, 400) * 1024 ** 2 if route_server else rng.randint(25, 60) * 1024 ** 2
+        self.pids = rng.randint(8, 12) if route_server else rng.randint(4, 7)
+
+    def step(self, rng: random.Random) -> None:
+        self.cpu_percent = min(100.0, max(0.0, self.cpu_percent + rng.gauss(0, 0.5 if self.route_server else 0.1)))
+        self.memory_bytes = max(10 * 1024 ** 2, self.memory_bytes + int(rng.gauss(0, 256 * 1024)))
+
+
+class SimulatedKathara:
+    """Kathara manager simulator."""
+
+    def __init__(self, exec_latency: float = 0.0, deploy_latency: float = 0.0, rib_output: Optional[str] = None,
+                 seed: Optional[int] = None):
+        """Initialize the simulator.
+
+        Args:
+            exec_latency: Seconds each exec waits before answering
+            deploy_latency: Seconds the deployment of each machine takes
+            rib_output: Path of the file returned by the RIB commands on the route servers, the configured RIB
+                dumps if None
+            seed: Seed of the statistics random walk
+        """
+        self.exec_latency = exec_latency
+        self.deploy_latency = deploy_latency
+        self.rib_output = rib_output
+        self.machines: Dict[str, Any] = {}
+        self._loads: Dict[str, _MachineLoad] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def install(self) -> None:
+        """Make the simulator the instance returned by `Kathara.get_instance()`."""
+        Kathara._Kathara__instance = self
+        logger.warning("Kathara calls are served by the in-memory simulator, no container is deployed")
+
+    @staticmethod
+    def uninstall() -> None:
+        """Drop the installed instance, the next `Kathara.get_instance()` creates a real manager."""
+        Kathara._Kathara__instance = None
+
+    def deploy_lab(self, lab: Any, selected_machines: Optional[set] = None, *args, **kwargs) -> None:
+        names = list(selected_machines or lab.machines)
+        time.sleep(self.deploy_latency * len(names))
+        route_servers = self._route_servers()
+        with self._lock:
+            for name in names:
+                self.machines[name] = lab
+                # As Kathara does with the container of a deployed device
+                if name in lab.machines:
+                    lab.machines[name].api_object = name
+                if name not in self._loads:
+                    self._loads[name] = _MachineLoad(self._rng, name in route_servers)
+
+    def undeploy_lab(self, *args, selected_machines: Optional[set] = None, **kwargs) -> None:
+        with self._lock:
+            names = list(self.machines) if selected_machines is None else selected_machines
+            for name in names:
+                self.machines.pop(name, None)
+                self._loads.pop(name, None)
+
+    def exec(self, machine_name: str, command: Any, *args, stream: bool = True, **kwargs) -> Any:
+        if machine_name not in self.machines:
+            raise Exception(f"Machine `{machine_name}` not found")
+        command = command if isinstance(command, str) else " ".join(command)
+        if any(rib_command in command for rib_command in _RIB_COMMANDS) and machine_name in self._route_servers():
+            chunks = self._iter_files(self._rib_output_paths())
+        else:
+            chunks = iter(())
+
+        if stream:
+            return self._stream(chunks)
+        time.sleep(self.exec_latency)
+        return b"".join(chunks), b"", 0
+
+    def get_machines_stats(self, *args, machine_name: Optional[str] = None,
+                           **kwargs) -> Iterator[Dict[str, SimulatedMachineStats]]:
+        while True:
+            with self._lock:
+                stats = {}
+                for name, load in self._loads.items():
+                    if machine_name is not None and name != machine_name:
+                        continue
+                    load.step(self._rng)
+                    stats[name] = SimulatedMachineStats(
+                        name, self._image(name), load.cpu_percent, load.memory_bytes, load.pids
+                    )
+            yield stats
+
+    def _stream(self, chunks: Iterator[bytes]) -> Iterator[tuple]:
+        time.sleep(self.exec_latency)
+        for chunk in chunks:
+            yield chunk, None
+
+    def _image(self, name: str) -> str:
+        try:
+            return self.machines[name].machines[name].get_image()
+        except Exception:
+            return "kathara/frr"
+
+    def _rib_output_paths(self) -> List[str]:
+        if self.rib_output is not None:
+            return [self.rib_output]
+        dumps = Settings.get_instance().rib_dumps.get("dumps", {})
+        return [os.path.join(RESOURCES_FOLDER, file) for file in dumps.values()]
+
+    @staticmethod
+    def _route_servers() -> set:
+        try:
+            return set(Settings.get_instance().route_servers)
+        except Exception:
+            return set()
+
+    @staticmethod
+    def _iter_files(paths: List[str]) -> Iterator[bytes]:
+        for path in paths:
+            with open(path, "rb") as f:
+                while True:
+                    chunk = f.read(_EXEC_CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    yield chunk
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def noop(*args, **kwargs) -> Any:
+            logger.debug(f"Simulated Kathara call ignored: {name}")
+            return None
+
+        return noop
@@ -0,0 +1,289 @@
+"""Binary snapshots of parsed dumps, so that a restarted backend does not parse unchanged dumps again.
+
+A snapshot file holds the pickled value, as stored by the dumps cache, behind a versioned header:
+
+    magic (8 bytes) | format version (uint32) | header length (uint32) | JSON header | pickled value
+
+The header describes the source files (path, size, modification time, SHA-256), the Python version the value was
+pickled with, and the length and CRC-32 of the value. Snapshots are named after the SHA-256 of the source files
+content, so they survive restarts and copies of the files, and are read back in bulk. The source hashes come from
+the resource catalogue when the files are indexed, otherwise from the sources already hashed by the store or
+described in the snapshot headers while their size and modification time did not change, and are only computed
+when they did.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from digital_twin.ixp.globals import RESOURCES_FOLDER
+
+from config import api_settings
+from dump_cache import sha256_file
+from resource_catalogue import resource_catalogue
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b"IXPDTSNP"
+SNAPSHOT_FORMAT_VERSION = 1
+SNAPSHOT_SUFFIX = ".snapshot"
+
+_PREAMBLE = struct.Struct("<8sII")
+
+
+def _python_version() -> str:
+    return f"{sys.version_info.major}.{sys.version_info.minor}"
+
+
+class Snapshot:
+    """Snapshot of the value parsed from given source files, read and written by the dumps cache."""
+
+    def __init__(self, store: "SnapshotStore", kind: str, params: Dict[str, Any], paths: List[str]):
+        """Initialize the snapshot, the source files are hashed on first access.
+
+        Args:
+            store: Store of the snapshot
+            kind: Kind of the parsed value, e.g. "table_dump"
+            params: Parameters of the parsing besides the source files, e.g. the dump types
+            paths: Paths of the source files, in the order they are parsed
+        """
+        self.store = store
+        self.kind = kind
+        self.params = params
+        self.paths = paths
+        self._sources: Optional[List[Dict[str, Any]]] = None
+        self._path: Optional[str] = None
+
+    @property
+    def path(self) -> str:
+        """Path of the snapshot file, named after the source files content."""
+        return self.resolve()
+
+    def resolve(self) -> str:
+        """Describe the source files, hashing them if needed, and name the snapshot file after them.
+
+        Done once: the snapshot keeps describing the source files as they were then, see `write()`.
+
+        Returns:
+            str: Path of the snapshot file
+
+        Raises:
+            FileNotFoundError: If a source file does not exist
+        """
+        if self._path is None:
+            self._sources = [self.store.describe_source(path) for path in self.paths]
+            name = hashlib.sha256(json.dumps({
+                "kind": self.kind,
+                "params": self.params,
+                "sources": [source["sha256"] for source in self._sources],
+            }, sort_keys=True).encode()).hexdigest()
+            self._path = os.path.join(self.store.directory, f"{self.kind}-{name}{SNAPSHOT_SUFFIX}")
+        return self._path
+
+    def read(self) -> Optional[bytes]:
+        """Read the pickled value, None if there is no valid snapshot.
+
+        Raises:
+            FileNotFoundError: If a source file does not exist
+        """
+        if not self.store.enabled:
+            return None
+        path = self.path
+        start = time.perf_counter()
+        try:
+            with open(path, "rb") as f:
+                magic, version, header_length = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+                if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_FORMAT_VERSION:
+                    raise ValueError(f"unsupported format {magic!r} version {version}")
+                header = json.loads(f.read(header_length))
+                if header["python"] != _python_version():
+                    raise ValueError(f"pickled with Python {header['python']}")
+                data = f.read()
+            if len(data) != header["length"]:
+                raise ValueError(f"truncated, {len(data)} of {header['length']} bytes")
+            if zlib.crc32(data) != header["crc32"]:
+                raise ValueError("checksum mismatch")
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Snapshot {path} discarded: {str(e)}")
+            self.discard()
+            return None
+
+        # Touched, the least recently used snapshots are pruned first
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        elapsed = time.perf_counter() - start
+        logger.info(f"Snapshot {os.path.basename(path)} loaded ({len(data)} bytes in {elapsed:.3f}s)")
+        return data
+
+    def write(self, data: bytes) -> None:
+        """Write the pickled value, atomically replacing the snapshot file.
+
+        Nothing is written if a source file changed since the snapshot was resolved: the value may have been parsed
+        from the new content, while the snapshot is named after the old one.
+
+        Args:
+            data: Pickled value
+        """
+        if not self.store.enabled:
+            return
+        try:
+            path = self.resolve()
+            for source in self._sources:
+                stat = os.stat(source["path"])
+                if (stat.st_size, stat.st_mtime_ns) != (source["size"], source["mtime_ns"]):
+                    logger.info(f"Snapshot {os.path.basename(path)} not written, {source['path']} changed")
+                    return
+            header = json.dumps({
+                "kind": self.kind,
+                "params": self.params,
+                "sources": self._sources,
+                "python": _python_version(),
+                "created_at": time.time(),
+                "length": len(data),
+                "crc32": zlib.crc32(data),
+            }).encode()
+
+            os.makedirs(self.store.directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(prefix=".snapshot.", dir=self.store.directory)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(_PREAMBLE.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT_VERSION, len(header)))
+                    f.write(header)
+                    f.write(data)
+                os.replace(temp_path, path)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+        except Exception as e:
+            # A snapshot is only an optimization, the parsed value is still returned
+            logger.warning(f"Failed to write the {self.kind} snapshot: {str(e)}")
+            return
+
+        logger.info(f"Snapshot {os.path.basename(path)} written ({len(data)} bytes)")
+        self.store.prune()
+
+    def discard(self) -> None:
+        """Delete the snapshot file, e.g. when its value cannot be unpickled anymore."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class SnapshotStore:
+    """Directory of snapshots, keeping the most recently used ones."""
+
+    def __init__(self, directory: str, max_snapshots: int):
+        """Initialize the store.
+
+        Args:
+            directory: Directory of the snapshot files
+            max_snapshots: Number of snapshots kept, 0 disables the snapshots
+        """
+        self.directory = directory
+        self.max_snapshots = max_snapshots
+        self._lock = threading.Lock()
+        # SHA-256 of the source files by real path, with the size and modification time they were hashed at
+        self._digests: Optional[Dict[str, Tuple[int, int, str]]] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_snapshots > 0
+
+    def snapshot(self, kind: str, params: Dict[str, Any], paths: List[str]) -> Snapshot:
+        """Return the snapshot of the value parsed from the given source files.
+
+        Args:
+            kind: Kind of the parsed value, e.g. "table_dump"
+            params: Parameters of the parsing besides the source files, they must be JSON serializable
+            paths: Paths of the source files, in the order they are parsed
+        """
+        return Snapshot(self, kind, params, paths)
+
+    def describe_source(self, path: str) -> Dict[str, Any]:
+        """Return the path, size, modification time and SHA-256 of a source file.
+
+        Raises:
+            FileNotFoundError: If the file does not exist
+        """
+        real_path = os.path.realpath(path)
+        stat = os.stat(real_path)
+        digest = None
+        relative_path = os.path.relpath(real_path, os.path.realpath(RESOURCES_FOLDER))
+        if not relative_path.startswith(".."):
+            digest = resource_catalogue.indexed_sha256(relative_path, stat.st_size, stat.st_mtime_ns)
+        if digest is None:
+            with self._lock:
+                if self._digests is None:
+                    self._digests = self._read_described_sources()
+                known = self._digests.get(real_path)
+            if known is not None and known[:2] == (stat.st_size, stat.st_mtime_ns):
+                digest = known[2]
+            else:
+                digest = sha256_file(real_path)
+                with self._lock:
+                    self._digests[real_path] = (stat.st_size, stat.st_mtime_ns, digest)
+        return {"path": real_path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest}
+
+    def _read_described_sources(self) -> Dict[str, Tuple[int, int, str]]:
+        """Read the source files described in the snapshot headers, so a restart does not hash them again."""
+        digests: Dict[str, Tuple[int, int, str]] = {}
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith(SNAPSHOT_SUFFIX)]
+        except FileNotFoundError:
+            return digests
+        for name in names:
+            try:
+                with open(os.path.join(self.directory, name), "rb") as f:
+                    magic, version, header_length = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+                    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_FORMAT_VERSION:
+                        continue
+                    header = json.loads(f.read(header_length))
+                for source in header["sources"]:
+                    digests[source["path"]] = (source["size"], source["mtime_ns"], source["sha256"])
+            except Exception as e:
+                logger.debug(f"Snapshot {name} header not read: {str(e)}")
+        return digests
+
+    def prune(self) -> None:
+        """Delete the least recently used snapshots beyond the maximum number, per kind of value."""
+        with self._lock:
+            try:
+                names = [name for name in os.listdir(self.directory) if name.endswith(SNAPSHOT_SUFFIX)]
+            except FileNotFoundError:
+                return
+            used: Dict[str, List[Tuple[float, str]]] = {}
+            for name in names:
+                path = os.path.join(self.directory, name)
+                try:
+                    used.setdefault(name.rsplit("-", 1)[0], []).append((os.path.getmtime(path), path))
+                except FileNotFoundError:
+                    continue
+            stale = [
+                path for kind_used in used.values() for _, path in sorted(kind_used, reverse=True)[self.max_snapshots:]
+            ]
+            for path in stale:
+                try:
+                    os.remove(path)
+                    logger.info(f"Snapshot {os.path.basename(path)} pruned")
+                except FileNotFoundError:
+                    pass
+
+
+# Global snapshot store, next to the resources and hidden like the uploads in progress
+snapshot_store = SnapshotStore(
+    os.path.join("digital_twin", "resources", ".snapshots"), api_settings.table_dump_snapshots_max
+)
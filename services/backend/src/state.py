@@ -1,84 +1,286 @@
-"""Global state management for the digital twin."""
+"""Global state management for the digital twin.
 
-from typing import Optional, Any
+The digital twin goes through a lifecycle: idle, starting, running, reloading, stopping, and error when a start
+failed. The lifecycle operations (start, reattach, reload, stop) move it from state to state with
+`DigitalTwinState.operation()`, which refuses an operation that is not valid in the current state. The state is
+guarded by a lock, and read by the endpoints as a consistent snapshot while an operation runs.
+
+When the backend runs several workers, only the leader runs the operations: the other workers mirror its state, see
+`shared_state`, and hold no network scenario manager.
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+LIFECYCLE_IDLE = "idle"
+LIFECYCLE_STARTING = "starting"
+LIFECYCLE_RUNNING = "running"
+LIFECYCLE_RELOADING = "reloading"
+LIFECYCLE_STOPPING = "stopping"
+LIFECYCLE_ERROR = "error"
+
+
+class LifecycleOperation(NamedTuple):
+    """Transitions of a lifecycle operation."""
+    sources: tuple
+    in_progress: str
+    succeeded: str
+    failed: str
+
+
+# Lifecycle operations, keyed by the kind of the job running them
+LIFECYCLE_OPERATIONS: Dict[str, LifecycleOperation] = {
+    "start": LifecycleOperation(
+        (LIFECYCLE_IDLE, LIFECYCLE_ERROR), LIFECYCLE_STARTING, LIFECYCLE_RUNNING, LIFECYCLE_ERROR
+    ),
+    "reattach": LifecycleOperation(
+        (LIFECYCLE_IDLE, LIFECYCLE_ERROR), LIFECYCLE_STARTING, LIFECYCLE_RUNNING, LIFECYCLE_ERROR
+    ),
+    # A failed reload leaves the digital twin deployed, the failure is reported by its job
+    "reload": LifecycleOperation(
+        (LIFECYCLE_RUNNING,), LIFECYCLE_RELOADING, LIFECYCLE_RUNNING, LIFECYCLE_RUNNING
+    ),
+    "stop": LifecycleOperation(
+        (LIFECYCLE_RUNNING, LIFECYCLE_ERROR), LIFECYCLE_STOPPING, LIFECYCLE_IDLE, LIFECYCLE_ERROR
+    ),
+}
+
+_REJECTIONS = {
+    LIFECYCLE_IDLE: "Digital twin is not running",
+    LIFECYCLE_STARTING: "Digital twin is already starting",
+    LIFECYCLE_RUNNING: "Digital twin is already running",
+    LIFECYCLE_RELOADING: "Digital twin is reloading",
+    LIFECYCLE_STOPPING: "Digital twin is stopping",
+    LIFECYCLE_ERROR: "Digital twin is not running",
+}
+
+
+class LifecycleError(Exception):
+    """Raised when a lifecycle operation is not valid in the current state of the digital twin."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class StateSnapshot(NamedTuple):
+    """Consistent view of the digital twin state."""
+    lifecycle: str
+    net_scenario_manager: Any
+    table_dump: Any
+    error: Optional[str]
+    replica: Optional[Dict[str, Any]]
+
+    @property
+    def running(self) -> bool:
+        return self.lifecycle in (LIFECYCLE_RUNNING, LIFECYCLE_RELOADING)
+
+    @property
+    def starting(self) -> bool:
+        return self.lifecycle == LIFECYCLE_STARTING
+
+    @property
+    def devices_count(self) -> Optional[int]:
+        if self.table_dump is not None:
+            return len(self.table_dump.entries)
+        return self.replica["devices_count"] if self.replica is not None else None
+
+
+class Operation:
+    """Lifecycle operation in progress, whose results are applied with its final transition."""
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.outcome: Optional[str] = None
+        self.fields: Dict[str, Any] = {}
+
+    def update(self, **fields: Any) -> None:
+        """Set state fields (net_scenario_manager, table_dump) once the operation succeeds."""
+        self.fields.update(fields)
 
 
 class DigitalTwinState:
     """Manages the state of the digital twin application."""
-    
+
     def __init__(self):
         """Initialize the digital twin state."""
         self._state = {
-            "running": False,
-            "starting": False,
+            "lifecycle": LIFECYCLE_IDLE,
             "net_scenario_manager": None,
             "table_dump": None,
             "error": None,
-            "machines_stats_generator": None
+            "replica": None,
         }
-    
+        self._lock = threading.RLock()
+        self._listeners: List[Callable[[], None]] = []
+
+    def snapshot(self) -> StateSnapshot:
+        """Get a consistent view of the state."""
+        with self._lock:
+            return StateSnapshot(**self._state)
+
+    def get_lifecycle(self) -> str:
+        """Get the lifecycle state."""
+        return self._state["lifecycle"]
+
     def is_running(self) -> bool:
-        """Check if the digital twin is running."""
-        return self._state["running"]
-    
+        """Check if the digital twin is running, reloading included."""
+        return self.snapshot().running
+
     def is_starting(self) -> bool:
         """Check if the digital twin is starting."""
-        return self._state["starting"]
-    
+        return self.snapshot().starting
+
     def get_error(self) -> Optional[str]:
         """Get the current error, if any."""
         return self._state["error"]
-    
+
     def get_devices_count(self) -> Optional[int]:
         """Get the number of devices in the digital twin."""
-        if self._state["table_dump"] is not None:
-            return len(self._state["table_dump"].entries)
-        return None
-    
+        return self.snapshot().devices_count
+
     def get_net_scenario_manager(self) -> Any:
         """Get the network scenario manager."""
         return self._state["net_scenario_manager"]
-    
+
     def get_table_dump(self) -> Any:
         """Get the table dump."""
         return self._state["table_dump"]
-    
-    def get_machines_stats_generator(self) -> Optional[Any]:
-        """Get the cached machines stats generator."""
-        return self._state["machines_stats_generator"]
-    
-    def set_machines_stats_generator(self, generator: Optional[Any]) -> None:
-        """Set the cached machines stats generator."""
-        self._state["machines_stats_generator"] = generator
-    
-    def set_starting(self, value: bool) -> None:
-        """Set the starting state."""
-        self._state["starting"] = value
-    
-    def set_running(self, value: bool) -> None:
-        """Set the running state."""
-        self._state["running"] = value
-    
+
+    def get_replica(self) -> Optional[Dict[str, Any]]:
+        """Get the state mirrored from the leader worker, None in the leader."""
+        return self._state["replica"]
+
+    def export(self) -> Dict[str, Any]:
+        """Export the state as JSON, for the workers mirroring it.
+
+        Returns:
+            Dict[str, Any]: Lifecycle, error, number of devices, and the name and machines of the lab
+        """
+        state = self.snapshot()
+        lab = state.net_scenario_manager.get() if state.net_scenario_manager is not None else None
+        return {
+            "lifecycle": state.lifecycle,
+            "error": state.error,
+            "devices_count": state.devices_count,
+            "lab_name": lab.name if lab is not None else None,
+            "machines": sorted(list(lab.machines)) if lab is not None else [],
+        }
+
+    def mirror(self, exported: Dict[str, Any]) -> None:
+        """Replace the state with the one exported by the leader worker.
+
+        Args:
+            exported: State returned by `export()` in the leader
+        """
+        with self._lock:
+            self._state["lifecycle"] = exported["lifecycle"]
+            self._state["error"] = exported["error"]
+            self._state["net_scenario_manager"] = None
+            self._state["table_dump"] = None
+            self._state["replica"] = exported
+        self._notify()
+
+    def add_listener(self, listener: Callable[[], None]) -> None:
+        """Register a callback invoked after each change of the state."""
+        self._listeners.append(listener)
+
+    def check(self, kind: str, queued: Optional[List[str]] = None) -> None:
+        """Check that a lifecycle operation can be requested.
+
+        Args:
+            kind: Kind of the operation
+            queued: Kinds of the lifecycle operations queued or in progress, the operation runs after them
+
+        Raises:
+            LifecycleError: If the operation is not valid in the state the digital twin will be in
+        """
+        sources = LIFECYCLE_OPERATIONS[kind].sources
+        with self._lock:
+            current = self._state["lifecycle"]
+        # Assuming the operations ahead succeed
+        lifecycle = LIFECYCLE_OPERATIONS[queued[-1]].succeeded if queued else current
+        if lifecycle not in sources:
+            raise LifecycleError(_REJECTIONS[current if current not in sources else lifecycle])
+
+    @contextmanager
+    def operation(self, kind: str) -> Iterator[Operation]:
+        """Run a lifecycle operation, moving the state to its in-progress state, then to its outcome.
+
+        The fields set with `Operation.update()` are applied together with the final transition. On failure, the
+        error of a start is kept in the state.
+
+        Args:
+            kind: Kind of the operation
+
+        Raises:
+            LifecycleError: If the operation is not valid in the current state
+        """
+        transitions = LIFECYCLE_OPERATIONS[kind]
+        with self._lock:
+            lifecycle = self._state["lifecycle"]
+            if lifecycle not in transitions.sources:
+                raise LifecycleError(_REJECTIONS[lifecycle])
+            self._state["lifecycle"] = transitions.in_progress
+            self._state["error"] = None
+            # Operations run in the leader, which does not mirror another worker anymore
+            self._state["replica"] = None
+        self._notify()
+
+        operation = Operation(kind)
+        try:
+            yield operation
+        except Exception as e:
+            with self._lock:
+                self._state["lifecycle"] = transitions.failed
+                if transitions.failed == LIFECYCLE_ERROR:
+                    self._state["error"] = str(e)
+            self._notify()
+            raise
+        with self._lock:
+            self._state.update(operation.fields)
+            self._state["lifecycle"] = operation.outcome or transitions.succeeded
+        self._notify()
+
     def set_error(self, value: Optional[str]) -> None:
         """Set the error message."""
-        self._state["error"] = value
-    
+        self._set("error", value)
+
     def set_net_scenario_manager(self, manager: Any) -> None:
         """Set the network scenario manager."""
-        self._state["net_scenario_manager"] = manager
-    
+        self._set("net_scenario_manager", manager)
+
     def set_table_dump(self, dump: Any) -> None:
         """Set the table dump."""
-        self._state["table_dump"] = dump
-    
+        self._set("table_dump", dump)
+
     def reset(self) -> None:
         """Reset all state to initial values."""
-        self._state["running"] = False
-        self._state["starting"] = False
-        self._state["net_scenario_manager"] = None
-        self._state["table_dump"] = None
-        self._state["error"] = None
-        self._state["machines_stats_generator"] = None
+        with self._lock:
+            self._state["lifecycle"] = LIFECYCLE_IDLE
+            self._state["net_scenario_manager"] = None
+            self._state["table_dump"] = None
+            self._state["error"] = None
+            self._state["replica"] = None
+        self._notify()
+
+    def _set(self, key: str, value: Any) -> None:
+        with self._lock:
+            if self._state[key] is value or self._state[key] == value:
+                return
+            self._state[key] = value
+        self._notify()
+
+    def _notify(self) -> None:
+        for listener in self._listeners:
+            try:
+                listener()
+            except Exception as e:
+                logger.warning(f"State listener failed: {str(e)}")
 
 
 # Global state instance
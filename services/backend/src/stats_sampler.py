@@ -0,0 +1,216 @@
+"""Background sampling of the machines statistics into per-machine ring buffers.
+
+A single thread reads the Kathara machines stats at a fixed interval, so API requests are served from memory and
+the number of clients does not add any load on the container runtime.
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional
+
+from Kathara.manager.Kathara import Kathara
+
+from config import api_settings
+
+logger = logging.getLogger(__name__)
+
+_MEMORY_UNITS = {
+    "b": 1,
+    "kb": 1000, "mb": 1000 ** 2, "gb": 1000 ** 3, "tb": 1000 ** 4,
+    "kib": 1024, "mib": 1024 ** 2, "gib": 1024 ** 3, "tib": 1024 ** 4,
+}
+_MEMORY_RE = re.compile(r"^\s*([\d.]+)\s*([a-zA-Z]*)")
+
+
+class StatsSample(NamedTuple):
+    """Statistics of a machine at a point in time."""
+    timestamp: float
+    cpu_percent: Optional[float]
+    memory_bytes: Optional[int]
+    pids: Optional[int]
+
+
+def parse_cpu_usage(value: Any) -> Optional[float]:
+    """Parse a CPU usage such as "12.5%" into a percentage."""
+    try:
+        return float(str(value).strip().rstrip("%"))
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_memory_usage(value: Any) -> Optional[int]:
+    """Parse the used part of a memory usage such as "10.5 MB / 1 GB" into bytes."""
+    match = _MEMORY_RE.match(str(value).split("/")[0])
+    if match is None:
+        return None
+    multiplier = _MEMORY_UNITS.get(match.group(2).lower() or "b")
+    if multiplier is None:
+        return None
+    return int(float(match.group(1)) * multiplier)
+
+
+def _parse_pids(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class StatsSampler:
+    """Samples the statistics of the machines of a lab on a background thread."""
+
+    def __init__(self, interval: float, history_seconds: float):
+        """Initialize the sampler.
+
+        Args:
+            interval: Seconds between two samples
+            history_seconds: Seconds of samples kept per machine
+        """
+        self.interval = interval
+        self._max_samples = max(1, int(history_seconds / interval))
+        self._history: Dict[str, Deque[StatsSample]] = {}
+        self._latest: Dict[str, Dict[str, Any]] = {}
+        self._sampled_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._listeners: List[Callable[[Dict[str, Dict[str, Any]], List[str], Optional[float]], None]] = []
+
+    def add_listener(self, listener: Callable[[Dict[str, Dict[str, Any]], List[str], Optional[float]], None]) -> None:
+        """Register a callback invoked after each sample with the changes since the previous one.
+
+        The callback receives the statistics of the changed machines, the names of the removed machines and the
+        timestamp of the sample.
+        """
+        self._listeners.append(listener)
+
+    def start(self, lab: Any) -> None:
+        """Start sampling the machines of a lab, replacing any previous sampling.
+
+        Args:
+            lab: Kathara lab whose machines are sampled
+        """
+        self.stop()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(lab, self._stop_event), name="stats-sampler", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Machines stats sampler started (every {self.interval}s)")
+
+    def stop(self) -> None:
+        """Stop sampling and drop the collected samples."""
+        self._stop_event.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.interval + 5)
+        self._thread = None
+        with self._lock:
+            removed = list(self._latest)
+            self._history.clear()
+            self._latest = {}
+            self._sampled_at = None
+        if removed:
+            self._notify({}, removed, None)
+
+    def is_running(self) -> bool:
+        """Check if the sampling thread is alive."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def latest(self) -> Dict[str, Dict[str, Any]]:
+        """Get the last sampled statistics of each machine, as reported by Kathara."""
+        with self._lock:
+            return dict(self._latest)
+
+    def sampled_at(self) -> Optional[float]:
+        """Get the timestamp of the last sample."""
+        return self._sampled_at
+
+    def history(self, window_seconds: Optional[float] = None,
+                machine_name: Optional[str] = None) -> Dict[str, List[StatsSample]]:
+        """Get the samples of the machines.
+
+        Args:
+            window_seconds: Only return the samples of the last `window_seconds` seconds, all of them if None
+            machine_name: Only return the samples of this machine
+
+        Returns:
+            Dict[str, List[StatsSample]]: Samples keyed by machine name, oldest first
+        """
+        since = time.time() - window_seconds if window_seconds is not None else None
+        with self._lock:
+            names = [machine_name] if machine_name is not None else list(self._history)
+            return {
+                name: [sample for sample in self._history[name] if since is None or sample.timestamp >= since]
+                for name in names if name in self._history
+            }
+
+    def _run(self, lab: Any, stop_event: threading.Event) -> None:
+        generator = None
+        while not stop_event.is_set():
+            started = time.monotonic()
+            try:
+                if generator is None:
+                    generator = Kathara.get_instance().get_machines_stats(lab=lab)
+                self._record(next(generator))
+            except Exception as e:
+                # Recreate the generator on the next tick, it is unusable once it raised
+                logger.warning(f"Failed to sample machines statistics: {str(e)}")
+                generator = None
+            stop_event.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def ingest(self, latest: Dict[str, Dict[str, Any]], sampled_at: float) -> None:
+        """Record a sample taken by another worker, see `shared_state`.
+
+        Args:
+            latest: Statistics of each machine, as returned by `latest()` in the sampling worker
+            sampled_at: Timestamp of the sample
+        """
+        self._ingest(latest, sampled_at)
+
+    def _record(self, machines: Dict[str, Any]) -> None:
+        latest = {}
+        for machine_id, stats in machines.items():
+            latest[machine_id] = {
+                "status": stats.status,
+                "image": stats.image,
+                "cpu_usage": stats.cpu_usage,
+                "memory_usage": stats.mem_usage,
+                "pids": stats.pids,
+                "name": stats.name,
+            }
+        self._ingest(latest, time.time())
+
+    def _ingest(self, latest: Dict[str, Dict[str, Any]], now: float) -> None:
+        with self._lock:
+            changed = {name: stats for name, stats in latest.items() if self._latest.get(name) != stats}
+            removed = [name for name in self._latest if name not in latest]
+            for name in list(self._history):
+                if name not in latest:
+                    del self._history[name]
+            for name, stats in latest.items():
+                history = self._history.get(name)
+                if history is None:
+                    history = self._history[name] = deque(maxlen=self._max_samples)
+                history.append(StatsSample(
+                    now,
+                    parse_cpu_usage(stats["cpu_usage"]),
+                    parse_memory_usage(stats["memory_usage"]),
+                    _parse_pids(stats["pids"]),
+                ))
+            self._latest = latest
+            self._sampled_at = now
+        self._notify(changed, removed, now)
+
+    def _notify(self, changed: Dict[str, Dict[str, Any]], removed: List[str], sampled_at: Optional[float]) -> None:
+        for listener in self._listeners:
+            try:
+                listener(changed, removed, sampled_at)
+            except Exception as e:
+                logger.warning(f"Stats listener failed: {str(e)}")
+
+
+# Global sampler instance
+stats_sampler = StatsSampler(api_settings.stats_sample_interval, api_settings.stats_history_seconds)
@@ -0,0 +1,458 @@
+"""Streamed and resumable uploads of resource files.
+
+Uploads are written in chunks to a temporary file in the destination directory, hashed on the fly, and atomically
+renamed once complete, so a partially written file is never visible under its final name.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import stat
+import tarfile
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from typing import Any, AsyncIterator, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from config import api_settings
+
+logger = logging.getLogger(__name__)
+
+# Directory of the resumable upload sessions, relative to the resources directory
+UPLOAD_SESSIONS_DIR = ".uploads"
+
+_SESSION_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+class UploadError(Exception):
+    """Raised when an upload is rejected."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def is_hidden_path(relative_path: str) -> bool:
+    """Check if a path sent by a client has a hidden component, e.g. a `.DS_Store` file of a directory upload.
+
+    Hidden names are reserved to the backend state in the resources directory, see `resolve_resource_path`.
+    """
+    parts = os.path.normpath(relative_path.replace("\\", "/")).lstrip("/").split("/")
+    return any(part.startswith(".") and part not in (".", "..") for part in parts)
+
+
+def resolve_resource_path(resources_dir: str, relative_path: str) -> str:
+    """Resolve a path inside the resources directory.
+
+    Args:
+        resources_dir: Resources directory
+        relative_path: Path relative to the resources directory, as sent by the client
+
+    Returns:
+        str: Absolute path
+
+    Raises:
+        UploadError: If the path is empty, hidden or escapes the resources directory
+    """
+    normalized = os.path.normpath(relative_path.replace("\\", "/")).lstrip("/")
+    parts = normalized.split("/")
+    if not normalized or normalized == "." or any(part == ".." or part.startswith(".") for part in parts):
+        raise UploadError(f"Invalid file path '{relative_path}'")
+
+    root = os.path.realpath(resources_dir)
+    path = os.path.realpath(os.path.join(root, normalized))
+    if os.path.commonpath([root, path]) != root:
+        raise UploadError(f"Invalid file path '{relative_path}'")
+    return path
+
+
+async def iter_upload_file(file, chunk_size: Optional[int] = None) -> AsyncIterator[bytes]:
+    """Iterate over the content of a multipart `UploadFile` in chunks."""
+    chunk_size = chunk_size or api_settings.upload_chunk_bytes
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def iter_request_body(request) -> AsyncIterator[bytes]:
+    """Iterate over the raw body of a request, without buffering it."""
+    async for chunk in request.stream():
+        if chunk:
+            yield chunk
+
+
+async def write_stream(chunks: AsyncIterator[bytes], path: str, max_bytes: Optional[int] = None) -> Tuple[int, str]:
+    """Write a stream of chunks to a file, atomically.
+
+    The size limit is checked while the chunks are received. The files of a multipart request are only read once
+    Starlette has spooled the whole body to temporary files, so for them the limit bounds what reaches the resources
+    directory, not what is received: large files go through the resumable uploads instead.
+
+    Args:
+        chunks: Content of the file
+        path: Destination path, its directory is created if needed
+        max_bytes: Maximum size of the file, the configured limit if None
+
+    Returns:
+        Tuple[int, str]: Size and SHA-256 hex digest of the written file
+
+    Raises:
+        UploadError: If the file exceeds `max_bytes`
+    """
+    max_bytes = max_bytes or api_settings.upload_max_bytes
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+    sha256 = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadError(f"File exceeds the maximum upload size of {max_bytes} bytes", 413)
+                sha256.update(chunk)
+                await run_in_threadpool(f.write, chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return size, sha256.hexdigest()
+
+
+def _write_file(chunks: Iterable[bytes], path: str) -> int:
+    """Write chunks to a file through a temporary file atomically renamed, returning the written size."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                size += len(chunk)
+                f.write(chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return size
+
+
+def _iter_member(f: BinaryIO, budget: List[int]) -> Iterator[bytes]:
+    """Read an archive member in chunks, charging its size to the remaining extraction budget."""
+    for chunk in iter(lambda: f.read(api_settings.upload_chunk_bytes), b""):
+        budget[0] -= len(chunk)
+        if budget[0] < 0:
+            raise UploadError(
+                f"Archive content exceeds the maximum upload size of {api_settings.upload_max_bytes} bytes", 413
+            )
+        yield chunk
+
+
+def _iter_archive_members(archive_path: str) -> Iterator[Tuple[str, str, Optional[BinaryIO]]]:
+    """Iterate over the members of a tar (optionally compressed) or zip archive, in archive order.
+
+    Yields:
+        Tuple[str, str, Optional[BinaryIO]]: Member name, kind ("file", "directory" or "other") and, for files, a
+            stream of the content only valid until the next member
+    """
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as archive:
+            for info in archive.infolist():
+                mode = info.external_attr >> 16
+                if info.is_dir():
+                    yield info.filename, "directory", None
+                elif stat.S_IFMT(mode) not in (0, stat.S_IFREG):
+                    yield info.filename, "other", None
+                else:
+                    with archive.open(info) as f:
+                        yield info.filename, "file", f
+        return
+
+    try:
+        # Stream mode reads the members sequentially, compressed archives are never decompressed in memory
+        archive = tarfile.open(archive_path, mode="r|*")
+    except tarfile.TarError:
+        raise UploadError("Unsupported archive format, expected a tar (.tar, .tar.gz, .tgz, ...) or zip archive")
+
+    with archive:
+        for member in archive:
+            if member.isdir():
+                yield member.name, "directory", None
+            elif member.isfile():
+                yield member.name, "file", archive.extractfile(member)
+            else:
+                yield member.name, "other", None
+
+
+def extract_archive(archive_path: str, resources_dir: str,
+                    directory: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Extract an archive into the resources directory, reporting each member.
+
+    Files are extracted in chunks, each one through a temporary file atomically renamed. Members whose path is
+    hidden or escapes the destination, and links and special files, are rejected without aborting the extraction.
+
+    Args:
+        archive_path: Path of the archive
+        resources_dir: Resources directory
+        directory: Directory of the resources to extract into, the resources directory itself if None
+
+    Yields:
+        Dict[str, Any]: For each member, its path relative to the resources directory, status ("extracted",
+            "rejected") and size or error
+
+    Raises:
+        UploadError: If the archive format is not supported or its content exceeds the limits
+    """
+    root = os.path.realpath(resources_dir)
+    destination = resolve_resource_path(resources_dir, directory) if directory else root
+    budget = [api_settings.upload_max_bytes]
+    files_count = 0
+    for name, kind, f in _iter_archive_members(archive_path):
+        name = os.path.normpath(name)
+        if name == ".":
+            # Root entry of archives created from inside the directory, e.g. "./"
+            continue
+        relative_path = os.path.join(directory, name) if directory else name
+        try:
+            # Members are confined to the destination directory, not only to the resources directory
+            path = resolve_resource_path(destination, name)
+        except UploadError as e:
+            yield {"filename": relative_path, "status": "rejected", "error": str(e)}
+            continue
+
+        if kind == "directory":
+            os.makedirs(path, exist_ok=True)
+        elif kind == "other":
+            yield {
+                "filename": relative_path, "status": "rejected", "error": "Links and special files are not extracted"
+            }
+        else:
+            files_count += 1
+            if files_count > api_settings.archive_max_files:
+                raise UploadError(f"Archive contains more than {api_settings.archive_max_files} files", 413)
+            size = _write_file(_iter_member(f, budget), path)
+            relative_path = os.path.relpath(path, root)
+            yield {"filename": relative_path, "status": "extracted", "size": size}
+
+
+class UploadSession:
+    """A resumable upload, received as a sequence of chunks appended at increasing offsets."""
+
+    def __init__(self, directory: str, session_id: str, filename: str, size: int, sha256: Optional[str],
+                 created_at: float):
+        self.directory = directory
+        self.id = session_id
+        self.filename = filename
+        self.size = size
+        self.sha256 = sha256
+        self.created_at = created_at
+        self.lock = threading.Lock()
+        self._hasher = None
+
+    @property
+    def part_path(self) -> str:
+        """Path of the partially received file."""
+        return os.path.join(self.directory, f"{self.id}.part")
+
+    @property
+    def meta_path(self) -> str:
+        """Path of the session metadata."""
+        return os.path.join(self.directory, f"{self.id}.json")
+
+    @property
+    def offset(self) -> int:
+        """Number of bytes received so far."""
+        return os.path.getsize(self.part_path) if os.path.exists(self.part_path) else 0
+
+    def hasher(self):
+        """Get the SHA-256 of the bytes received so far, rebuilt from the partial file after a restart."""
+        if self._hasher is None:
+            self._hasher = hashlib.sha256()
+            if os.path.exists(self.part_path):
+                with open(self.part_path, "rb") as f:
+                    for block in iter(lambda: f.read(api_settings.upload_chunk_bytes), b""):
+                        self._hasher.update(block)
+        return self._hasher
+
+    def save(self) -> None:
+        """Persist the session metadata, so the upload can be resumed after a restart."""
+        with open(self.meta_path, "w") as f:
+            json.dump({
+                "id": self.id,
+                "filename": self.filename,
+                "size": self.size,
+                "sha256": self.sha256,
+                "created_at": self.created_at,
+            }, f)
+
+    def delete(self) -> None:
+        """Remove the partial file and the metadata."""
+        for path in (self.part_path, self.meta_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def to_dict(self) -> Dict:
+        """Return a serializable snapshot of the session."""
+        return {
+            "upload_id": self.id,
+            "filename": self.filename,
+            "size": self.size,
+            "offset": self.offset,
+            "created_at": self.created_at,
+        }
+
+
+class UploadSessionStore:
+    """Resumable upload sessions, persisted in the resources directory."""
+
+    def __init__(self, resources_dir: str):
+        """Initialize the store.
+
+        Args:
+            resources_dir: Resources directory, the sessions are kept in its UPLOAD_SESSIONS_DIR subdirectory
+        """
+        self.resources_dir = resources_dir
+        self._sessions: Dict[str, UploadSession] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self) -> str:
+        """Directory of the sessions."""
+        return os.path.join(self.resources_dir, UPLOAD_SESSIONS_DIR)
+
+    def create(self, filename: str, size: int, sha256: Optional[str] = None) -> UploadSession:
+        """Start a resumable upload.
+
+        Args:
+            filename: Destination path, relative to the resources directory
+            size: Total size of the file
+            sha256: Expected SHA-256 hex digest, checked once the upload is complete
+
+        Raises:
+            UploadError: If the path is invalid or the size exceeds the limit
+        """
+        resolve_resource_path(self.resources_dir, filename)
+        if size > api_settings.upload_max_bytes:
+            raise UploadError(f"File exceeds the maximum upload size of {api_settings.upload_max_bytes} bytes", 413)
+
+        self.expire()
+        os.makedirs(self.directory, exist_ok=True)
+        session = UploadSession(self.directory, uuid.uuid4().hex, filename, size, sha256, time.time())
+        session.save()
+        open(session.part_path, "wb").close()
+        with self._lock:
+            self._sessions[session.id] = session
+        logger.info(f"Upload {session.id} of '{filename}' ({size} bytes) started")
+        return session
+
+    def get(self, session_id: str) -> Optional[UploadSession]:
+        """Get a session by its ID, loading it from disk if it was created before a restart."""
+        if not _SESSION_ID_RE.match(session_id):
+            return None
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                meta_path = os.path.join(self.directory, f"{session_id}.json")
+                if not os.path.exists(meta_path):
+                    return None
+                with open(meta_path) as f:
+                    meta = json.load(f)
+                session = UploadSession(
+                    self.directory, session_id, meta["filename"], meta["size"], meta.get("sha256"), meta["created_at"]
+                )
+                self._sessions[session_id] = session
+            return session
+
+    def list(self) -> List[UploadSession]:
+        """List the sessions stored on disk."""
+        if not os.path.isdir(self.directory):
+            return []
+        sessions = (self.get(name[:-len(".json")]) for name in os.listdir(self.directory) if name.endswith(".json"))
+        return [session for session in sessions if session is not None]
+
+    def remove(self, session: UploadSession) -> None:
+        """Delete a session and its partial file."""
+        with self._lock:
+            self._sessions.pop(session.id, None)
+        session.delete()
+
+    def expire(self) -> None:
+        """Delete the sessions older than the configured TTL."""
+        deadline = time.time() - api_settings.upload_session_ttl_seconds
+        for session in self.list():
+            if session.created_at < deadline:
+                logger.info(f"Upload {session.id} of '{session.filename}' expired")
+                self.remove(session)
+
+    async def append(self, session: UploadSession, offset: int, chunks: AsyncIterator[bytes]) -> Dict:
+        """Append a chunk to a session, completing the upload once all the bytes are received.
+
+        Args:
+            session: Session to append to
+            offset: Offset of the chunk, must be the number of bytes already received
+            chunks: Content of the chunk
+
+        Returns:
+            Dict: The session state, with `completed`, and `sha256` once completed
+
+        Raises:
+            UploadError: If the offset does not match, the upload exceeds its size or its checksum does not match
+        """
+        if not session.lock.acquire(blocking=False):
+            raise UploadError("Another chunk of this upload is being received", 409)
+        try:
+            current = session.offset
+            if offset != current:
+                raise UploadError(f"Offset {offset} does not match the received size {current}", 409)
+
+            # Rebuilding the hash after a restart reads the whole partial file
+            hasher = await run_in_threadpool(session.hasher)
+            received = current
+            with open(session.part_path, "ab") as f:
+                async for chunk in chunks:
+                    received += len(chunk)
+                    if received > session.size:
+                        # Drop the whole chunk, so the client can resume from the last good offset
+                        f.truncate(current)
+                        session._hasher = None
+                        raise UploadError(f"Chunk exceeds the declared upload size of {session.size} bytes", 413)
+                    hasher.update(chunk)
+                    await run_in_threadpool(f.write, chunk)
+
+            result = {**session.to_dict(), "completed": False, "sha256": None}
+            if received == session.size:
+                result.update(await run_in_threadpool(self._complete, session, hasher.hexdigest()), completed=True)
+            return result
+        except UploadError:
+            raise
+        except BaseException:
+            # An interrupted chunk leaves a partial write: the hash is rebuilt from the file on the next one
+            session._hasher = None
+            raise
+        finally:
+            session.lock.release()
+
+    def _complete(self, session: UploadSession, digest: str) -> Dict:
+        if session.sha256 is not None and session.sha256.lower() != digest:
+            self.remove(session)
+            raise UploadError(f"Checksum mismatch: expected {session.sha256}, got {digest}", 422)
+
+        path = resolve_resource_path(self.resources_dir, session.filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(session.part_path, path)
+        self.remove(session)
+        logger.info(f"Upload {session.id} of '{session.filename}' completed ({session.size} bytes)")
+        return {"offset": session.size, "sha256": digest}
+
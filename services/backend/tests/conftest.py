@@ -0,0 +1,6 @@
+"""The backend modules are imported from the src directory, as the application runs from it."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
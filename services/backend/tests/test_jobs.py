@@ -0,0 +1,131 @@
+import threading
+
+import pytest
+
+from jobs import JOB_FAILED, JOB_PENDING, JOB_RUNNING, JOB_SUCCEEDED, JobManager
+
+TIMEOUT = 5
+
+
+@pytest.fixture
+def manager():
+    manager = JobManager()
+    yield manager
+    manager.shutdown()
+
+
+def _blocking(started: threading.Event, release: threading.Event, job=None, **kwargs):
+    started.set()
+    assert release.wait(TIMEOUT)
+    return kwargs
+
+
+def _wait(job):
+    for _ in range(TIMEOUT * 100):
+        if job.is_finished():
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError(f"Job {job.id} did not finish")
+
+
+def test_status_transitions(manager):
+    started, release = threading.Event(), threading.Event()
+    changes = []
+    manager.add_listener(lambda job: changes.append(job.status))
+
+    job = manager.submit("start", _blocking, started, release, max_devices=3)
+    assert started.wait(TIMEOUT)
+    assert job.status == JOB_RUNNING and job.started_at is not None
+    release.set()
+    _wait(job)
+
+    assert job.status == JOB_SUCCEEDED
+    assert job.result == {"max_devices": 3}
+    assert job.params == {"max_devices": 3}
+    assert job.finished_at >= job.started_at
+    assert changes[-1] == JOB_SUCCEEDED
+    assert JOB_RUNNING in changes
+
+
+def test_failure(manager):
+    def fail(job):
+        raise RuntimeError("no docker")
+
+    job = manager.submit("start", fail)
+    _wait(job)
+    assert job.status == JOB_FAILED
+    assert job.error == "no docker"
+
+
+def test_progress(manager):
+    def deploy(job):
+        job.set_phase("deploying", total=2)
+        job.set_progress(1)
+        job.set_progress(2, total=4)
+        return job.to_dict()
+
+    job = manager.submit("start", deploy)
+    _wait(job)
+    assert {key: job.result[key] for key in ("phase", "progress_current", "progress_total")} == {
+        "phase": "deploying", "progress_current": 2, "progress_total": 4
+    }
+
+
+def test_coalesce_with_pending_job(manager):
+    started, release = threading.Event(), threading.Event()
+    blocker = manager.submit("start", _blocking, started, release)
+    assert started.wait(TIMEOUT)
+
+    first = manager.submit("reload", _blocking, threading.Event(), release, coalesce=True, force=False)
+    assert manager.submit("reload", lambda job, force: None, coalesce=True, force=False) is first
+    # Other parameters, other kind, or not coalesced: scheduled separately
+    assert manager.submit("reload", lambda job, force: None, coalesce=True, force=True) is not first
+    assert manager.submit("stop", lambda job, force: None, coalesce=True, force=False) is not first
+    assert manager.submit("reload", lambda job, force: None, force=False) is not first
+    assert first.status == JOB_PENDING
+
+    release.set()
+    for job in manager.unfinished():
+        _wait(job)
+    assert blocker.status == first.status == JOB_SUCCEEDED
+    assert first.result == {"force": False}
+
+
+def test_no_coalesce_with_running_job(manager):
+    started, release = threading.Event(), threading.Event()
+    running = manager.submit("reload", _blocking, started, release, coalesce=True, force=False)
+    assert started.wait(TIMEOUT)
+    assert running.status == JOB_RUNNING
+
+    # The running job may have read the state before the request, so another run is scheduled
+    queued = manager.submit("reload", lambda job, force: "second", coalesce=True, force=False)
+    assert queued is not running
+    assert manager.submit("reload", lambda job, force: "third", coalesce=True, force=False) is queued
+
+    release.set()
+    _wait(queued)
+    assert queued.result == "second"
+
+
+def test_get_and_alias(manager):
+    job = manager.submit("stop", lambda job: None)
+    _wait(job)
+    assert manager.get(job.id) is job
+    assert manager.latest(["stop"]) is job
+    assert manager.latest(["start"]) is None
+
+    manager.alias("forwarded", job.id)
+    assert manager.get("forwarded") is job
+    assert manager.get("unknown") is None
+
+
+def test_finished_jobs_pruned():
+    manager = JobManager(max_finished_jobs=2)
+    try:
+        jobs = [manager.submit("stop", lambda job: None) for _ in range(4)]
+        _wait(jobs[-1])
+        manager.submit("stop", lambda job: None)
+        assert manager.get(jobs[0].id) is None
+        assert manager.get(jobs[-1].id) is jobs[-1]
+    finally:
+        manager.shutdown()
@@ -0,0 +1,98 @@
+import pytest
+
+from route_keys import (
+    RouteKeyCodec, diff_sorted, key_afi, key_path_id, key_prefix, pack_key, pack_prefix, sorted_keys, unpack_prefix
+)
+
+
+@pytest.mark.parametrize("network, expected", [
+    ("192.0.2.0/24", (4, 0xC0000200, 24)),
+    ("192.0.2.77/24", (4, 0xC0000200, 24)),
+    ("10.0.0.1", (4, 0x0A000001, 32)),
+    ("0.0.0.0/0", (4, 0, 0)),
+    ("2001:db8::/32", (6, 0x20010DB8 << 96, 32)),
+    ("2001:db8::1/128", (6, (0x20010DB8 << 96) | 1, 128)),
+])
+def test_pack_prefix(network, expected):
+    assert pack_prefix(network) == expected
+
+
+@pytest.mark.parametrize("network", ["", "not-a-network", "192.0.2.0/33", "192.0.2.0/-1", "2001:db8::/129",
+                                     "192.0.2.0/x", "300.0.0.0/8"])
+def test_pack_prefix_invalid(network):
+    assert pack_prefix(network) is None
+
+
+@pytest.mark.parametrize("network", ["192.0.2.0/24", "0.0.0.0/0", "255.255.255.255/32", "2001:db8::/32", "::/0"])
+def test_unpack_prefix_round_trip(network):
+    assert unpack_prefix(*pack_prefix(network)) == network
+
+
+def test_codec_round_trip():
+    codec = RouteKeyCodec()
+    routes = [
+        ("192.0.2.0/24", ("65001", "65002")),
+        ("192.0.2.0/24", ("65003",)),
+        ("2001:db8::/32", ("65001", "65002")),
+    ]
+    keys = [codec.encode(network, as_path) for network, as_path in routes]
+    assert [codec.decode(key) for key in keys] == routes
+    # The AS path shared by two routes is interned once
+    assert len(codec) == 2
+    assert key_path_id(keys[0]) == key_path_id(keys[2])
+    assert [key_afi(key) for key in keys] == [4, 4, 6]
+    assert codec.encode("invalid", ("65001",)) is None
+
+
+def test_codec_keys_sort_by_prefix():
+    codec = RouteKeyCodec()
+    # Interned in the reverse order of the prefixes, the AS path IDs do not decide the order
+    networks = ["2001:db8::/32", "192.0.2.0/25", "192.0.2.0/24", "10.0.0.0/8"]
+    keys = [codec.encode(network, (str(asn),)) for asn, network in enumerate(networks)]
+    assert [codec.decode(key)[0] for key in sorted(keys)] == list(reversed(networks))
+
+
+def test_pack_key_inverse_of_key_parts():
+    codec = RouteKeyCodec()
+    for network in ["192.0.2.0/24", "2001:db8::/48"]:
+        key = codec.encode(network, ("65001",))
+        assert pack_key(*key_prefix(key), key_path_id(key)) == key
+
+
+def test_codec_fork():
+    codec = RouteKeyCodec()
+    key = codec.encode("192.0.2.0/24", ("65001",))
+    fork = codec.fork()
+    other = fork.encode("198.51.100.0/24", ("65002",))
+    assert fork.decode(key) == codec.decode(key)
+    assert fork.decode(other) == ("198.51.100.0/24", ("65002",))
+    assert len(codec) == 1
+    assert fork.path_ids_with_asn("65002") == {key_path_id(other)}
+    assert codec.path_ids_with_asn("65002") == set()
+
+
+def test_sorted_keys():
+    assert sorted_keys([3, 1, 2, 3, 1]) == [1, 2, 3]
+    assert sorted_keys([]) == []
+
+
+@pytest.mark.parametrize("a, b, expected", [
+    ([], [], ([], [], 0)),
+    ([1, 2, 3], [], ([1, 2, 3], [], 0)),
+    ([], [1, 2, 3], ([], [1, 2, 3], 0)),
+    ([1, 2, 3], [1, 2, 3], ([], [], 3)),
+    ([1, 3, 5, 7], [2, 3, 4, 7, 9], ([1, 5], [2, 4, 9], 2)),
+    ([5, 6], [1, 2], ([5, 6], [1, 2], 0)),
+])
+def test_diff_sorted(a, b, expected):
+    assert diff_sorted(a, b) == expected
+
+
+def test_diff_sorted_matches_set_difference():
+    codec = RouteKeyCodec()
+    live = {codec.encode(f"10.{i % 7}.{i % 11}.0/24", (str(i % 5),)) for i in range(300)}
+    uploaded = {codec.encode(f"10.{i % 5}.{i % 13}.0/24", (str(i % 3),)) for i in range(300)}
+    only_live, only_uploaded, common = diff_sorted(sorted_keys(live), sorted_keys(uploaded))
+    assert only_live == sorted(live - uploaded)
+    assert only_uploaded == sorted(uploaded - live)
+    assert common == len(live & uploaded)
@@ -0,0 +1,133 @@
+import os
+import struct
+
+import pytest
+
+pytest.importorskip("digital_twin")
+
+from snapshots import _PREAMBLE, SNAPSHOT_FORMAT_VERSION, SNAPSHOT_MAGIC, SnapshotStore  # noqa: E402
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SnapshotStore(str(tmp_path / "snapshots"), 4)
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "rib.dump"
+    path.write_bytes(b"192.0.2.0/24 65001 65002\n")
+    return str(path)
+
+
+def _write(store, source, data=b"pickled value"):
+    store.snapshot("table_dump", {"type": "bird"}, [source]).write(data)
+    return store.snapshot("table_dump", {"type": "bird"}, [source])
+
+
+def _patch(path, offset, data):
+    with open(path, "r+b") as f:
+        f.seek(offset)
+        f.write(data)
+
+
+def test_round_trip(store, source):
+    snapshot = _write(store, source)
+    assert snapshot.read() == b"pickled value"
+    with open(snapshot.path, "rb") as f:
+        magic, version, _ = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+    assert (magic, version) == (SNAPSHOT_MAGIC, SNAPSHOT_FORMAT_VERSION)
+
+
+def test_named_after_content_and_params(store, source, tmp_path):
+    path = _write(store, source).path
+    assert store.snapshot("table_dump", {"type": "frr"}, [source]).path != path
+
+    copy = tmp_path / "copy.dump"
+    copy.write_bytes(open(source, "rb").read())
+    assert store.snapshot("table_dump", {"type": "bird"}, [str(copy)]).path == path
+
+    with open(source, "ab") as f:
+        f.write(b"198.51.100.0/24 65003\n")
+    assert store.snapshot("table_dump", {"type": "bird"}, [source]).read() is None
+
+
+def test_missing_snapshot(store, source):
+    assert store.snapshot("table_dump", {}, [source]).read() is None
+
+
+def test_missing_source(store, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        store.snapshot("table_dump", {}, [str(tmp_path / "missing.dump")]).read()
+
+
+def test_checksum_mismatch_discarded(store, source):
+    snapshot = _write(store, source)
+    _patch(snapshot.path, os.path.getsize(snapshot.path) - 1, b"X")
+    assert snapshot.read() is None
+    assert not os.path.exists(snapshot.path)
+
+
+def test_truncated_discarded(store, source):
+    snapshot = _write(store, source)
+    with open(snapshot.path, "r+b") as f:
+        f.truncate(os.path.getsize(snapshot.path) - 3)
+    assert snapshot.read() is None
+    assert not os.path.exists(snapshot.path)
+
+
+@pytest.mark.parametrize("preamble", [
+    struct.pack("<8sII", b"NOTASNAP", SNAPSHOT_FORMAT_VERSION, 0),
+    struct.pack("<8sII", SNAPSHOT_MAGIC, SNAPSHOT_FORMAT_VERSION + 1, 0),
+])
+def test_unsupported_format_discarded(store, source, preamble):
+    snapshot = _write(store, source)
+    _patch(snapshot.path, 0, preamble[:12])
+    assert snapshot.read() is None
+    assert not os.path.exists(snapshot.path)
+
+
+def test_other_python_discarded(store, source):
+    snapshot = _write(store, source)
+    with open(snapshot.path, "rb") as f:
+        content = f.read()
+    _, _, header_length = _PREAMBLE.unpack(content[:_PREAMBLE.size])
+    header = content[_PREAMBLE.size:_PREAMBLE.size + header_length]
+    python = header[header.index(b'"python": "'):].split(b'"')[3]
+    # Same length, the header is patched in place
+    patched = header.replace(b'"python": "' + python, b'"python": "' + b"9" * len(python))
+    _patch(snapshot.path, _PREAMBLE.size, patched)
+    assert snapshot.read() is None
+    assert not os.path.exists(snapshot.path)
+
+
+def test_source_changed_before_write(store, source):
+    snapshot = store.snapshot("table_dump", {}, [source])
+    path = snapshot.resolve()
+    with open(source, "ab") as f:
+        f.write(b"198.51.100.0/24 65003\n")
+    snapshot.write(b"parsed from the new content")
+    assert not os.path.exists(path)
+
+
+def test_disabled(tmp_path, source):
+    store = SnapshotStore(str(tmp_path / "snapshots"), 0)
+    snapshot = _write(store, source)
+    assert snapshot.read() is None
+    assert not os.path.exists(store.directory)
+
+
+def test_prune_per_kind(tmp_path):
+    store = SnapshotStore(str(tmp_path / "snapshots"), 2)
+    paths = []
+    for i in range(3):
+        source = tmp_path / f"{i}.dump"
+        source.write_bytes(str(i).encode())
+        for kind in ("table_dump", "route_index"):
+            snapshot = store.snapshot(kind, {}, [str(source)])
+            snapshot.write(b"value")
+            # Distinct modification times, the least recently used is pruned first
+            os.utime(snapshot.path, (i, i))
+            paths.append(snapshot.path)
+    store.prune()
+    assert [os.path.exists(path) for path in paths] == [False, False, True, True, True, True]
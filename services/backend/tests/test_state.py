@@ -0,0 +1,132 @@
+import pytest
+
+from state import (
+    LIFECYCLE_ERROR, LIFECYCLE_IDLE, LIFECYCLE_OPERATIONS, LIFECYCLE_RELOADING, LIFECYCLE_RUNNING,
+    LIFECYCLE_STARTING, LIFECYCLE_STOPPING, DigitalTwinState, LifecycleError
+)
+
+
+@pytest.fixture
+def state():
+    return DigitalTwinState()
+
+
+def _move(state, *kinds):
+    for kind in kinds:
+        with state.operation(kind):
+            pass
+
+
+def test_initial_state(state):
+    snapshot = state.snapshot()
+    assert snapshot.lifecycle == LIFECYCLE_IDLE
+    assert not snapshot.running and not snapshot.starting
+    assert snapshot.devices_count is None
+
+
+@pytest.mark.parametrize("kind, source, in_progress, succeeded", [
+    ("start", LIFECYCLE_IDLE, LIFECYCLE_STARTING, LIFECYCLE_RUNNING),
+    ("reattach", LIFECYCLE_IDLE, LIFECYCLE_STARTING, LIFECYCLE_RUNNING),
+    ("reload", LIFECYCLE_RUNNING, LIFECYCLE_RELOADING, LIFECYCLE_RUNNING),
+    ("stop", LIFECYCLE_RUNNING, LIFECYCLE_STOPPING, LIFECYCLE_IDLE),
+])
+def test_operation_transitions(state, kind, source, in_progress, succeeded):
+    if source == LIFECYCLE_RUNNING:
+        _move(state, "start")
+    with state.operation(kind):
+        assert state.get_lifecycle() == in_progress
+    assert state.get_lifecycle() == succeeded
+
+
+@pytest.mark.parametrize("kind, failed, error", [
+    ("start", LIFECYCLE_ERROR, "no docker"),
+    ("reload", LIFECYCLE_RUNNING, None),
+    ("stop", LIFECYCLE_ERROR, "no docker"),
+])
+def test_operation_failure(state, kind, failed, error):
+    if kind != "start":
+        _move(state, "start")
+    with pytest.raises(RuntimeError):
+        with state.operation(kind):
+            raise RuntimeError("no docker")
+    assert state.get_lifecycle() == failed
+    assert state.get_error() == error
+
+
+def test_restart_after_error(state):
+    with pytest.raises(RuntimeError):
+        with state.operation("start"):
+            raise RuntimeError("no docker")
+    _move(state, "start")
+    assert state.get_lifecycle() == LIFECYCLE_RUNNING
+    assert state.get_error() is None
+
+
+@pytest.mark.parametrize("lifecycle, kind", [
+    (LIFECYCLE_IDLE, "reload"),
+    (LIFECYCLE_IDLE, "stop"),
+    (LIFECYCLE_RUNNING, "start"),
+    (LIFECYCLE_RUNNING, "reattach"),
+])
+def test_invalid_operation(state, lifecycle, kind):
+    if lifecycle == LIFECYCLE_RUNNING:
+        _move(state, "start")
+    with pytest.raises(LifecycleError) as error:
+        with state.operation(kind):
+            pytest.fail("operation run in an invalid state")
+    assert error.value.status_code == 400
+    assert state.get_lifecycle() == lifecycle
+
+
+def test_operation_in_progress_rejects_others(state):
+    with state.operation("start"):
+        for kind in LIFECYCLE_OPERATIONS:
+            with pytest.raises(LifecycleError, match="already starting"):
+                state.check(kind)
+
+
+def test_fields_applied_on_success(state):
+    with state.operation("start") as operation:
+        operation.update(net_scenario_manager="manager")
+        assert state.get_net_scenario_manager() is None
+    assert state.get_net_scenario_manager() == "manager"
+
+    with pytest.raises(RuntimeError):
+        with state.operation("reload") as operation:
+            operation.update(net_scenario_manager="other")
+            raise RuntimeError("push failed")
+    assert state.get_net_scenario_manager() == "manager"
+
+
+def test_operation_outcome(state):
+    _move(state, "start")
+    with state.operation("stop") as operation:
+        operation.outcome = LIFECYCLE_ERROR
+    assert state.get_lifecycle() == LIFECYCLE_ERROR
+
+
+def test_check_after_queued_operations(state):
+    state.check("start")
+    # Runs after the queued start succeeds
+    state.check("reload", queued=["start"])
+    state.check("stop", queued=["start", "reload"])
+    with pytest.raises(LifecycleError):
+        state.check("start", queued=["start"])
+    with pytest.raises(LifecycleError, match="not running"):
+        state.check("reload", queued=["start", "stop"])
+
+
+def test_listeners(state):
+    lifecycles = []
+    state.add_listener(lambda: lifecycles.append(state.get_lifecycle()))
+    _move(state, "start", "stop")
+    assert lifecycles == [LIFECYCLE_STARTING, LIFECYCLE_RUNNING, LIFECYCLE_STOPPING, LIFECYCLE_IDLE]
+
+
+def test_mirror(state):
+    _move(state, "start")
+    state.mirror({"lifecycle": LIFECYCLE_RELOADING, "error": None, "devices_count": 5})
+    snapshot = state.snapshot()
+    assert snapshot.running
+    assert snapshot.devices_count == 5
+    assert snapshot.net_scenario_manager is None
@@ -0,0 +1,135 @@
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+from uploads import UploadError, extract_archive, is_hidden_path, resolve_resource_path
+
+
+@pytest.fixture
+def resources(tmp_path):
+    path = tmp_path / "resources"
+    (path / "dumps").mkdir(parents=True)
+    return str(path)
+
+
+def _tar(path, members):
+    with tarfile.open(path, "w:gz") as archive:
+        for name, content in members:
+            info = tarfile.TarInfo(name)
+            if isinstance(content, tuple):
+                info.type, info.linkname = content
+                archive.addfile(info)
+            else:
+                info.size = len(content)
+                archive.addfile(info, io.BytesIO(content))
+    return str(path)
+
+
+def _zip(path, members):
+    with zipfile.ZipFile(path, "w") as archive:
+        for name, content in members:
+            archive.writestr(name, content)
+    return str(path)
+
+
+def _statuses(results):
+    return {result["filename"]: result["status"] for result in results}
+
+
+@pytest.mark.parametrize("relative_path, expected", [
+    ("rib.dump", "rib.dump"),
+    ("dumps/rib.dump", "dumps/rib.dump"),
+    ("/dumps/rib.dump", "dumps/rib.dump"),
+    ("dumps\\rib.dump", "dumps/rib.dump"),
+    ("dumps/./other/../rib.dump", "dumps/rib.dump"),
+])
+def test_resolve_resource_path(resources, relative_path, expected):
+    assert resolve_resource_path(resources, relative_path) == os.path.join(os.path.realpath(resources), expected)
+
+
+@pytest.mark.parametrize("relative_path", [
+    "", ".", "..", "../rib.dump", "dumps/../../rib.dump", "..\\rib.dump", ".hidden", "dumps/.DS_Store",
+    ".uploads/session.part",
+])
+def test_resolve_resource_path_rejected(resources, relative_path):
+    with pytest.raises(UploadError) as error:
+        resolve_resource_path(resources, relative_path)
+    assert error.value.status_code == 400
+
+
+def test_resolve_resource_path_symlink_escape(resources, tmp_path):
+    os.symlink(str(tmp_path), os.path.join(resources, "outside"))
+    with pytest.raises(UploadError):
+        resolve_resource_path(resources, "outside/rib.dump")
+
+
+@pytest.mark.parametrize("relative_path, hidden", [
+    ("rib.dump", False),
+    ("dumps/rib.dump", False),
+    ("./dumps/rib.dump", False),
+    (".DS_Store", True),
+    ("dumps/.DS_Store", True),
+    (".git/config", True),
+    ("dumps\\._rib.dump", True),
+])
+def test_is_hidden_path(relative_path, hidden):
+    assert is_hidden_path(relative_path) is hidden
+
+
+def test_extract_tar(resources, tmp_path):
+    archive = _tar(tmp_path / "dumps.tar.gz", [("rib.dump", b"routes"), ("v6/rib.dump", b"routes v6")])
+    results = list(extract_archive(archive, resources))
+    assert results == [
+        {"filename": "rib.dump", "status": "extracted", "size": 6},
+        {"filename": os.path.join("v6", "rib.dump"), "status": "extracted", "size": 9},
+    ]
+    assert open(os.path.join(resources, "v6", "rib.dump"), "rb").read() == b"routes v6"
+
+
+@pytest.mark.parametrize("make", [_tar, _zip])
+def test_extract_rejects_escaping_members(resources, tmp_path, make):
+    archive = make(tmp_path / "archive", [
+        ("../escaped.dump", b"x"),
+        ("dumps/../../escaped.dump", b"x"),
+        (".hidden", b"x"),
+        ("rib.dump", b"routes"),
+    ])
+    results = list(extract_archive(archive, resources))
+    assert [result["status"] for result in results] == ["rejected", "rejected", "rejected", "extracted"]
+    assert not os.path.exists(tmp_path / "escaped.dump")
+    assert not os.path.exists(os.path.join(resources, ".hidden"))
+
+
+def test_extract_absolute_member_stays_inside(resources, tmp_path):
+    archive = _tar(tmp_path / "archive.tar.gz", [("/etc/rib.dump", b"routes")])
+    assert _statuses(extract_archive(archive, resources)) == {os.path.join("etc", "rib.dump"): "extracted"}
+    assert os.path.exists(os.path.join(resources, "etc", "rib.dump"))
+
+
+def test_extract_confined_to_directory(resources, tmp_path):
+    archive = _zip(tmp_path / "archive.zip", [("../sibling.dump", b"x"), ("rib.dump", b"routes")])
+    results = list(extract_archive(archive, resources, "dumps"))
+    assert [result["status"] for result in results] == ["rejected", "extracted"]
+    assert results[1]["filename"] == os.path.join("dumps", "rib.dump")
+    # Inside the resources directory, but outside the destination
+    assert not os.path.exists(os.path.join(resources, "sibling.dump"))
+
+
+def test_extract_rejects_links(resources, tmp_path):
+    archive = _tar(tmp_path / "archive.tar.gz", [
+        ("link", (tarfile.SYMTYPE, "/etc/passwd")),
+        ("hardlink", (tarfile.LNKTYPE, "../../etc/passwd")),
+    ])
+    assert _statuses(extract_archive(archive, resources)) == {"link": "rejected", "hardlink": "rejected"}
+    assert not os.path.lexists(os.path.join(resources, "link"))
+    assert not os.path.lexists(os.path.join(resources, "hardlink"))
+
+
+def test_extract_unsupported_format(resources, tmp_path):
+    path = tmp_path / "archive.rar"
+    path.write_bytes(b"not an archive")
+    with pytest.raises(UploadError):
+        list(extract_archive(str(path), resources))
@@ -0,0 +1,194 @@
+import React, { useState, useRef } from 'react';
+import { Modal, Form, Button, Alert, Spinner, Table, Badge } from 'react-bootstrap';
+import { FaTerminal } from 'react-icons/fa';
+import { bulkExecCommand } from '../services/api';
+
+const SELECTORS = [
+    { value: 'peers', label: 'All peer routers' },
+    { value: 'route_servers', label: 'All route servers' },
+    { value: 'all', label: 'All machines' },
+    { value: 'asn', label: 'Peer routers of an ASN' }
+];
+
+const STATUS_VARIANTS = { success: 'success', error: 'danger', timeout: 'warning' };
+
+export default function BulkExecModal({ show, onHide }) {
+    const [selector, setSelector] = useState('peers');
+    const [asn, setAsn] = useState('');
+    const [command, setCommand] = useState('');
+    const [execTimeout, setExecTimeout] = useState(30);
+    const [running, setRunning] = useState(false);
+    const [results, setResults] = useState([]);
+    const [summary, setSummary] = useState(null);
+    const [error, setError] = useState(null);
+    const [expanded, setExpanded] = useState(null);
+    const abortRef = useRef(null);
+
+    const handleExecute = async () => {
+        if (!command.trim()) return;
+
+        const params = { command, timeout: Number(execTimeout) || 30 };
+        if (selector === 'asn') {
+            params.asn = parseInt(asn, 10);
+        } else {
+            params.selector = selector;
+        }
+
+        setRunning(true);
+        setResults([]);
+        setSummary(null);
+        setError(null);
+        setExpanded(null);
+        abortRef.current = new AbortController();
+
+        try {
+            // Results are displayed as soon as each machine completes
+            await bulkExecCommand(params, (item) => {
+                if (item.summary) {
+                    setSummary(item.summary);
+                } else {
+                    setResults(prev => [...prev, item]);
+                }
+            }, abortRef.current.signal);
+        } catch (err) {
+            if (err.name !== 'AbortError') {
+                console.error('Error executing bulk command:', err);
+                setError(err.message || 'Failed to execute command');
+            }
+        } finally {
+            setRunning(false);
+            abortRef.current = null;
+        }
+    };
+
+    const handleClose = () => {
+        if (abortRef.current) abortRef.current.abort();
+        onHide();
+    };
+
+    return (
+        <Modal show={show} onHide={handleClose} size="xl">
+            <Modal.Header closeButton>
+                <Modal.Title>Execute Command on Multiple Machines</Modal.Title>
+            </Modal.Header>
+            <Modal.Body>
+                <Form className="mb-3">
+                    <div className="d-flex gap-2 mb-3">
+                        <Form.Select value={selector} onChange={(e) => setSelector(e.target.value)} disabled={running}>
+                            {SELECTORS.map(({ value, label }) => (
+                                <option key={value} value={value}>{label}</option>
+                            ))}
+                        </Form.Select>
+                        {selector === 'asn' && (
+                            <Form.Control
+                                type="number"
+                                placeholder="ASN"
+                                value={asn}
+                                onChange={(e) => setAsn(e.target.value)}
+                                disabled={running}
+                            />
+                        )}
+                        <Form.Control
+                            type="number"
+                            min="1"
+                            title="Timeout per machine (seconds)"
+                            value={execTimeout}
+                            onChange={(e) => setExecTimeout(e.target.value)}
+                            disabled={running}
+                            style={{ maxWidth: '120px' }}
+                        />
+                    </div>
+                    <Form.Control
+                        type="text"
+                        placeholder="Enter command to execute, e.g. vtysh -c 'show bgp summary'"
+                        value={command}
+                        onChange={(e) => setCommand(e.target.value)}
+                        disabled={running}
+                        onKeyDown={(e) => {
+                            if (e.key === 'Enter' && !running) {
+                                e.preventDefault();
+                                handleExecute();
+                            }
+                        }}
+                    />
+                </Form>
+
+                {error && (
+                    <Alert variant="danger" className="mb-3">
+                        {error}
+                    </Alert>
+                )}
+
+                {(results.length > 0 || summary) && (
+                    <div className="mb-2">
+                        {summary ? (
+                            <small className="text-muted">
+                                {summary.succeeded_count} succeeded, {summary.failed_count} failed,{' '}
+                                {summary.timed_out_count} timed out on {summary.machines_count} machines in {summary.seconds}s
+                            </small>
+                        ) : (
+                            <small className="text-muted">{results.length} machines completed...</small>
+                        )}
+                    </div>
+                )}
+
+                {results.length > 0 && (
+                    <div style={{ maxHeight: '400px', overflowY: 'auto' }}>
+                        <Table striped bordered size="sm" className="mb-0">
+                            <tbody>
+                                {results.map((result) => (
+                                    <React.Fragment key={result.machine_name}>
+                                        <tr
+                                            onClick={() => setExpanded(expanded === result.machine_name ? null : result.machine_name)}
+                                            style={{ cursor: 'pointer' }}
+                                        >
+                                            <td className="font-monospace">{result.machine_name}</td>
+                                            <td>
+                                                <Badge bg={STATUS_VARIANTS[result.status] || 'secondary'}>{result.status}</Badge>
+                                            </td>
+                                            <td>{result.seconds}s</td>
+                                        </tr>
+                                        {expanded === result.machine_name && (
+                                            <tr>
+                                                <td colSpan={3}>
+                                                    <div
+                                                        className="bg-dark text-light p-2 rounded font-monospace"
+                                                        style={{ fontSize: '0.85rem', whiteSpace: 'pre-wrap', wordWrap: 'break-word' }}
+                                                    >
+                                                        {result.output ?? result.error}
+                                                    </div>
+                                                </td>
+                                            </tr>
+                                        )}
+                                    </React.Fragment>
+                                ))}
+                            </tbody>
+                        </Table>
+                    </div>
+                )}
+            </Modal.Body>
+            <Modal.Footer>
+                <Button variant="secondary" onClick={handleClose}>
+                    {running ? 'Cancel' : 'Close'}
+                </Button>
+                <Button
+                    variant="primary"
+                    onClick={handleExecute}
+                    disabled={!command.trim() || running || (selector === 'asn' && !asn)}
+                >
+                    {running ? (
+                        <>
+                            <Spinner animation="border" size="sm" className="me-2" />
+                            Executing...
+                        </>
+                    ) : (
+                        <>
+                            <FaTerminal className="me-2" />
+                            Execute
+                        </>
+                    )}
+                </Button>
+            </Modal.Footer>
+        </Modal>
+    );
+}
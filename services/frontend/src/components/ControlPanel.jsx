@@ -5,6 +5,7 @@ import { FaPlay, FaStop, FaRedo, FaInfoCircle } from 'react-icons/fa';
 const ControlPanel = ({ running, starting, onStart, onStop, onReload, loading, stopping }) => {
     const [maxDevices, setMaxDevices] = useState('');
     const [rsOnly, setRsOnly] = useState(false);
+    const [forceReload, setForceReload] = useState(false);
 
     const handleStart = () => {
         const devices = maxDevices ? parseInt(maxDevices) : null;
@@ -95,7 +96,7 @@ const ControlPanel = ({ running, starting, onStart, onStop, onReload, loading, s
                                         variant="primary"
                                         onClick={() => {
                                             const devices = maxDevices ? parseInt(maxDevices) : null;
-                                            onReload && onReload(rsOnly, devices);
+                                            onReload && onReload(rsOnly, devices, forceReload);
                                         }}
                                         disabled={loading}
                                         className="w-100 d-flex align-items-center justify-content-center"
@@ -120,6 +121,16 @@ const ControlPanel = ({ running, starting, onStart, onStop, onReload, loading, s
                                         style={{ fontSize: '0.85rem', color: '#6c757d', cursor: 'help' }}
                                         title="Reload only the Route Server configuration without starting/stopping devices"
                                     />
+                                    <Form.Check
+                                        type="switch"
+                                        id="forceReloadCheck"
+                                        label="All Devices"
+                                        checked={forceReload}
+                                        onChange={(e) => setForceReload(e.target.checked)}
+                                        disabled={loading}
+                                        className="mb-0"
+                                        title="Push the configuration of every device, not only the ones that changed"
+                                    />
                                 </Col>
                             </Row>
                         </Col>
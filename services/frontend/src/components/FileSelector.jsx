@@ -1,6 +1,6 @@
 import React, { useRef } from 'react';
 import { Form, InputGroup, Button } from 'react-bootstrap';
-import { FaUpload } from 'react-icons/fa';
+import { FaUpload, FaFileArchive } from 'react-icons/fa';
 
 /**
  * Reusable file selector component with dropdown and upload button
@@ -12,7 +12,26 @@ import { FaUpload } from 'react-icons/fa';
  * @param {function} fileFilter - Optional filter function for available files (default: all)
  * @param {boolean} allowDirectory - Whether to allow directory upload
  * @param {string} placeholder - Placeholder text for dropdown
+ * @param {function} onUploadArchive - Optional callback when a tar/zip archive of a directory is selected (receives event)
  */
+/**
+ * Describe the detected format and route counts of a catalogued file, e.g. "bird, 1200 IPv4 routes", or the error
+ * of its pre-parse
+ * @param {object} file - Entry of the resource catalogue
+ */
+const describeFile = (file) => {
+    if (file.summary?.status === 'failed') {
+        return ` (⚠ ${file.summary.error})`;
+    }
+    if (file.type !== 'file' || !file.format || file.format === 'unknown') {
+        return '';
+    }
+    const routes = [['IPv4', file.routes_v4], ['IPv6', file.routes_v6]]
+        .filter(([, count]) => count)
+        .map(([afi, count]) => `${count} ${afi} routes`);
+    return ` (${[file.format, ...routes].join(', ')})`;
+};
+
 export default function FileSelector({
     value,
     onChange,
@@ -21,9 +40,11 @@ export default function FileSelector({
     uploading = false,
     fileFilter = () => true,
     allowDirectory = false,
-    placeholder = '-- Select file --'
+    placeholder = '-- Select file --',
+    onUploadArchive = null
 }) {
     const fileInputRef = useRef(null);
+    const archiveInputRef = useRef(null);
 
     const filteredFiles = availableFiles.filter(fileFilter);
 
@@ -37,7 +58,7 @@ export default function FileSelector({
                 <option value="">{placeholder}</option>
                 {filteredFiles.map(file => (
                     <option key={file.name} value={file.name}>
-                        {file.type === 'directory' ? '📁' : '📄'} {file.name}
+                        {file.type === 'directory' ? '📁' : '📄'} {file.name}{describeFile(file)}
                     </option>
                 ))}
             </Form.Control>
@@ -55,6 +76,25 @@ export default function FileSelector({
             >
                 <FaUpload />
             </Button>
+            {onUploadArchive && (
+                <>
+                    <input
+                        ref={archiveInputRef}
+                        type="file"
+                        accept=".tar,.tar.gz,.tgz,.tar.bz2,.tar.xz,.zip"
+                        style={{ display: 'none' }}
+                        onChange={onUploadArchive}
+                    />
+                    <Button
+                        variant="outline-primary"
+                        onClick={() => archiveInputRef.current?.click()}
+                        disabled={uploading}
+                        title="Upload a tar or zip archive of the directory"
+                    >
+                        <FaFileArchive />
+                    </Button>
+                </>
+            )}
         </InputGroup>
     );
 }
@@ -1,7 +1,12 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { Table, Alert, Spinner, Button, Modal, Form } from 'react-bootstrap';
-import { FaTerminal, FaPause, FaPlay } from 'react-icons/fa';
-import { getMachinesStats, executeMachineCommand } from '../services/api';
+import { FaTerminal, FaPause, FaPlay, FaStop } from 'react-icons/fa';
+import { getMachinesStats, streamMachineCommand, cancelMachineCommand } from '../services/api';
+import { subscribe } from '../services/events';
+import BulkExecModal from './BulkExecModal';
+
+// Output kept in the exec modal, beyond it the command is stopped
+const EXEC_OUTPUT_MAX_BYTES = 5 * 1024 * 1024;
 
 export default function MachinesStatsTable({ running }) {
     const [machines, setMachines] = useState({});
@@ -14,10 +19,10 @@ export default function MachinesStatsTable({ running }) {
     const [execOutput, setExecOutput] = useState(null);
     const [execError, setExecError] = useState(null);
     const [isPolling, setIsPolling] = useState(true);
+    const [showBulkExecModal, setShowBulkExecModal] = useState(false);
+    const execRef = useRef({ id: null, abort: null });
 
     const fetchMachinesStats = async () => {
-        if (!running) return;
-
         setLoading(true);
         setError(null);
         try {
@@ -31,14 +36,23 @@ export default function MachinesStatsTable({ running }) {
         }
     };
 
+    const applyStats = (data) => {
+        // The first event carries all the machines, the next ones only the changed and removed machines
+        setMachines(prev => {
+            const machines = data.full ? {} : { ...prev };
+            Object.assign(machines, data.machines);
+            data.removed.forEach(name => delete machines[name]);
+            return machines;
+        });
+    };
+
     useEffect(() => {
+        if (!running || !isPolling) return;
+
+        const unsubscribeStats = subscribe('stats', applyStats);
+        // The shared stream may already be open, so start from the latest sample and apply the next deltas on it
         fetchMachinesStats();
-        const interval = setInterval(() => {
-            if (isPolling) {
-                fetchMachinesStats();
-            }
-        }, 5000); // Poll every 5 seconds
-        return () => clearInterval(interval);
+        return unsubscribeStats;
     }, [running, isPolling]);
 
     const handleOpenExecModal = (machineName) => {
@@ -50,6 +64,8 @@ export default function MachinesStatsTable({ running }) {
     };
 
     const handleCloseExecModal = () => {
+        // Closing the connection also stops the command on the backend
+        if (execRef.current.abort) execRef.current.abort.abort();
         setShowExecModal(false);
         setSelectedMachine(null);
         setCommand('');
@@ -64,21 +80,43 @@ export default function MachinesStatsTable({ running }) {
         setExecError(null);
         setExecOutput(null);
 
+        const abort = new AbortController();
+        execRef.current = { id: null, abort };
+        setExecOutput('');
+
         try {
-            const response = await executeMachineCommand(selectedMachine, command);
-            if (response.status === 'success') {
-                setExecOutput(response.output);
-            } else {
-                setExecError(response.error || 'Command execution failed');
-            }
+            // The output is displayed while it is produced, long outputs are capped by the backend
+            await streamMachineCommand(
+                selectedMachine,
+                command,
+                (text) => setExecOutput(prev => (prev || '') + text),
+                {
+                    maxBytes: EXEC_OUTPUT_MAX_BYTES,
+                    onStart: (execId) => { execRef.current.id = execId; },
+                    signal: abort.signal
+                }
+            );
         } catch (err) {
-            console.error('Error executing command:', err);
-            setExecError(err.response?.data?.detail || 'Failed to execute command');
+            if (err.name !== 'AbortError') {
+                console.error('Error executing command:', err);
+                setExecError(err.message || 'Failed to execute command');
+            }
         } finally {
+            execRef.current = { id: null, abort: null };
             setExecLoading(false);
         }
     };
 
+    const handleCancelCommand = async () => {
+        if (!execRef.current.id) return;
+        try {
+            // The stream ends by itself once the command is killed
+            await cancelMachineCommand(execRef.current.id);
+        } catch (err) {
+            console.error('Error cancelling command:', err);
+        }
+    };
+
     if (!running) {
         return (
             <Alert variant="info" className="mt-4">
@@ -123,24 +161,36 @@ export default function MachinesStatsTable({ running }) {
         <div className="mt-4">
             <div className="d-flex justify-content-between align-items-center mb-3">
                 <h5>Machines Statistics</h5>
-                <Button
-                    variant={isPolling ? "warning" : "success"}
-                    size="sm"
-                    onClick={() => setIsPolling(!isPolling)}
-                    title={isPolling ? "Stop polling" : "Start polling"}
-                >
-                    {isPolling ? (
-                        <>
-                            <FaPause className="me-2" />
-                            Stop Polling
-                        </>
-                    ) : (
-                        <>
-                            <FaPlay className="me-2" />
-                            Start Polling
-                        </>
-                    )}
-                </Button>
+                <div>
+                    <Button
+                        variant="outline-primary"
+                        size="sm"
+                        className="me-2"
+                        onClick={() => setShowBulkExecModal(true)}
+                        title="Execute a command on several machines"
+                    >
+                        <FaTerminal className="me-2" />
+                        Bulk Exec
+                    </Button>
+                    <Button
+                        variant={isPolling ? "warning" : "success"}
+                        size="sm"
+                        onClick={() => setIsPolling(!isPolling)}
+                        title={isPolling ? "Pause live updates" : "Resume live updates"}
+                    >
+                        {isPolling ? (
+                            <>
+                                <FaPause className="me-2" />
+                                Pause Updates
+                            </>
+                        ) : (
+                            <>
+                                <FaPlay className="me-2" />
+                                Resume Updates
+                            </>
+                        )}
+                    </Button>
+                </div>
             </div>
             <div className="table-responsive">
                 <Table striped bordered hover>
@@ -189,6 +239,8 @@ export default function MachinesStatsTable({ running }) {
                 </Table>
             </div>
 
+            <BulkExecModal show={showBulkExecModal} onHide={() => setShowBulkExecModal(false)} />
+
             {/* Command Execution Modal */}
             <Modal show={showExecModal} onHide={handleCloseExecModal} size="lg">
                 <Modal.Header closeButton>
@@ -245,26 +297,24 @@ export default function MachinesStatsTable({ running }) {
                     )}
                 </Modal.Body>
                 <Modal.Footer>
-                    <Button variant="secondary" onClick={handleCloseExecModal} disabled={execLoading}>
+                    <Button variant="secondary" onClick={handleCloseExecModal}>
                         Close
                     </Button>
-                    <Button
-                        variant="primary"
-                        onClick={handleExecuteCommand}
-                        disabled={!command.trim() || execLoading}
-                    >
-                        {execLoading ? (
-                            <>
-                                <Spinner animation="border" size="sm" className="me-2" />
-                                Executing...
-                            </>
-                        ) : (
-                            <>
-                                <FaTerminal className="me-2" />
-                                Execute
-                            </>
-                        )}
-                    </Button>
+                    {execLoading ? (
+                        <Button variant="danger" onClick={handleCancelCommand}>
+                            <FaStop className="me-2" />
+                            Cancel
+                        </Button>
+                    ) : (
+                        <Button
+                            variant="primary"
+                            onClick={handleExecuteCommand}
+                            disabled={!command.trim()}
+                        >
+                            <FaTerminal className="me-2" />
+                            Execute
+                        </Button>
+                    )}
                 </Modal.Footer>
             </Modal>
         </div>
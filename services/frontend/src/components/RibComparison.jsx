@@ -1,7 +1,22 @@
 import React, { useState, useEffect } from 'react';
 import { Card, Form, Button, Alert, Spinner, Table, Badge } from 'react-bootstrap';
 import { FaFlask, FaCheckCircle, FaExclamationTriangle, FaChevronDown, FaChevronUp, FaDownload } from 'react-icons/fa';
-import { compareRib, executeMachineCommand, listRibDumps } from '../services/api';
+import {
+    compareRib, compareRibBatch, getRibComparisonRoutes, getRibComparisonHistory, diffRibComparisons,
+    executeMachineCommand, listRibDumps
+} from '../services/api';
+
+const PAGE_SIZE = 100;
+const HISTORY_SIZE = 10;
+
+const TREND_VARIANTS = { improving: 'success', worsening: 'danger', stable: 'secondary' };
+
+// A numeric filter selects an ASN, anything else a prefix
+const parseRouteFilter = (text) => {
+    const value = text.trim();
+    if (!value) return {};
+    return /^\d+$/.test(value) ? { asn: value } : { prefix: value };
+};
 
 const RibComparison = ({ running, resourceFiles, routeServers, minimized, onToggleMinimize }) => {
     const [selectedRouteServer, setSelectedRouteServer] = useState('');
@@ -12,6 +27,12 @@ const RibComparison = ({ running, resourceFiles, routeServers, minimized, onTogg
     const [errorMessage, setErrorMessage] = useState(null);
     const [showDetails, setShowDetails] = useState(false);
     const [ribDumpFiles, setRibDumpFiles] = useState([]);
+    const [routeFilter, setRouteFilter] = useState('');
+    const [diffPages, setDiffPages] = useState({ live: null, uploaded: null });
+    const [loadingRoutes, setLoadingRoutes] = useState(false);
+    const [batchResult, setBatchResult] = useState(null);
+    const [history, setHistory] = useState(null);
+    const [sincePrevious, setSincePrevious] = useState(null);
 
     useEffect(() => {
         // Fetch the list of valid RIB dump files from configuration
@@ -73,6 +94,68 @@ const RibComparison = ({ running, resourceFiles, routeServers, minimized, onTogg
         }
     };
 
+    const fetchRoutesPage = async (comparisonId, side, cursor = null) => {
+        const data = await getRibComparisonRoutes(comparisonId, side, {
+            cursor,
+            limit: PAGE_SIZE,
+            ...parseRouteFilter(routeFilter)
+        });
+        return { routes: data.routes.map(r => r.route), nextCursor: data.next_cursor };
+    };
+
+    const handleApplyFilter = async () => {
+        if (!comparisonResult) return;
+        setLoadingRoutes(true);
+        setErrorMessage(null);
+        try {
+            const [live, uploaded] = await Promise.all([
+                fetchRoutesPage(comparisonResult.comparison_id, 'live'),
+                fetchRoutesPage(comparisonResult.comparison_id, 'uploaded')
+            ]);
+            setDiffPages({ live, uploaded });
+        } catch (error) {
+            console.error('Error fetching RIB differences:', error);
+            setErrorMessage(error.response?.data?.detail || 'Failed to fetch RIB differences');
+        } finally {
+            setLoadingRoutes(false);
+        }
+    };
+
+    const handleLoadMore = async (side) => {
+        const current = diffPages[side];
+        if (!current || !current.nextCursor) return;
+        setLoadingRoutes(true);
+        try {
+            const next = await fetchRoutesPage(comparisonResult.comparison_id, side, current.nextCursor);
+            setDiffPages(prev => ({
+                ...prev,
+                [side]: { routes: [...prev[side].routes, ...next.routes], nextCursor: next.nextCursor }
+            }));
+        } catch (error) {
+            console.error('Error fetching RIB differences:', error);
+            setErrorMessage(error.response?.data?.detail || 'Failed to fetch RIB differences');
+        } finally {
+            setLoadingRoutes(false);
+        }
+    };
+
+    // The history and the changes since the previous run are read from the server-side index
+    const fetchHistory = async (result) => {
+        try {
+            const data = await getRibComparisonHistory(result.route_server, result.resource_file, HISTORY_SIZE);
+            setHistory(data);
+            if (data.comparisons.length > 1) {
+                const diff = await diffRibComparisons(result.comparison_id);
+                setSincePrevious({
+                    introduced: diff.sides.reduce((total, side) => total + side.introduced_count, 0),
+                    resolved: diff.sides.reduce((total, side) => total + side.resolved_count, 0)
+                });
+            }
+        } catch (error) {
+            console.error('Error fetching RIB comparison history:', error);
+        }
+    };
+
     const handleCompare = async () => {
         if (!selectedRouteServer || !selectedResourceFile) {
             setErrorMessage('Please select both a route server and a resource file');
@@ -82,10 +165,26 @@ const RibComparison = ({ running, resourceFiles, routeServers, minimized, onTogg
         setLoading(true);
         setErrorMessage(null);
         setComparisonResult(null);
+        setDiffPages({ live: null, uploaded: null });
+        setRouteFilter('');
+        setHistory(null);
+        setSincePrevious(null);
 
         try {
-            const result = await compareRib(selectedRouteServer, selectedResourceFile);
+            const result = await compareRib(selectedRouteServer, selectedResourceFile, PAGE_SIZE);
             setComparisonResult(result);
+            // The response carries the first page of each side, the next ones are fetched by cursor
+            setDiffPages({
+                live: {
+                    routes: result.only_in_live,
+                    nextCursor: result.only_in_live_count > result.only_in_live.length ? String(PAGE_SIZE) : null
+                },
+                uploaded: {
+                    routes: result.only_in_uploaded,
+                    nextCursor: result.only_in_uploaded_count > result.only_in_uploaded.length ? String(PAGE_SIZE) : null
+                }
+            });
+            fetchHistory(result);
         } catch (error) {
             console.error('Error comparing RIB:', error);
             setErrorMessage(error.response?.data?.detail || 'Failed to compare RIB');
@@ -94,6 +193,23 @@ const RibComparison = ({ running, resourceFiles, routeServers, minimized, onTogg
         }
     };
 
+    const handleCompareAll = async () => {
+        setLoading(true);
+        setErrorMessage(null);
+        setBatchResult(null);
+
+        try {
+            // Without a selected file, every route server is compared against all the configured dumps
+            const result = await compareRibBatch(null, selectedResourceFile ? [selectedResourceFile] : null);
+            setBatchResult(result);
+        } catch (error) {
+            console.error('Error comparing RIBs:', error);
+            setErrorMessage(error.response?.data?.detail || 'Failed to compare RIBs');
+        } finally {
+            setLoading(false);
+        }
+    };
+
     if (!running) {
         return (
             <Card className="mb-3 text-muted">
@@ -178,6 +294,16 @@ const RibComparison = ({ running, resourceFiles, routeServers, minimized, onTogg
                             {loading ? 'Comparing...' : 'Compare RIB'}
                         </Button>
 
+                        <Button
+                            variant="outline-primary"
+                            onClick={handleCompareAll}
+                            disabled={loading || downloadingLiveRib}
+                            className="me-2"
+                            title="Compare every route server against the selected dump, or all the dumps"
+                        >
+                            Compare All Route Servers
+                        </Button>
+
                         <Button
                             variant="outline-secondary"
                             onClick={handleDownloadLiveRib}
@@ -189,6 +315,48 @@ const RibComparison = ({ running, resourceFiles, routeServers, minimized, onTogg
                         </Button>
                     </Form>
 
+                    {batchResult && (
+                        <div className="mb-3">
+                            <h6>
+                                All Route Servers{' '}
+                                <Badge bg={batchResult.failed_count > 0 ? 'danger' : batchResult.differences_count > 0 ? 'warning' : 'success'}>
+                                    {batchResult.differences_count} differences
+                                </Badge>{' '}
+                                <small className="text-muted">in {batchResult.seconds}s</small>
+                            </h6>
+                            <Table striped bordered size="sm" className="mb-0">
+                                <thead>
+                                    <tr>
+                                        <th>Route Server</th>
+                                        <th>Live</th>
+                                        <th>Uploaded</th>
+                                        <th>Differences</th>
+                                        <th>Time</th>
+                                    </tr>
+                                </thead>
+                                <tbody>
+                                    {batchResult.results.map((result) => (
+                                        <tr key={result.route_server}>
+                                            <td>{result.route_server}</td>
+                                            {result.status === 'success' ? (
+                                                <>
+                                                    <td>{result.live_rib_lines}</td>
+                                                    <td>{result.uploaded_rib_lines}</td>
+                                                    <td className={result.differences_count > 0 ? 'text-warning fw-bold' : 'text-success'}>
+                                                        {result.differences_count}
+                                                    </td>
+                                                </>
+                                            ) : (
+                                                <td colSpan={3} className="text-danger small">{result.error}</td>
+                                            )}
+                                            <td>{result.seconds}s</td>
+                                        </tr>
+                                    ))}
+                                </tbody>
+                            </Table>
+                        </div>
+                    )}
+
                     {comparisonResult && (
                         <div>
                             <div className="mb-3 p-3 bg-light rounded">
@@ -223,6 +391,11 @@ const RibComparison = ({ running, resourceFiles, routeServers, minimized, onTogg
                                         <div>
                                             <strong>RIB Differences Found</strong>
                                             <div className="small">{comparisonResult.message}</div>
+                                            {sincePrevious && (
+                                                <div className="small">
+                                                    Since the previous run: {sincePrevious.introduced} new, {sincePrevious.resolved} resolved
+                                                </div>
+                                            )}
                                         </div>
                                     </div>
                                 </Alert>
@@ -238,6 +411,41 @@ const RibComparison = ({ running, resourceFiles, routeServers, minimized, onTogg
                                 </Alert>
                             )}
 
+                            {history && history.comparisons.length > 1 && (
+                                <div className="mb-3">
+                                    <h6>
+                                        History{' '}
+                                        {history.trend && (
+                                            <Badge bg={TREND_VARIANTS[history.trend]}>{history.trend}</Badge>
+                                        )}
+                                    </h6>
+                                    <Table striped bordered size="sm" className="mb-0">
+                                        <thead>
+                                            <tr>
+                                                <th>Time</th>
+                                                <th>Live</th>
+                                                <th>Uploaded</th>
+                                                <th>Differences</th>
+                                                <th>Change</th>
+                                            </tr>
+                                        </thead>
+                                        <tbody>
+                                            {history.comparisons.map((run) => (
+                                                <tr key={run.comparison_id}>
+                                                    <td>{new Date(run.created_at * 1000).toLocaleString()}</td>
+                                                    <td>{run.live_rib_lines}</td>
+                                                    <td>{run.uploaded_rib_lines}</td>
+                                                    <td>{run.differences_count}</td>
+                                                    <td className={run.differences_delta > 0 ? 'text-danger' : run.differences_delta < 0 ? 'text-success' : ''}>
+                                                        {run.differences_delta === null ? '-' : run.differences_delta > 0 ? `+${run.differences_delta}` : run.differences_delta}
+                                                    </td>
+                                                </tr>
+                                            ))}
+                                        </tbody>
+                                    </Table>
+                                </div>
+                            )}
+
                             <Button
                                 variant="outline-secondary"
                                 size="sm"
@@ -249,30 +457,36 @@ const RibComparison = ({ running, resourceFiles, routeServers, minimized, onTogg
 
                             {showDetails && (
                                 <div>
-                                    {comparisonResult.only_in_live && comparisonResult.only_in_live.length > 0 && (
-                                        <div className="mb-3">
-                                            <h6>Routes Only in Live RIB ({comparisonResult.only_in_live.length})</h6>
-                                            <div style={{ maxHeight: '300px', overflowY: 'auto' }} className="border rounded p-2 bg-light">
-                                                <Table striped bordered size="sm" className="mb-0">
-                                                    <tbody>
-                                                        {comparisonResult.only_in_live.map((route, idx) => (
-                                                            <tr key={idx}>
-                                                                <td><small><code>{route}</code></small></td>
-                                                            </tr>
-                                                        ))}
-                                                    </tbody>
-                                                </Table>
-                                            </div>
-                                        </div>
-                                    )}
+                                    <Form.Group className="mb-3 d-flex gap-2">
+                                        <Form.Control
+                                            type="text"
+                                            size="sm"
+                                            placeholder="Filter by prefix (e.g. 10.0.0.0/8) or ASN"
+                                            value={routeFilter}
+                                            onChange={(e) => setRouteFilter(e.target.value)}
+                                            onKeyDown={(e) => {
+                                                if (e.key === 'Enter') {
+                                                    e.preventDefault();
+                                                    handleApplyFilter();
+                                                }
+                                            }}
+                                            disabled={loadingRoutes}
+                                        />
+                                        <Button variant="outline-primary" size="sm" onClick={handleApplyFilter} disabled={loadingRoutes}>
+                                            Filter
+                                        </Button>
+                                    </Form.Group>
 
-                                    {comparisonResult.only_in_uploaded && comparisonResult.only_in_uploaded.length > 0 && (
-                                        <div className="mb-3">
-                                            <h6>Routes Only in Uploaded RIB ({comparisonResult.only_in_uploaded.length})</h6>
+                                    {[
+                                        { side: 'live', title: 'Routes Only in Live RIB', count: comparisonResult.only_in_live_count },
+                                        { side: 'uploaded', title: 'Routes Only in Uploaded RIB', count: comparisonResult.only_in_uploaded_count }
+                                    ].map(({ side, title, count }) => diffPages[side] && diffPages[side].routes.length > 0 && (
+                                        <div className="mb-3" key={side}>
+                                            <h6>{title} ({diffPages[side].routes.length} of {count})</h6>
                                             <div style={{ maxHeight: '300px', overflowY: 'auto' }} className="border rounded p-2 bg-light">
                                                 <Table striped bordered size="sm" className="mb-0">
                                                     <tbody>
-                                                        {comparisonResult.only_in_uploaded.map((route, idx) => (
+                                                        {diffPages[side].routes.map((route, idx) => (
                                                             <tr key={idx}>
                                                                 <td><small><code>{route}</code></small></td>
                                                             </tr>
@@ -280,8 +494,18 @@ const RibComparison = ({ running, resourceFiles, routeServers, minimized, onTogg
                                                     </tbody>
                                                 </Table>
                                             </div>
+                                            {diffPages[side].nextCursor && (
+                                                <Button
+                                                    variant="link"
+                                                    size="sm"
+                                                    onClick={() => handleLoadMore(side)}
+                                                    disabled={loadingRoutes}
+                                                >
+                                                    {loadingRoutes ? 'Loading...' : 'Load more'}
+                                                </Button>
+                                            )}
                                         </div>
-                                    )}
+                                    ))}
                                 </div>
                             )}
                         </div>
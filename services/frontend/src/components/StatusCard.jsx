@@ -3,7 +3,28 @@ import { Card, Button } from 'react-bootstrap';
 import { useNavigate } from 'react-router-dom';
 import { FaCheckCircle, FaTimesCircle, FaHourglassHalf, FaSpinner, FaExclamationTriangle } from 'react-icons/fa';
 
-const StatusCard = ({ running, starting, devicesCount, error, configMissing }) => {
+const PHASE_LABELS = {
+    discovering: 'Discovering deployed lab',
+    loading_settings: 'Loading settings',
+    loading_member_dump: 'Loading member dump',
+    loading_rib_dumps: 'Loading RIB dumps',
+    building: 'Building network scenario',
+    applying_configs: 'Applying configurations',
+    interconnecting: 'Interconnecting devices',
+    undeploying: 'Cleaning up existing deployment',
+    deploying: 'Deploying devices',
+};
+
+const formatJobPhase = (job) => {
+    if (!job || !job.phase) return null;
+    const label = PHASE_LABELS[job.phase] || job.phase;
+    if (job.progress_total) {
+        return `${label} ${job.progress_current}/${job.progress_total}`;
+    }
+    return label;
+};
+
+const StatusCard = ({ lifecycle, running, starting, devicesCount, error, job, configMissing }) => {
     const navigate = useNavigate();
 
     if (configMissing) {
@@ -56,6 +77,23 @@ const StatusCard = ({ running, starting, devicesCount, error, configMissing }) =
                         <div>
                             <div className="fw-bold">Starting Digital Twin...</div>
                             <div>Please wait while the network scenario is being deployed.</div>
+                            {formatJobPhase(job) && <div className="small">{formatJobPhase(job)}...</div>}
+                        </div>
+                    </div>
+                </Card.Body>
+            </Card>
+        );
+    }
+
+    if (lifecycle === 'stopping') {
+        return (
+            <Card className="text-bg-info mb-3">
+                <Card.Body>
+                    <div className="d-flex align-items-center">
+                        <FaSpinner className="spinner-border spinner-border-sm me-2" />
+                        <div>
+                            <div className="fw-bold">Stopping Digital Twin...</div>
+                            <div>Please wait while the network scenario is being undeployed.</div>
                         </div>
                     </div>
                 </Card.Body>
@@ -70,7 +108,9 @@ const StatusCard = ({ running, starting, devicesCount, error, configMissing }) =
                     <div className="d-flex align-items-center">
                         <FaCheckCircle size={24} className="me-2" />
                         <div>
-                            <div className="fw-bold">Digital Twin Running</div>
+                            <div className="fw-bold">
+                                {lifecycle === 'reloading' ? 'Digital Twin Reloading...' : 'Digital Twin Running'}
+                            </div>
                             <div>
                                 {devicesCount && `${devicesCount} customer${devicesCount !== 1 ? 's' : ''} deployed`}
                             </div>
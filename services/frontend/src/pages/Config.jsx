@@ -1,7 +1,7 @@
 import React, { useEffect, useState } from 'react';
 import { Container, Form, Button, Alert, Spinner, Row, Col, Card } from 'react-bootstrap';
 import { FaPlus, FaTrash } from 'react-icons/fa';
-import { getIxpConfig, updateIxpConfig, listResourceFiles, uploadResourceFile, uploadResourceDirectory } from '../services/api';
+import { getIxpConfigVersioned, updateIxpConfig, listResourceFiles, uploadResourceFile, uploadResourceDirectory, uploadResourceArchive } from '../services/api';
 import FileSelector from '../components/FileSelector';
 
 export default function Config() {
@@ -17,6 +17,7 @@ export default function Config() {
     ];
 
     const [originalConfig, setOriginalConfig] = useState(null);
+    const [configEtag, setConfigEtag] = useState(null);
     const [loading, setLoading] = useState(false);
     const [saving, setSaving] = useState(false);
     const [alertMsg, setAlertMsg] = useState(null);
@@ -63,8 +64,9 @@ export default function Config() {
         setLoading(true);
         setAlertMsg(null);
         try {
-            const data = await getIxpConfig();
+            const { config: data, etag } = await getIxpConfigVersioned();
             setOriginalConfig(data);
+            setConfigEtag(etag);
 
             setScenarioName(data.scenario_name || '');
             setHostInterface(data.host_interface || '');
@@ -245,6 +247,34 @@ export default function Config() {
         }
     };
 
+    const handleRsConfigArchiveUpload = (idx) => async (e) => {
+        const file = e.target.files[0];
+        if (!file) return;
+        setUploading(true);
+        setAlertMsg(null);
+        try {
+            let extracted = 0;
+            const result = await uploadResourceArchive(file, (entry) => {
+                if (entry.status === 'extracted') {
+                    extracted += 1;
+                    setAlertMsg(`Extracting ${file.name}: ${extracted} files...`);
+                    setAlertType('info');
+                }
+            });
+            if (result.dirName) updateRouteServer(idx, 'config', result.dirName);
+            await loadAvailableFiles();
+            const rejected = result.rejected_count > 0 ? `, ${result.rejected_count} entries rejected` : '';
+            setAlertMsg(`Archive ${file.name} extracted: ${result.files_count} files, ${result.bytes_written} bytes${rejected}`);
+            setAlertType(result.rejected_count > 0 ? 'warning' : 'success');
+        } catch (err) {
+            setAlertMsg(err.message || 'Failed to upload archive');
+            setAlertType('danger');
+        } finally {
+            setUploading(false);
+            e.target.value = '';
+        }
+    };
+
     const handleBirdwatcherConfigUpload = (idx) => async (e) => {
         const file = e.target.files[0];
         if (!file) return;
@@ -333,13 +363,18 @@ export default function Config() {
                 dns_name: dnsName
             };
 
-            const resp = await updateIxpConfig(updated);
+            const resp = await updateIxpConfig(updated, configEtag);
             setAlertMsg(resp.message || 'Configuration updated');
             setAlertType('success');
             // reload original config from disk to reflect exact stored file
             await loadConfig();
         } catch (err) {
             console.error('Failed to save ixp.conf', err);
+            if (err.response?.status === 412) {
+                setAlertMsg('The configuration was modified by someone else since it was loaded. Reload the page to get the latest version before saving.');
+                setAlertType('warning');
+                return;
+            }
             setAlertMsg(err.response?.data?.detail || err.message || 'Failed to save configuration');
             setAlertType('danger');
         } finally {
@@ -559,6 +594,7 @@ export default function Config() {
                                                         value={rs.config}
                                                         onChange={e => updateRouteServer(idx, 'config', e.target.value)}
                                                         onUpload={handleRsConfigUpload(idx)}
+                                                        onUploadArchive={handleRsConfigArchiveUpload(idx)}
                                                         availableFiles={availableFiles}
                                                         uploading={uploading}
                                                         allowDirectory={true}
@@ -4,14 +4,17 @@ import StatusCard from '../components/StatusCard';
 import ControlPanel from '../components/ControlPanel';
 import MachinesStatsTable from '../components/MachinesStatsTable';
 import RibComparison from '../components/RibComparison';
-import { getStatus, startDigitalTwin, stopDigitalTwin, reloadDigitalTwin, getIxpConfig, listResourceFiles } from '../services/api';
+import { subscribe } from '../services/events';
+import { getStatus, startDigitalTwin, stopDigitalTwin, reloadDigitalTwin, waitForJob, getIxpConfig, listResourceFiles } from '../services/api';
 
 export default function Dashboard() {
     const [status, setStatus] = useState({
+        lifecycle: 'idle',
         running: false,
         starting: false,
         devices_count: null,
-        error: null
+        error: null,
+        job: null
     });
     const [loading, setLoading] = useState(false);
     const [stopping, setStopping] = useState(false);
@@ -71,8 +74,15 @@ export default function Dashboard() {
         fetchStatus();
         fetchResourceFiles();
         fetchIxpConfig();
-        const interval = setInterval(fetchStatus, 3000); // Poll every 3 seconds
-        return () => clearInterval(interval);
+        // Status changes are pushed by the backend instead of being polled
+        const unsubscribeStatus = subscribe('status', setStatus);
+        const unsubscribeDisconnected = subscribe('disconnected', () => {
+            setStatus(prev => ({ ...prev, error: 'Failed to connect to backend' }));
+        });
+        return () => {
+            unsubscribeStatus();
+            unsubscribeDisconnected();
+        };
     }, []);
 
     const handleStart = async (maxDevices) => {
@@ -95,6 +105,12 @@ export default function Dashboard() {
         setAlertMessage(null);
         try {
             const response = await stopDigitalTwin();
+            // Stops are queued behind the lifecycle operations in progress
+            const job = await waitForJob(response.job_id);
+            if (job.status === 'failed') {
+                setAlertMessage(`Failed to stop digital twin: ${job.error}`);
+                setAlertType('danger');
+            }
             await fetchStatus();
         } catch (error) {
             console.error('Error stopping digital twin:', error);
@@ -105,11 +121,22 @@ export default function Dashboard() {
         }
     };
 
-    const handleReload = async (rsOnly = false, maxDevices = null) => {
+    const handleReload = async (rsOnly = false, maxDevices = null, force = false) => {
         setLoading(true);
         setAlertMessage(null);
         try {
-            const response = await reloadDigitalTwin(rsOnly, maxDevices);
+            const response = await reloadDigitalTwin(rsOnly, maxDevices, force);
+            const job = await waitForJob(response.job_id);
+            if (job.status === 'failed') {
+                setAlertMessage(`Failed to reload digital twin: ${job.error}`);
+                setAlertType('danger');
+            } else if (job.result?.devices) {
+                const { changed, unchanged, new: added, deleted } = job.result.devices;
+                setAlertMessage(
+                    `Configurations reloaded: ${changed} changed, ${added} new, ${deleted} deleted, ${unchanged} unchanged devices`
+                );
+                setAlertType('success');
+            }
             await fetchStatus();
         } catch (error) {
             console.error('Error reloading digital twin:', error);
@@ -136,10 +163,12 @@ export default function Dashboard() {
             <Row className="justify-content-center">
                 <Col>
                     <StatusCard
+                        lifecycle={status.lifecycle}
                         running={status.running}
                         starting={status.starting}
                         devicesCount={status.devices_count}
                         error={status.error}
+                        job={status.job}
                         configMissing={configMissing}
                     />
 
@@ -1,6 +1,6 @@
 import axios from 'axios';
 
-const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
+export const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
 
 const api = axios.create({
     baseURL: API_URL,
@@ -26,26 +26,51 @@ export const stopDigitalTwin = async () => {
     return response.data;
 };
 
-export const reloadDigitalTwin = async (rsOnly = false, maxDevices = null) => {
+export const reloadDigitalTwin = async (rsOnly = false, maxDevices = null, force = false) => {
     const response = await api.post('/reload', {
         rs_only: rsOnly,
-        max_devices: maxDevices
+        max_devices: maxDevices,
+        force
     });
     return response.data;
 };
 
+export const getJob = async (jobId) => {
+    const response = await api.get(`/jobs/${jobId}`);
+    return response.data;
+};
+
+export const waitForJob = async (jobId, intervalMs = 1000) => {
+    for (;;) {
+        const job = await getJob(jobId);
+        if (job.status === 'succeeded' || job.status === 'failed') {
+            return job;
+        }
+        await new Promise(resolve => setTimeout(resolve, intervalMs));
+    }
+};
+
 export const getIxpConfig = async () => {
     const response = await api.get('/config/ixp');
     return response.data;
 };
 
-export const updateIxpConfig = async (config) => {
-    const response = await api.put('/config/ixp', config);
+// Returns the configuration with its ETag, to be passed back to updateIxpConfig
+export const getIxpConfigVersioned = async () => {
+    const response = await api.get('/config/ixp');
+    return { config: response.data, etag: response.headers.etag || null };
+};
+
+// With an ETag, the update fails with a 412 if the configuration was modified since it was read
+export const updateIxpConfig = async (config, etag = null) => {
+    const response = await api.put('/config/ixp', config, {
+        headers: etag ? { 'If-Match': etag } : {}
+    });
     return response.data;
 };
 
-export const listResourceFiles = async () => {
-    const response = await api.get('/resources/files');
+export const listResourceFiles = async (filters = {}) => {
+    const response = await api.get('/resources/files', { params: filters });
     return response.data;
 };
 
@@ -54,7 +79,48 @@ export const listRibDumps = async () => {
     return response.data;
 };
 
-export const uploadResourceFile = async (file) => {
+// Files above this size are sent in chunks through a resumable upload
+const CHUNKED_UPLOAD_THRESHOLD = 64 * 1024 * 1024;
+const UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024;
+const UPLOAD_CHUNK_RETRIES = 5;
+
+const uploadResourceFileInChunks = async (file, onProgress) => {
+    const { data: session } = await api.post('/resources/uploads', { filename: file.name, size: file.size });
+    let offset = session.offset;
+    let retries = 0;
+    while (offset < file.size) {
+        const chunk = file.slice(offset, offset + UPLOAD_CHUNK_SIZE);
+        try {
+            const { data } = await api.put(`/resources/uploads/${session.upload_id}`, chunk, {
+                params: { offset },
+                headers: { 'Content-Type': 'application/octet-stream' },
+            });
+            retries = 0;
+            offset = data.offset;
+            if (onProgress) onProgress(offset / file.size);
+            if (data.completed) {
+                break;
+            }
+        } catch (error) {
+            // Client errors other than an offset mismatch are not recoverable
+            const status = error.response?.status;
+            if ((status && status < 500 && status !== 409) || ++retries > UPLOAD_CHUNK_RETRIES) {
+                throw error;
+            }
+            // Resume from what the backend actually received
+            await new Promise(resolve => setTimeout(resolve, 1000 * retries));
+            const { data } = await api.get(`/resources/uploads/${session.upload_id}`);
+            offset = data.offset;
+        }
+    }
+    return { status: 'success', filename: file.name, size: file.size };
+};
+
+export const uploadResourceFile = async (file, onProgress = null) => {
+    if (file.size > CHUNKED_UPLOAD_THRESHOLD) {
+        return uploadResourceFileInChunks(file, onProgress);
+    }
+
     const formData = new FormData();
     formData.append('file', file);
     const response = await api.post('/resources/upload', formData, {
@@ -84,6 +150,26 @@ export const uploadResourceDirectory = async (files) => {
     return { ...response.data, dirName };
 };
 
+// Uploads a tar or zip archive of a resource directory, calling onEntry with the progress of each extracted file
+export const uploadResourceArchive = async (file, onEntry = null) => {
+    let summary = null;
+    let dirName = null;
+    await postNdjson('/resources/upload-archive', file, (item) => {
+        if (item.summary) {
+            summary = item.summary;
+            return;
+        }
+        if (dirName === null && item.status === 'extracted') {
+            dirName = item.filename.split('/')[0];
+        }
+        if (onEntry) onEntry(item);
+    });
+    if (summary.status !== 'success') {
+        throw new Error(summary.error || 'Failed to extract archive');
+    }
+    return { ...summary, dirName };
+};
+
 export const runQuarantineCheck = async (data) => {
     const response = await api.post('/quarantine/check', data);
     return response.data;
@@ -102,12 +188,109 @@ export const executeMachineCommand = async (machineName, command) => {
     return response.data;
 };
 
-export const compareRib = async (routeServer, resourceFile) => {
+// Reads a newline-delimited JSON response while it is received, calling onItem with each parsed line.
+// Blob bodies (files) are sent as is, other bodies as JSON.
+const postNdjson = async (path, body, onItem, signal = null) => {
+    const isBlob = body instanceof Blob;
+    const response = await fetch(`${API_URL}${path}`, {
+        method: 'POST',
+        headers: { 'Content-Type': isBlob ? 'application/octet-stream' : 'application/json' },
+        body: isBlob ? body : JSON.stringify(body),
+        signal
+    });
+    if (!response.ok) {
+        const data = await response.json().catch(() => ({}));
+        throw new Error(data.detail || `Request failed with status ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let pending = '';
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        pending += decoder.decode(value, { stream: true });
+        const lines = pending.split('\n');
+        pending = lines.pop();
+        lines.filter(line => line.trim()).forEach(line => onItem(JSON.parse(line)));
+    }
+    if (pending.trim()) onItem(JSON.parse(pending));
+};
+
+// Streams the output of a command, calling onOutput with each decoded chunk; resolves with the exec ID
+export const streamMachineCommand = async (machineName, command, onOutput, { maxBytes = null, onStart = null, signal = null } = {}) => {
+    const response = await fetch(`${API_URL}/machines/exec/stream`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ machine_name: machineName, command, max_bytes: maxBytes }),
+        signal
+    });
+    if (!response.ok) {
+        const data = await response.json().catch(() => ({}));
+        throw new Error(data.detail || `Request failed with status ${response.status}`);
+    }
+
+    const execId = response.headers.get('X-Exec-Id');
+    if (onStart) onStart(execId);
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        onOutput(decoder.decode(value, { stream: true }));
+    }
+    onOutput(decoder.decode());
+    return execId;
+};
+
+export const cancelMachineCommand = async (execId) => {
+    const response = await api.post(`/machines/exec/${execId}/cancel`);
+    return response.data;
+};
+
+export const bulkExecCommand = async (params, onResult, signal = null) => {
+    await postNdjson('/machines/exec/bulk', params, onResult, signal);
+};
+
+export const compareRib = async (routeServer, resourceFile, pageSize = 100) => {
     const response = await api.post('/rib/compare', {
         route_server: routeServer,
-        resource_file: resourceFile
+        resource_file: resourceFile,
+        page_size: pageSize
     });
     return response.data;
 };
 
+export const compareRibBatch = async (routeServers = null, resourceFiles = null) => {
+    const response = await api.post('/rib/compare/batch', {
+        route_servers: routeServers,
+        resource_files: resourceFiles
+    });
+    return response.data;
+};
+
+export const getRibComparisonRoutes = async (comparisonId, side, { cursor = null, limit = 100, prefix = null, asn = null, afi = null } = {}) => {
+    const params = { side, limit };
+    if (cursor) params.cursor = cursor;
+    if (prefix) params.prefix = prefix;
+    if (asn) params.asn = asn;
+    if (afi) params.afi = afi;
+    const response = await api.get(`/rib/comparisons/${comparisonId}/routes`, { params });
+    return response.data;
+};
+
+export const getRibComparisonHistory = async (routeServer, resourceFile, limit = 10) => {
+    const response = await api.get('/rib/comparisons', {
+        params: { route_server: routeServer, resource_file: resourceFile, limit }
+    });
+    return response.data;
+};
+
+export const diffRibComparisons = async (comparisonId, baseId = null, limit = 0) => {
+    const params = { limit };
+    if (baseId) params.base = baseId;
+    const response = await api.get(`/rib/comparisons/${comparisonId}/diff`, { params });
+    return response.data;
+};
+
 export default api;
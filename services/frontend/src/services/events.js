@@ -0,0 +1,51 @@
+import { API_URL } from './api';
+
+// A single EventSource is shared by all the subscribers and closed with the last one
+let source = null;
+const handlers = {};
+const CONNECTION_EVENTS = ['connected', 'disconnected'];
+
+const dispatch = (event, data) => {
+    (handlers[event] || new Set()).forEach(handler => handler(data));
+};
+
+const listen = (event) => {
+    source.addEventListener(event, (e) => {
+        try {
+            dispatch(event, JSON.parse(e.data));
+        } catch (error) {
+            console.error(`Error parsing ${event} event:`, error);
+        }
+    });
+};
+
+const connect = () => {
+    source = new EventSource(`${API_URL}/events`);
+    // The browser reconnects by itself, the server then sends a full snapshot again
+    source.onopen = () => dispatch('connected');
+    source.onerror = () => dispatch('disconnected');
+    Object.keys(handlers).filter(event => !CONNECTION_EVENTS.includes(event)).forEach(listen);
+};
+
+/**
+ * Subscribe to a server-sent event ('status', 'stats') or to the 'connected'/'disconnected' connection events.
+ * Returns the function that removes the subscription.
+ */
+export const subscribe = (event, handler) => {
+    if (!handlers[event]) {
+        handlers[event] = new Set();
+        if (source && !CONNECTION_EVENTS.includes(event)) listen(event);
+    }
+    handlers[event].add(handler);
+    if (!source) connect();
+
+    return () => {
+        handlers[event].delete(handler);
+        const active = Object.values(handlers).some(set => set.size > 0);
+        if (!active && source) {
+            source.close();
+            source = null;
+            Object.keys(handlers).forEach(key => delete handlers[key]);
+        }
+    };
+};